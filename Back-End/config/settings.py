@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 
@@ -6,21 +7,159 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    # "memory" keeps everything in indexed dicts per worker (benchmarks, perf tests)
+    STORAGE_BACKEND: Literal["postgres", "memory"] = "postgres"
+    # Pool per worker (serve.py lowers the max to fit DB_CONNECTION_BUDGET)
+    DB_POOL_MIN_SIZE: int = 2
+    DB_POOL_MAX_SIZE: int = 10
     
     # Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Verified access tokens cached per worker until they expire
+    TOKEN_CACHE_MAX_ENTRIES: int = 10_000
     
     # App
     API_PREFIX: str = "/api/v1"
     DEBUG: bool = False
     
+    # Server (serve.py; SERVER_WORKERS=0 starts one worker per CPU core)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: float = 30
+    # Postgres connections all workers may hold together (pools and listeners)
+    DB_CONNECTION_BUDGET: int = 90
+    
     # Frontend
     FRONTEND_URL: str = "http://localhost:3002"
 
     #CORS
     CORS_ORIGINS: str = "http://localhost:3002"
+
+    # Redirect cache (per worker)
+    REDIRECT_CACHE_MAX_ENTRIES: int = 100_000
+    REDIRECT_CACHE_TTL_SECONDS: int = 60
+    # Expired entries are kept this long to serve redirects while the database is down
+    REDIRECT_CACHE_STALE_SECONDS: int = 3600
+
+    # Shared redirect cache (all workers on the host, POSIX only)
+    SHARED_CACHE_ENABLED: bool = False
+    SHARED_CACHE_PATH: str = "/dev/shm/url-shortener-redirects"
+    SHARED_CACHE_MAX_MB: int = 64
+    SHARED_CACHE_TTL_SECONDS: int = 300
+
+    # Redirect responses (301/308 are cached by browsers, 302/307 only per Cache-Control)
+    # Nothing purges browsers or CDNs: edits, deletes and links made private
+    # are seen there only after these TTLs
+    REDIRECT_STATUS_CODE: Literal[301, 302, 307, 308] = 301
+    REDIRECT_MAX_AGE_SECONDS: int = 300
+    REDIRECT_S_MAXAGE_SECONDS: int = 300
+    REDIRECT_SURROGATE_KEYS: bool = True
+
+    # Preload the hottest links into the redirect cache on startup
+    WARMUP_ENABLED: bool = False
+    WARMUP_TOP_N: int = 10_000
+    WARMUP_BATCH_SIZE: int = 1000
+    WARMUP_TIME_BUDGET_SECONDS: float = 10
+    WARMUP_ORDER: Literal["clicks", "recent"] = "clicks"
+
+    # Guest UUID cache (per worker)
+    GUEST_CACHE_MAX_ENTRIES: int = 10_000
+    GUEST_CACHE_TTL_SECONDS: int = 300
+
+    # Database circuit breaker (degraded mode for redirects)
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RECOVERY_SECONDS: float = 10
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS: float = 1.0
+    DB_ACQUIRE_TIMEOUT_SECONDS: float = 2.0
+    DB_QUERY_TIMEOUT_SECONDS: float = 2.0
+
+    # Admission control: concurrent requests per endpoint class, with a
+    # bounded wait queue; beyond it requests get 503 with Retry-After.
+    # Limits must add up to at most DB_POOL_MAX_SIZE; 0 splits the rest
+    # of the pool (2:1:1:1 for redirect, write, export, auth)
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_REDIRECT_LIMIT: int = 0
+    ADMISSION_REDIRECT_QUEUE: int = 200
+    ADMISSION_WRITE_LIMIT: int = 0
+    ADMISSION_WRITE_QUEUE: int = 50
+    ADMISSION_EXPORT_LIMIT: int = 0
+    ADMISSION_EXPORT_QUEUE: int = 50
+    ADMISSION_AUTH_LIMIT: int = 0
+    ADMISSION_AUTH_QUEUE: int = 50
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 1.0
+    ADMISSION_RETRY_AFTER_SECONDS: float = 1
+
+    # Readiness probe (/health/ready), cached between probes
+    HEALTH_CACHE_SECONDS: float = 2.0
+    HEALTH_DB_TIMEOUT_SECONDS: float = 1.0
+    HEALTH_MAX_ACQUIRE_MS: float = 500
+    HEALTH_MAX_WORKER_LAG_SECONDS: float = 60
+
+    # Evict cached entries on Postgres change notifications (LISTEN/NOTIFY)
+    CACHE_INVALIDATION_ENABLED: bool = True
+
+    # Unique visitors per URL (HyperLogLog sketches flushed to Postgres)
+    VISITOR_STATS_ENABLED: bool = True
+    VISITOR_STATS_FLUSH_SECONDS: float = 30
+    VISITOR_STATS_MAX_PENDING: int = 10_000
+
+    # Hot links (top-K short codes over a sliding window, per worker)
+    HOT_LINKS_ENABLED: bool = True
+    HOT_LINKS_CAPACITY: int = 1000
+    HOT_LINKS_WINDOW_SECONDS: int = 300
+    HOT_LINKS_SLICES: int = 5
+    # Merge across workers on the host through a shared directory
+    HOT_LINKS_SHARED_ENABLED: bool = False
+    HOT_LINKS_SHARED_DIR: str = "/dev/shm/url-shortener-hot-links"
+    HOT_LINKS_PUBLISH_SECONDS: float = 5
+
+    # Prometheus metrics at /metrics (per worker)
+    METRICS_ENABLED: bool = True
+
+    # Slow-query log and per-fingerprint query stats (GET /admin/slow-queries)
+    SLOW_QUERY_THRESHOLD_MS: float = 200
+    SLOW_QUERY_MAX_FINGERPRINTS: int = 1000
+
+    # Per-request profiling (X-Profile + X-Admin-Key, or a sampled fraction)
+    PROFILING_ENABLED: bool = True
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_MAX_PROFILES: int = 20
+    # Profiles of all workers on the host in a shared directory, so any of
+    # them serves the download (otherwise only the one that captured it)
+    PROFILING_SHARED_ENABLED: bool = True
+    PROFILING_SHARED_DIR: str = "/dev/shm/url-shortener-profiles"
+
+    # Structured JSON logs, written in batches by a background task
+    # LOG_DESTINATION is "stdout" or a file path ("{pid}" = worker pid)
+    LOG_DESTINATION: str = "stdout"
+    LOG_FILE_MAX_MB: int = 100
+    LOG_FILE_BACKUPS: int = 5
+    LOG_QUEUE_MAX_EVENTS: int = 10000
+    LOG_BATCH_SIZE: int = 500
+    LOG_FLUSH_SECONDS: float = 1.0
+    ACCESS_LOG_ENABLED: bool = True
+    ACCESS_LOG_REDIRECT_SAMPLE_RATE: float = 1.0
+
+    # Bulk import
+    BULK_IMPORT_BATCH_SIZE: int = 500
+    BULK_IMPORT_MAX_ROWS: int = 100_000
+
+    # Rate limiting per route group ("<count>/<second|minute|hour|day>")
+    # Counters are per worker: with N workers (serve.py) a client can get up
+    # to N times the limit, depending on how its requests are spread
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REDIRECT: str = "300/minute"
+    RATE_LIMIT_RESOLVE: str = "60/minute"
+    RATE_LIMIT_CREATE: str = "30/minute"
+    RATE_LIMIT_BULK: str = "5/minute"
+    RATE_LIMIT_GUEST: str = "10/minute"
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+    # Trusted proxies in front of the app that append to X-Forwarded-For
+    RATE_LIMIT_FORWARDED_HOPS: int = 1
     
     class Config:
         env_file = ".env"
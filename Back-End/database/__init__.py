@@ -1,3 +1,6 @@
 from .connection import db
+from .notifications import change_listener
+from .circuit_breaker import DatabaseUnavailableError
+from .admission import admission, OverloadedError
 
-__all__ = ["db"]
+__all__ = ["db", "change_listener", "DatabaseUnavailableError", "admission", "OverloadedError"]
@@ -0,0 +1,154 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict
+from config import settings
+from utils.metrics import registry
+from .circuit_breaker import DatabaseUnavailableError
+
+
+admission_rejected = registry.counter(
+    "admission_rejected_total",
+    "Requests rejected by admission control by endpoint class",
+    ("class",)
+)
+
+
+class OverloadedError(DatabaseUnavailableError):
+    """Rejected by admission control: too many requests of the class in flight"""
+
+
+class AdmissionLimiter:
+    """
+    Concurrency limit with a bounded FIFO wait queue
+    Up to `limit` holders at once; further callers wait in line (at most
+    `max_queue` of them, each for at most `queue_timeout` seconds) and are
+    rejected with OverloadedError beyond that, so an exhausted pool makes
+    requests fail fast instead of all waiting on connection acquire
+    """
+    
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+    
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+    
+    async def acquire(self, wait: bool = True) -> None:
+        """Take a slot; without wait, reject at once instead of queueing"""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if not wait or len(self._waiters) >= self.max_queue:
+            self._reject()
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # A releasing holder hands its slot over by resolving the future
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject()
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            # Timed out or cancelled while still in line
+            if waiter.cancelled() and waiter in self._waiters:
+                self._waiters.remove(waiter)
+    
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+    
+    @asynccontextmanager
+    async def slot(self, wait: bool = True):
+        """Hold a slot for the block (no-op when admission control is disabled)"""
+        if not settings.ADMISSION_CONTROL_ENABLED:
+            yield
+            return
+        
+        await self.acquire(wait)
+        try:
+            yield
+        finally:
+            self.release()
+    
+    def _reject(self) -> None:
+        self.rejected += 1
+        admission_rejected.inc((self.name,))
+        raise OverloadedError(f"Too many {self.name} requests in progress", settings.ADMISSION_RETRY_AFTER_SECONDS)
+    
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+
+# Share of the pool of each endpoint class whose limit is not configured
+ADMISSION_WEIGHTS = {"redirect": 2, "write": 1, "export": 1, "auth": 1}
+
+
+def admission_limits(pool_size: int, configured: Dict[str, int]) -> Dict[str, int]:
+    """
+    Concurrency limit of each endpoint class for a pool of pool_size
+    Classes configured with 0 split what the others leave of the pool by
+    ADMISSION_WEIGHTS (at least 1 each). Raises ValueError when the limits
+    add up to more than the pool: requests would then queue on connection
+    acquire instead of being shed
+    """
+    limits = {name: max(0, configured.get(name, 0)) for name in ADMISSION_WEIGHTS}
+    derived = [name for name, limit in limits.items() if limit == 0]
+    if derived:
+        spare = pool_size - sum(limits.values())
+        weights = sum(ADMISSION_WEIGHTS[name] for name in derived)
+        for name in derived:
+            limits[name] = max(1, spare * ADMISSION_WEIGHTS[name] // weights)
+        # Rounding leftovers go to the first derived class
+        limits[derived[0]] += max(0, pool_size - sum(limits.values()))
+    
+    if sum(limits.values()) > pool_size:
+        raise ValueError(
+            f"Admission limits {limits} add up to more than the {pool_size} connections of the pool "
+            "(DB_POOL_MAX_SIZE)"
+        )
+    return limits
+
+
+def configured_limits() -> Dict[str, int]:
+    """ADMISSION_*_LIMIT settings by endpoint class (0: derived from the pool)"""
+    return {
+        "redirect": settings.ADMISSION_REDIRECT_LIMIT,
+        "write": settings.ADMISSION_WRITE_LIMIT,
+        "export": settings.ADMISSION_EXPORT_LIMIT,
+        "auth": settings.ADMISSION_AUTH_LIMIT,
+    }
+
+
+_queue_sizes = {
+    "redirect": settings.ADMISSION_REDIRECT_QUEUE,
+    "write": settings.ADMISSION_WRITE_QUEUE,
+    "export": settings.ADMISSION_EXPORT_QUEUE,
+    "auth": settings.ADMISSION_AUTH_QUEUE,
+}
+
+# Endpoint classes and their limits within this worker's pool (one set per worker)
+admission: Dict[str, AdmissionLimiter] = {
+    name: AdmissionLimiter(name, limit, _queue_sizes[name], settings.ADMISSION_QUEUE_TIMEOUT_SECONDS)
+    for name, limit in admission_limits(settings.DB_POOL_MAX_SIZE, configured_limits()).items()
+}
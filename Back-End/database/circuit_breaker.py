@@ -0,0 +1,141 @@
+import asyncio
+import time
+import asyncpg
+from contextlib import asynccontextmanager
+from typing import Optional
+from utils.event_log import event_log
+
+
+# Errors meaning the database is unreachable or overloaded (not bad queries)
+DATABASE_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.InterfaceError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.AdminShutdownError,
+    asyncpg.CrashShutdownError,
+    asyncpg.TooManyConnectionsError,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DatabaseUnavailableError(Exception):
+    """The database call was rejected by the circuit breaker or failed"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for database calls
+    Opens after `failure_threshold` consecutive failures (errors or calls
+    slower than `slow_call_seconds`) and rejects calls for `recovery_seconds`;
+    then lets a single probe through (half-open) and closes again if it succeeds
+    """
+
+    def __init__(self, failure_threshold: int, recovery_seconds: float, slow_call_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.slow_call_seconds = slow_call_seconds
+
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.times_opened = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._retry_after() <= 0:
+            return HALF_OPEN
+        return self._state
+
+    @property
+    def is_closed(self) -> bool:
+        return self._state == CLOSED
+
+    def allow_request(self) -> bool:
+        """Whether a call may go to the database now"""
+        if self._state == CLOSED:
+            return True
+
+        if self._state == OPEN and self._retry_after() > 0:
+            return False
+
+        # Half-open: one probe at a time
+        if self._probe_in_flight:
+            return False
+        self._state = HALF_OPEN
+        self._probe_in_flight = True
+        return True
+
+    def can_probe(self) -> bool:
+        """Whether allow_request would let a call through now (without taking the probe)"""
+        if self._state == CLOSED:
+            return True
+        return self._retry_after() <= 0 and not self._probe_in_flight
+
+    def record_success(self, duration: float) -> None:
+        if duration > self.slow_call_seconds:
+            self.record_failure(f"slow call ({duration:.2f}s)")
+            return
+
+        self._probe_in_flight = False
+        self._failures = 0
+        if self._state != CLOSED:
+            event_log.log("db_circuit_closed")
+        self._state = CLOSED
+
+    def record_failure(self, error: str) -> None:
+        self._probe_in_flight = False
+        self._failures += 1
+        self.last_error = error
+
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != OPEN:
+                self.times_opened += 1
+                event_log.log("db_circuit_opened", "warning", error=error)
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+
+    @asynccontextmanager
+    async def guard(self):
+        """
+        Run a database call through the breaker
+        Raises DatabaseUnavailableError when rejected or on a connection failure
+        """
+        if not self.allow_request():
+            raise DatabaseUnavailableError("Database circuit is open", self._retry_after())
+
+        start = time.monotonic()
+        try:
+            yield
+        except DATABASE_ERRORS as e:
+            self.record_failure(f"{type(e).__name__}: {e}")
+            raise DatabaseUnavailableError("Database unavailable", self.recovery_seconds) from e
+        except BaseException:
+            # Query errors and cancellations say nothing about availability
+            self._probe_in_flight = False
+            raise
+        else:
+            self.record_success(time.monotonic() - start)
+
+    def _retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.recovery_seconds - time.monotonic())
+
+    def snapshot(self) -> dict:
+        """State for health and admin endpoints"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self.times_opened,
+            "retry_after_seconds": round(self._retry_after(), 1) if self._state == OPEN else 0,
+            "last_error": self.last_error,
+        }
@@ -1,7 +1,11 @@
 import asyncpg
+from contextlib import asynccontextmanager
 from typing import Optional
 from pathlib import Path
 from config import settings
+from utils.event_log import event_log
+from .circuit_breaker import CircuitBreaker
+from .instrumentation import InstrumentedConnection
 
 
 class Database:
@@ -9,20 +13,27 @@ class Database:
     
     def __init__(self):
         self.pool: Optional[asyncpg.Pool] = None
+        self.breaker = CircuitBreaker(
+            settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            settings.CIRCUIT_BREAKER_RECOVERY_SECONDS,
+            settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS
+        )
     
     async def connect(self):
         """Create database connection pool"""
         try:
             self.pool = await asyncpg.create_pool(
                 settings.DATABASE_URL,
-                min_size=2,
-                max_size=10,
-                timeout=10
+                min_size=settings.DB_POOL_MIN_SIZE,
+                max_size=settings.DB_POOL_MAX_SIZE,
+                timeout=10,
+                # Times every query (metrics, slow-query log)
+                connection_class=InstrumentedConnection
             )
             await self.init_db()
-            print(f"✅ Database connected")
+            event_log.log("db_connected")
         except Exception as e:
-            print(f"❌ Failed to connect to database: {e}")
+            event_log.log("db_connect_failed", "error", error=str(e))
             raise
     
     async def disconnect(self):
@@ -39,6 +50,17 @@ class Database:
                 schema_sql = f.read()
                 await conn.execute(schema_sql)
     
+    @asynccontextmanager
+    async def guarded_connection(self):
+        """
+        Pool connection for paths that can degrade (served from cache)
+        Bounded wait for a connection, failures are tracked by the circuit breaker
+        Raises DatabaseUnavailableError
+        """
+        async with self.breaker.guard():
+            async with self.pool.acquire(timeout=settings.DB_ACQUIRE_TIMEOUT_SECONDS) as conn:
+                yield conn
+    
     async def get_connection(self):
         """Get a database connection from the pool"""
         return await self.pool.acquire()
@@ -0,0 +1,119 @@
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+import asyncpg
+from config import settings
+from utils.event_log import event_log
+from utils.metrics import registry
+from .query_stats import query_stats
+
+
+class RequestContext:
+    """The HTTP request a query runs for (set by the metrics middleware)"""
+
+    __slots__ = ("scope", "db_time")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.db_time = 0.0
+
+    @property
+    def route(self) -> str:
+        # Route template once routed, raw path before
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {getattr(route, 'path', self.scope['path'])}"
+
+
+# Sent by asyncpg itself: Connection.transaction() and the rollback in reset()
+_TRANSACTION_CONTROL = re.compile(r"\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b", re.IGNORECASE)
+
+request_context: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+query_duration = registry.histogram(
+    "db_query_duration_seconds",
+    "Duration of database calls by operation",
+    ("operation",)
+)
+query_errors = registry.counter(
+    "db_query_errors_total",
+    "Database calls that raised, by operation",
+    ("operation",)
+)
+
+
+def _observe(operation: str, query: str, seconds: float, failed: bool) -> None:
+    query_duration.observe(seconds, (operation,))
+    if failed:
+        query_errors.inc((operation,))
+
+    context = request_context.get()
+    if context is not None:
+        context.db_time += seconds
+
+    slow = seconds * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS
+    key = query_stats.record(operation, query, seconds, failed, slow)
+    if slow:
+        event_log.log(
+            "slow_query",
+            "warning",
+            duration_ms=round(seconds * 1000, 3),
+            route=context.route if context is not None else None,
+            fingerprint=key,
+            query=query_stats.fingerprint(query)[1][:200]
+        )
+
+
+class InstrumentedConnection(asyncpg.Connection):
+    """
+    Pool connection that times fetch, fetchrow, fetchval and execute
+    Used as the pool's connection_class, so every service query is
+    measured (metrics, per-fingerprint stats and the slow-query log)
+    without changes at the call sites
+    Statements asyncpg issues on its own (transaction control and the
+    reset query run when a connection goes back to the pool) are not
+    service queries and are not recorded
+    """
+
+    async def fetch(self, query, *args, timeout=None, record_class=None):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await super().fetch(query, *args, timeout=timeout, record_class=record_class)
+            failed = False
+            return result
+        finally:
+            _observe("fetch", query, time.perf_counter() - start, failed)
+
+    async def fetchrow(self, query, *args, timeout=None, record_class=None):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await super().fetchrow(query, *args, timeout=timeout, record_class=record_class)
+            failed = False
+            return result
+        finally:
+            _observe("fetchrow", query, time.perf_counter() - start, failed)
+
+    async def fetchval(self, query, *args, column=0, timeout=None):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await super().fetchval(query, *args, column=column, timeout=timeout)
+            failed = False
+            return result
+        finally:
+            _observe("fetchval", query, time.perf_counter() - start, failed)
+
+    async def execute(self, query: str, *args, timeout: float = None) -> str:
+        if not args and (_TRANSACTION_CONTROL.match(query) or query == self.get_reset_query()):
+            return await super().execute(query, timeout=timeout)
+
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await super().execute(query, *args, timeout=timeout)
+            failed = False
+            return result
+        finally:
+            _observe("execute", query, time.perf_counter() - start, failed)
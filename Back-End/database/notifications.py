@@ -0,0 +1,110 @@
+import asyncio
+import asyncpg
+from typing import Callable, Dict, List, Optional, Tuple
+from config import settings
+from utils.event_log import event_log
+
+
+# How often the idle listener connection is checked
+KEEPALIVE_SECONDS = 30
+RECONNECT_DELAY_SECONDS = 5
+
+
+class ChangeListener:
+    """
+    Listens to Postgres change notifications on a dedicated connection
+    and dispatches them to subscribed handlers (one listener per worker)
+
+    Notifications sent while the listener is disconnected are lost, so
+    after a reconnect every subscriber's reset handler is called
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[str, List[Tuple[Callable[[str], None], Callable[[], None]]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._conn: Optional[asyncpg.Connection] = None
+        self._connected = asyncio.Event()
+
+    def subscribe(self, channel: str, on_notify: Callable[[str], None], on_reset: Callable[[], None]) -> None:
+        """
+        Register handlers for a channel (before start)
+        Args:
+            on_notify: Called with the notification payload
+            on_reset: Called when notifications may have been missed
+        """
+        self._subscriptions.setdefault(channel, []).append((on_notify, on_reset))
+
+    @property
+    def is_connected(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    async def start(self, connect_timeout: float = 10) -> None:
+        """Start listening in the background, waiting briefly for the first connection"""
+        if self._task or not self._subscriptions:
+            return
+
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=connect_timeout)
+        except asyncio.TimeoutError:
+            event_log.log("change_listener_connect_pending", "warning")
+
+    async def stop(self) -> None:
+        """Stop listening and close the dedicated connection"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        missed_notifications = False
+
+        while True:
+            terminated = asyncio.Event()
+            try:
+                self._conn = await asyncpg.connect(settings.DATABASE_URL, timeout=10)
+                self._conn.add_termination_listener(lambda conn: terminated.set())
+                for channel in self._subscriptions:
+                    await self._conn.add_listener(channel, self._dispatch)
+
+                if missed_notifications:
+                    self._reset_all()
+                missed_notifications = True
+                self._connected.set()
+
+                while not terminated.is_set():
+                    try:
+                        await asyncio.wait_for(terminated.wait(), timeout=KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        await self._conn.fetchval("SELECT 1", timeout=10)
+
+            except asyncio.CancelledError:
+                raise
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                event_log.log("change_listener_disconnected", "warning", error=str(e))
+                missed_notifications = True
+            finally:
+                if self._conn is not None:
+                    self._conn.terminate()
+                    self._conn = None
+
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    def _dispatch(self, connection, pid: int, channel: str, payload: str) -> None:
+        for on_notify, _ in self._subscriptions.get(channel, ()):
+            try:
+                on_notify(payload)
+            except Exception as e:
+                event_log.log("change_handler_failed", "error", channel=channel, error=str(e))
+
+    def _reset_all(self) -> None:
+        for handlers in self._subscriptions.values():
+            for _, on_reset in handlers:
+                on_reset()
+
+
+# Global change listener instance
+change_listener = ChangeListener()
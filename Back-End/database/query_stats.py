@@ -0,0 +1,116 @@
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple
+from config import settings
+
+
+# Literal and parameter patterns replaced by '?' in fingerprints
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:''|[^'])*'")
+_PARAMS = re.compile(r"\$\d+")
+_NUMBERS = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+# Statistics of queries beyond the fingerprint limit are merged here
+OTHER = "other"
+
+
+def normalize_sql(query: str) -> str:
+    """SQL text with comments removed, literals and parameters as '?' and single spaces"""
+    query = _COMMENTS.sub(" ", query)
+    query = _STRINGS.sub("?", query)
+    query = _PARAMS.sub("?", query)
+    query = _NUMBERS.sub("?", query)
+    query = _LISTS.sub("(?)", query)
+    return _SPACES.sub(" ", query).strip()
+
+
+class QueryStats:
+    """
+    Count, total and max duration per SQL fingerprint
+    Query texts are normalized once and memoized (the service SQL is a
+    small fixed set); fingerprints beyond max_fingerprints are merged
+    into a single "other" entry so memory stays bounded
+    """
+
+    def __init__(self, max_fingerprints: int):
+        self.max_fingerprints = max_fingerprints
+        # raw query -> (fingerprint, normalized)
+        self._normalized: Dict[str, Tuple[str, str]] = {}
+        # fingerprint -> [count, total_seconds, max_seconds, errors, slow, operation, normalized]
+        self._stats: Dict[str, list] = {}
+
+    def fingerprint(self, query: str) -> Tuple[str, str]:
+        """(fingerprint, normalized text) of a query"""
+        cached = self._normalized.get(query)
+        if cached is not None:
+            return cached
+
+        normalized = normalize_sql(query)
+        cached = (hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized)
+        # Generated SQL could vary without bound: start over rather than grow
+        if len(self._normalized) >= self.max_fingerprints * 4:
+            self._normalized.clear()
+        self._normalized[query] = cached
+        return cached
+
+    def record(self, operation: str, query: str, seconds: float, failed: bool, slow: bool) -> str:
+        """Add a call and return its fingerprint"""
+        key, normalized = self.fingerprint(query)
+        entry = self._stats.get(key)
+        if entry is None:
+            if len(self._stats) >= self.max_fingerprints:
+                key, normalized, operation = OTHER, "(other statements)", "mixed"
+                entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = [0, 0.0, 0.0, 0, 0, operation, normalized]
+
+        entry[0] += 1
+        entry[1] += seconds
+        if seconds > entry[2]:
+            entry[2] = seconds
+        if failed:
+            entry[3] += 1
+        if slow:
+            entry[4] += 1
+        return key
+
+    def top(self, limit: int, order: str = "total") -> List[dict]:
+        """The `limit` fingerprints with the highest total, max, mean duration or count"""
+        sort_keys = {
+            "total": lambda entry: entry[1],
+            "max": lambda entry: entry[2],
+            "mean": lambda entry: entry[1] / entry[0],
+            "count": lambda entry: entry[0],
+        }
+        ranked = sorted(self._stats.items(), key=lambda item: sort_keys[order](item[1]), reverse=True)
+        return [
+            {
+                "fingerprint": key,
+                "operation": operation,
+                "query": normalized,
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total / count * 1000, 3),
+                "max_ms": round(maximum * 1000, 3),
+                "errors": errors,
+                "slow": slow,
+            }
+            for key, (count, total, maximum, errors, slow, operation, normalized) in ranked[:limit]
+        ]
+
+    def snapshot(self, limit: int, order: str = "total", threshold_ms: Optional[float] = None) -> dict:
+        """Top fingerprints plus totals, for the admin endpoint"""
+        return {
+            "fingerprints": len(self._stats),
+            "calls": sum(entry[0] for entry in self._stats.values()),
+            "slow_threshold_ms": threshold_ms,
+            "queries": self.top(limit, order),
+        }
+
+    def clear(self) -> None:
+        self._stats.clear()
+
+
+query_stats = QueryStats(settings.SLOW_QUERY_MAX_FINGERPRINTS)
@@ -33,6 +33,16 @@ CREATE TABLE IF NOT EXISTS urls (
 CREATE INDEX IF NOT EXISTS idx_short_code 
 ON urls(short_code) WHERE is_active = TRUE;
 
+-- Index for a user's URLs (counts, quota checks and dashboard pages, newest first)
+CREATE INDEX IF NOT EXISTS idx_urls_user_created
+ON urls(user_id, created_at DESC);
+
+-- Digest of the normalized original_url, for opt-in per-user deduplication
+ALTER TABLE urls ADD COLUMN IF NOT EXISTS url_hash BYTEA;
+
+CREATE INDEX IF NOT EXISTS idx_urls_user_url_hash
+ON urls(user_id, url_hash) WHERE url_hash IS NOT NULL AND is_active = TRUE;
+
 -- Index for guest UUID lookups
 CREATE INDEX IF NOT EXISTS idx_guest_uuid 
 ON users(guest_uuid) WHERE user_type = 'guest';
@@ -53,3 +63,75 @@ CREATE TABLE IF NOT EXISTS url_access_history (
 -- Index for fast lookups by URL
 CREATE INDEX IF NOT EXISTS idx_url_access_history_url_id 
 ON url_access_history(url_id);
+
+-- Unique visitor sketches (HyperLogLog registers) per URL and UTC day
+CREATE TABLE IF NOT EXISTS url_visitor_sketches (
+    url_id INTEGER REFERENCES urls(id) ON DELETE CASCADE,
+    bucket_date DATE NOT NULL,
+    registers BYTEA NOT NULL,
+    PRIMARY KEY (url_id, bucket_date)
+);
+
+-- Change notifications (workers LISTEN to evict cached entries)
+-- Click counter updates do not notify, only changes that affect redirects
+CREATE OR REPLACE FUNCTION notify_url_change() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('url_changes', OLD.short_code);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_user_change() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify(
+        'user_changes',
+        json_build_object('id', OLD.id, 'guest_uuid', OLD.guest_uuid)::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'urls_notify_update') THEN
+        CREATE TRIGGER urls_notify_update
+        AFTER UPDATE ON urls
+        FOR EACH ROW
+        WHEN (
+            OLD.short_code IS DISTINCT FROM NEW.short_code OR
+            OLD.original_url IS DISTINCT FROM NEW.original_url OR
+            OLD.is_active IS DISTINCT FROM NEW.is_active OR
+            OLD.is_private IS DISTINCT FROM NEW.is_private OR
+            OLD.expires_at IS DISTINCT FROM NEW.expires_at
+        )
+        EXECUTE FUNCTION notify_url_change();
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'urls_notify_delete') THEN
+        CREATE TRIGGER urls_notify_delete
+        AFTER DELETE ON urls
+        FOR EACH ROW
+        EXECUTE FUNCTION notify_url_change();
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'users_notify_update') THEN
+        CREATE TRIGGER users_notify_update
+        AFTER UPDATE ON users
+        FOR EACH ROW
+        WHEN (
+            OLD.username IS DISTINCT FROM NEW.username OR
+            OLD.email IS DISTINCT FROM NEW.email OR
+            OLD.user_type IS DISTINCT FROM NEW.user_type OR
+            OLD.guest_uuid IS DISTINCT FROM NEW.guest_uuid OR
+            OLD.is_active IS DISTINCT FROM NEW.is_active
+        )
+        EXECUTE FUNCTION notify_user_change();
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'users_notify_delete') THEN
+        CREATE TRIGGER users_notify_delete
+        AFTER DELETE ON users
+        FOR EACH ROW
+        EXECUTE FUNCTION notify_user_change();
+    END IF;
+END $$;
@@ -1,24 +1,89 @@
-from fastapi import FastAPI
+import math
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
-from database import db
+from database import db, change_listener, admission, DatabaseUnavailableError
+from repositories import storage
 from routes import auth_router, urls_router
 from routes.admin import router as admin_router
+from services.redirect_cache import redirect_cache
+from services.cache_warmup import cache_warmup
+from services.visitor_stats import visitor_stats
+from services.hot_links import hot_links
+from services.guest_service import guest_cache, evict_guest_from_cache
+from services.health import readiness_check
+from services.profiler import profile_store
+from middleware.metrics import MetricsMiddleware
+from middleware.profiling import ProfilingMiddleware
+from middleware.access_log import AccessLogMiddleware
+from utils.event_log import event_log
+from utils.metrics import registry, CONTENT_TYPE
 from config import settings
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
-    # Startup
-    await db.connect()
-    print("✅ Database connected")
+    # Startup (events are written directly until the log writer runs)
+    await event_log.start(settings.LOG_FLUSH_SECONDS)
+    
+    await storage.connect()
+    event_log.log("storage_connected", backend=storage.name)
+    
+    if settings.SHARED_CACHE_ENABLED:
+        try:
+            redirect_cache.open_shared(
+                settings.SHARED_CACHE_PATH,
+                settings.SHARED_CACHE_MAX_MB * 1024 * 1024,
+                settings.SHARED_CACHE_TTL_SECONDS
+            )
+            event_log.log("shared_cache_attached")
+        except (OSError, RuntimeError, ValueError) as e:
+            event_log.log("shared_cache_disabled", "warning", error=str(e))
+    
+    # Other workers' writes are only visible through Postgres notifications
+    if settings.CACHE_INVALIDATION_ENABLED and storage.supports_notifications:
+        # A reconnect only drops this worker's layer, so a database blip does
+        # not make every worker wipe the shared table
+        change_listener.subscribe("url_changes", redirect_cache.evict, redirect_cache.clear_local)
+        change_listener.subscribe("user_changes", evict_guest_from_cache, guest_cache.clear)
+        await change_listener.start()
+    
+    if settings.VISITOR_STATS_ENABLED:
+        await visitor_stats.start(settings.VISITOR_STATS_FLUSH_SECONDS)
+    
+    if settings.PROFILING_ENABLED and settings.PROFILING_SHARED_ENABLED:
+        try:
+            profile_store.open_shared(settings.PROFILING_SHARED_DIR)
+        except OSError as e:
+            event_log.log("profile_sharing_disabled", "warning", error=str(e))
+    
+    if settings.HOT_LINKS_ENABLED and settings.HOT_LINKS_SHARED_ENABLED:
+        try:
+            await hot_links.start_publishing(settings.HOT_LINKS_SHARED_DIR, settings.HOT_LINKS_PUBLISH_SECONDS)
+        except OSError as e:
+            event_log.log("hot_links_sharing_disabled", "warning", error=str(e))
+    
+    # Runs before the server accepts requests, bounded by its time budget
+    if settings.WARMUP_ENABLED:
+        await cache_warmup.run(
+            min(settings.WARMUP_TOP_N, settings.REDIRECT_CACHE_MAX_ENTRIES),
+            settings.WARMUP_BATCH_SIZE,
+            settings.WARMUP_TIME_BUDGET_SECONDS,
+            settings.WARMUP_ORDER
+        )
     
     yield
     
     # Shutdown
-    await db.disconnect()
-    print("👋 Database disconnected")
+    await visitor_stats.stop()
+    await hot_links.stop_publishing()
+    await change_listener.stop()
+    redirect_cache.close_shared()
+    await storage.disconnect()
+    event_log.log("storage_disconnected")
+    await event_log.stop()
 
 
 # Create FastAPI app
@@ -38,12 +103,88 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Inside metrics, so profiled requests are still counted
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Inside metrics, so the request's database time is known
+if settings.ACCESS_LOG_ENABLED:
+    app.add_middleware(AccessLogMiddleware)
+
+# Outermost, so CORS and error handling are included in the latency
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(DatabaseUnavailableError)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailableError):
+    """Database down (or the endpoint class overloaded) and nothing cached to serve: ask the client to retry"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Service temporarily unavailable"},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy"}
+    """Health check endpoint (degraded while the database circuit is open)"""
+    breaker = storage.breaker.snapshot()
+    return {
+        "status": "healthy" if breaker["state"] == "closed" else "degraded",
+        "database_circuit": breaker["state"],
+        "warmup": cache_warmup.state
+    }
+
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the worker's event loop answers (no dependency checks)"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness(response: Response):
+    """
+    Readiness probe: 503 while this worker should not receive traffic
+    (slow to hand out a connection, background writers stuck, cache
+    warm-up running); cached briefly. A database outage only makes it
+    "degraded" (200) while stale redirects can be served
+    """
+    result = await readiness_check.check()
+    if result["status"] == "not_ready":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return result
+
+
+# Sampled on each scrape
+db_pool_connections = registry.gauge("db_pool_connections", "Database pool connections by state", ("state",))
+db_circuit_open = registry.gauge("db_circuit_open", "1 while the database circuit breaker is not closed")
+redirect_cache_entries = registry.gauge("redirect_cache_entries", "Entries in this worker's redirect cache")
+log_queue_events = registry.gauge("log_queue_events", "Log events waiting to be written")
+admission_in_flight = registry.gauge("admission_in_flight", "Requests holding an admission slot by endpoint class", ("class",))
+admission_queued = registry.gauge("admission_queued", "Requests waiting for an admission slot by endpoint class", ("class",))
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics of this worker"""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    
+    if db.pool is not None:
+        idle = db.pool.get_idle_size()
+        db_pool_connections.set(idle, ("idle",))
+        db_pool_connections.set(db.pool.get_size() - idle, ("busy",))
+    db_circuit_open.set(0 if storage.breaker.is_closed else 1)
+    redirect_cache_entries.set(len(redirect_cache))
+    log_queue_events.set(len(event_log))
+    for name, limiter in admission.items():
+        admission_in_flight.set(limiter.active, (name,))
+        admission_queued.set(limiter.queued, (name,))
+    
+    return Response(registry.render(), media_type=CONTENT_TYPE)
 
 
 # Include routers
@@ -52,11 +193,12 @@ app.include_router(urls_router)
 app.include_router(admin_router)
 
 
+# Development server (single process); production: python serve.py
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
         reload=settings.DEBUG
     )
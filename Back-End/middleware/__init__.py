@@ -1,3 +1,6 @@
-from .auth import get_current_user_from_cookie, get_optional_user_from_cookie
+from .auth import get_current_user_from_cookie, get_optional_user_from_cookie, get_redirect_user
+from .rate_limit import rate_limit
+from .admission import admission_control
+from .visitor import get_visitor_fingerprint
 
-__all__ = ["get_current_user_from_cookie", "get_optional_user_from_cookie"]
+__all__ = ["get_current_user_from_cookie", "get_optional_user_from_cookie", "get_redirect_user", "rate_limit", "admission_control", "get_visitor_fingerprint"]
@@ -0,0 +1,71 @@
+import random
+import time
+from config import settings
+from database.instrumentation import request_context
+from utils.event_log import event_log
+from .metrics import UNMATCHED_ROUTE
+
+
+# Route template of the short link redirect (sampled)
+REDIRECT_ROUTE = "/{short_code}"
+
+
+class AccessLogMiddleware:
+    """
+    Pure ASGI middleware queueing one structured event per request
+    Redirects are logged as "redirect" events for a sampled fraction
+    (ACCESS_LOG_REDIRECT_SAMPLE_RATE, recorded in each event so counts can
+    be scaled back); other requests and failed redirects are always logged
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = 500
+        
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._log(scope, status, time.perf_counter() - start)
+    
+    @staticmethod
+    def _log(scope: dict, status: int, elapsed: float) -> None:
+        route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+        fields = {
+            "method": scope["method"],
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 3),
+        }
+        # Set by the metrics middleware
+        context = request_context.get()
+        if context is not None:
+            fields["db_ms"] = round(context.db_time * 1000, 3)
+        
+        if route == REDIRECT_ROUTE and status < 500:
+            rate = settings.ACCESS_LOG_REDIRECT_SAMPLE_RATE
+            if rate < 1 and random.random() >= rate:
+                return
+            event_log.log("redirect", short_code=scope["path"][1:], sample_rate=rate, **fields)
+            return
+        
+        client = scope.get("client")
+        event_log.log(
+            "request",
+            "error" if status >= 500 else "info",
+            path=scope["path"],
+            route=route,
+            client=client[0] if client else None,
+            **fields
+        )
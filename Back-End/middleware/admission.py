@@ -0,0 +1,16 @@
+from database.admission import admission
+
+
+def admission_control(group: str):
+    """
+    Dependency factory holding a slot of an endpoint class for the request
+    Use in the route `dependencies`, after rate_limit
+    Raises OverloadedError (503 with Retry-After) when the class is saturated
+    """
+    limiter = admission[group]
+    
+    async def dependency():
+        async with limiter.slot():
+            yield
+    
+    return dependency
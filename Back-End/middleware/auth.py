@@ -3,6 +3,8 @@ from typing import Optional
 from models import User
 from utils import decode_access_token, create_access_token
 from services import auth_service
+from database import DatabaseUnavailableError, OverloadedError, admission
+from repositories import storage
 from config import settings
 from datetime import timedelta
 
@@ -70,3 +72,23 @@ async def get_optional_user_from_cookie(request: Request, response: Response) ->
         return await get_current_user_from_cookie(request, response)
     except HTTPException:
         return None
+
+
+async def get_redirect_user(request: Request, response: Response) -> Optional[User]:
+    """
+    Session user for private redirects
+    None (unverifiable) while the database circuit is open or the lookup
+    fails, so degraded redirects answer 'unauthorized' instead of an error.
+    The lookup holds a redirect slot and, when they are saturated, raises
+    OverloadedError (503 with Retry-After)
+    """
+    if not request.cookies.get("access_token") or not storage.breaker.is_closed:
+        return None
+    
+    try:
+        async with admission["redirect"].slot():
+            return await get_optional_user_from_cookie(request, response)
+    except OverloadedError:
+        raise
+    except DatabaseUnavailableError:
+        return None
@@ -0,0 +1,68 @@
+import time
+from database.instrumentation import RequestContext, request_context
+from utils.metrics import registry
+
+
+# Requests that matched no route share one label (no per-path series)
+UNMATCHED_ROUTE = "<unmatched>"
+
+requests_total = registry.counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code",
+    ("method", "route", "status")
+)
+request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route")
+)
+request_db_duration = registry.histogram(
+    "http_request_db_duration_seconds",
+    "Database time spent per HTTP request by route template",
+    ("method", "route")
+)
+requests_in_flight = registry.gauge(
+    "http_requests_in_flight",
+    "HTTP requests being handled"
+)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, database time, status codes and
+    in-flight requests per route template (/{short_code}, not each code)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        context = RequestContext(scope)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = request_context.set(context)
+        requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            requests_in_flight.dec()
+            request_context.reset(token)
+
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", UNMATCHED_ROUTE))
+            request_duration.observe(elapsed, labels)
+            request_db_duration.observe(context.db_time, labels)
+            requests_total.inc(labels + (str(status),))
@@ -0,0 +1,82 @@
+import random
+import time
+from config import settings
+from services.profiler import CapturedProfile, profile_store
+from .metrics import UNMATCHED_ROUTE
+
+
+# Request header that asks for a profile (with X-Admin-Key)
+PROFILE_HEADER = b"x-profile"
+ADMIN_KEY_HEADER = b"x-admin-key"
+# Response header telling the caller where to download the profile
+PROFILE_ID_HEADER = b"x-profile-id"
+
+
+def _trigger(scope: dict) -> str:
+    """Why this request should be profiled ('header' or 'sample'), or ''"""
+    requested = admin_key = None
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            requested = value
+        elif name == ADMIN_KEY_HEADER:
+            admin_key = value
+    if requested and requested not in (b"0", b"false") and admin_key is not None:
+        if admin_key.decode("latin-1") == settings.SECRET_KEY:
+            return "header"
+    
+    if settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+        return "sample"
+    return ""
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware running cProfile on selected requests: those sent
+    with X-Profile: 1 and a valid X-Admin-Key, plus a PROFILING_SAMPLE_RATE
+    fraction of all requests; profiles go to the profile store and their id
+    is returned in X-Profile-Id
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        trigger = _trigger(scope)
+        # Skipped while another request is being profiled
+        profile = profile_store.start() if trigger else None
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+        
+        profile_id = profile_store.next_id()
+        status = 500
+        
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(PROFILE_ID_HEADER, profile_id.encode())]
+            await send(message)
+        
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats = profile_store.finish(profile)
+            
+            route = scope.get("route")
+            await profile_store.add(CapturedProfile(
+                profile_id,
+                scope["method"],
+                scope["path"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status,
+                round(elapsed * 1000, 3),
+                trigger,
+                stats
+            ))
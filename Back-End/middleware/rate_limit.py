@@ -0,0 +1,73 @@
+import math
+from fastapi import Request, HTTPException, status
+from config import settings
+from utils import decode_access_token
+from utils.rate_limit import RateLimiter, parse_rate
+
+
+# Route groups and their configured limits
+_limiters = {
+    group: RateLimiter(*parse_rate(rate), max_keys=settings.RATE_LIMIT_MAX_KEYS)
+    for group, rate in {
+        "redirect": settings.RATE_LIMIT_REDIRECT,
+        "resolve": settings.RATE_LIMIT_RESOLVE,
+        "create": settings.RATE_LIMIT_CREATE,
+        "bulk": settings.RATE_LIMIT_BULK,
+        "guest": settings.RATE_LIMIT_GUEST,
+    }.items()
+}
+
+
+def get_client_ip(request: Request) -> str:
+    """
+    Client IP, taken from X-Forwarded-For when behind trusted proxies
+    Each of the RATE_LIMIT_FORWARDED_HOPS proxies appends the address it
+    received the request from, so the client is that many entries from the
+    right; entries further left are sent by the client and can be forged
+    """
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            entries = [entry.strip() for entry in forwarded.split(",")]
+            hops = max(settings.RATE_LIMIT_FORWARDED_HOPS, 1)
+            return entries[max(len(entries) - hops, 0)]
+    
+    return request.client.host if request.client else "unknown"
+
+
+def get_rate_limit_key(request: Request, by_user: bool = True) -> str:
+    """
+    Rate limit key: user ID from a valid session cookie, client IP otherwise
+    Only decodes the token, no database access
+    """
+    if by_user:
+        token = request.cookies.get("access_token")
+        payload = decode_access_token(token) if token else None
+        if payload and payload.get("sub"):
+            return f"user:{payload['sub']}"
+    
+    return f"ip:{get_client_ip(request)}"
+
+
+def rate_limit(group: str, by_user: bool = True):
+    """
+    Dependency factory enforcing the rate limit of a route group
+    Use in the route `dependencies` so it runs before any database work
+    Raises 429 with Retry-After when the limit is exceeded
+    Counters live in this worker, so with N workers the limit is per worker
+    """
+    limiter = _limiters[group]
+    
+    async def dependency(request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        
+        retry_after = limiter.hit(get_rate_limit_key(request, by_user))
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+    
+    return dependency
@@ -0,0 +1,26 @@
+import hashlib
+import hmac
+from fastapi import Request
+from config import settings
+from utils import decode_access_token
+from .rate_limit import get_client_ip
+
+
+# Keyed so fingerprints can't be reversed to IPs by brute force
+_FINGERPRINT_KEY = hashlib.sha256(f"visitor:{settings.SECRET_KEY}".encode()).digest()
+
+
+def get_visitor_fingerprint(request: Request) -> bytes:
+    """
+    Anonymous visitor identity for unique-visitor counting
+    User ID from a valid session cookie, keyed hash of IP + User-Agent otherwise
+    Only decodes the token, no database access
+    """
+    token = request.cookies.get("access_token")
+    payload = decode_access_token(token) if token else None
+    if payload and payload.get("sub"):
+        identity = f"user:{payload['sub']}"
+    else:
+        identity = f"ip:{get_client_ip(request)}|ua:{request.headers.get('user-agent', '')}"
+    
+    return hmac.new(_FINGERPRINT_KEY, identity.encode(), hashlib.sha256).digest()
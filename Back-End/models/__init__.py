@@ -1,5 +1,8 @@
 from .user import User, UserCreate, UserLogin, UserResponse, GuestCreate, MigrateGuestUser
-from .url import URL, URLCreate, URLUpdate, URLResponse, URLBulkCreate, URLBulkItem, URLAccessHistory
+from .url import (
+    URL, URLCreate, URLUpdate, URLResponse, URLBulkItem, URLAccessHistory, RedirectRecord,
+    URLResolveRequest, URLResolveResult
+)
 from .token import Token, TokenData
 
 __all__ = [
@@ -13,9 +16,11 @@ __all__ = [
     "URLCreate",
     "URLUpdate",
     "URLResponse",
-    "URLBulkCreate",
     "URLBulkItem",
     "URLAccessHistory",
+    "RedirectRecord",
+    "URLResolveRequest",
+    "URLResolveResult",
     "Token",
     "TokenData",
 ]
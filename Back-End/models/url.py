@@ -1,6 +1,6 @@
 from pydantic import BaseModel, HttpUrl, field_validator
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Literal
+from datetime import datetime, timezone
 
 
 class URLBase(BaseModel):
@@ -18,6 +18,8 @@ class URLBase(BaseModel):
 class URLCreate(URLBase):
     """URL creation model"""
     is_private: bool = False
+    # Return the user's existing URL for the same target instead of a new one
+    dedupe: bool = False
 
 
 class URLBulkItem(BaseModel):
@@ -33,20 +35,27 @@ class URLBulkItem(BaseModel):
         return v
 
 
-class URLBulkCreate(BaseModel):
-    """Bulk URL creation model"""
-    urls: List[URLBulkItem]
+class URLResolveRequest(BaseModel):
+    """Batch resolve request model"""
+    short_codes: List[str]
     
-    @field_validator('urls')
+    @field_validator('short_codes')
     @classmethod
-    def validate_urls_list(cls, v):
+    def validate_short_codes(cls, v):
         if not v:
-            raise ValueError('URLs list cannot be empty')
+            raise ValueError('Short codes list cannot be empty')
         if len(v) > 100:
-            raise ValueError('Cannot create more than 100 URLs at once')
+            raise ValueError('Cannot resolve more than 100 short codes at once')
         return v
 
 
+class URLResolveResult(BaseModel):
+    """Result for a single short code in a batch resolve"""
+    short_code: str
+    status: Literal['ok', 'not_found', 'unauthorized', 'guest_forbidden']
+    original_url: Optional[str] = None
+
+
 class URLAccessHistory(BaseModel):
     """URL access history model"""
     user_email: str
@@ -103,3 +112,48 @@ class URL(URLBase):
         from_attributes = True
         extra = 'allow'  # Permite atributos adicionales dinámicos
 
+
+class RedirectRecord:
+    """
+    Compact record with only the fields needed to resolve a redirect.
+    Uses __slots__ instead of a pydantic model to keep hot cache entries
+    small and cheap to build from a database row.
+    """
+
+    __slots__ = ("id", "original_url", "is_private", "is_active", "expires_at")
+
+    def __init__(
+        self,
+        id: int,
+        original_url: str,
+        is_private: bool,
+        is_active: bool,
+        expires_at: Optional[datetime] = None
+    ):
+        self.id = id
+        self.original_url = original_url
+        self.is_private = is_private
+        self.is_active = is_active
+        self.expires_at = expires_at
+
+    @classmethod
+    def from_row(cls, row) -> "RedirectRecord":
+        """Build a record from a database row with the redirect projection"""
+        return cls(row['id'], row['original_url'], row['is_private'], row['is_active'], row['expires_at'])
+
+    def seconds_until_expiry(self) -> Optional[float]:
+        """
+        Seconds until expires_at (negative if already expired)
+        Returns None when the URL never expires
+        """
+        if self.expires_at is None:
+            return None
+
+        expires_at = self.expires_at
+        if expires_at.tzinfo is None:
+            # TIMESTAMP columns are stored in UTC without timezone
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return (expires_at - datetime.now(timezone.utc)).total_seconds()
+
+    def __repr__(self) -> str:
+        return f"RedirectRecord(id={self.id!r}, original_url={self.original_url!r})"
@@ -0,0 +1,63 @@
+"""
+Benchmark of access token verification with and without the token cache
+
+Measures decode_access_token for a full python-jose verification (cache
+miss) and for a cached token, plus create_access_token, in microseconds
+per call.
+
+Usage (from Back-End/, SECRET_KEY and DATABASE_URL set as for the app):
+    python perf/bench_tokens.py --iterations 20000
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import security
+
+
+def per_call_us(func, iterations: int, repeat: int) -> float:
+    """Best of `repeat` runs, in microseconds per call"""
+    return min(timeit.repeat(func, number=iterations, repeat=repeat)) / iterations * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    claims = {"sub": "42", "username": "bench"}
+    token = security.create_access_token(claims)
+
+    def miss():
+        security.token_cache.clear()
+        security.decode_access_token(token)
+
+    def clear_only():
+        security.token_cache.clear()
+
+    def hit():
+        security.decode_access_token(token)
+
+    def create():
+        security.create_access_token(claims)
+
+    # Subtract the cost of clearing the cache from the miss measurement
+    clear_us = per_call_us(clear_only, args.iterations, args.repeat)
+    miss_us = per_call_us(miss, args.iterations, args.repeat) - clear_us
+    security.decode_access_token(token)
+    hit_us = per_call_us(hit, args.iterations, args.repeat)
+    create_us = per_call_us(create, args.iterations, args.repeat)
+
+    print(f"decode, full verification: {miss_us:8.2f} us/call")
+    print(f"decode, cached:            {hit_us:8.2f} us/call")
+    print(f"saved per request:         {miss_us - hit_us:8.2f} us ({miss_us / hit_us:.1f}x faster)")
+    print(f"create_access_token:       {create_us:8.2f} us/call")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
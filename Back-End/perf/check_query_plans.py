@@ -0,0 +1,286 @@
+"""
+Query plan regression check for the service SQL
+
+Seeds a local Postgres with realistic volumes, runs the hot service
+methods once (inside a transaction that is rolled back), captures every
+statement they send and runs EXPLAIN (FORMAT JSON) on it with the same
+arguments. Fails when a plan uses a sequential scan on a large table or
+its estimated cost grows beyond the baseline.
+
+Usage (from Back-End/, against a disposable database):
+    DATABASE_URL=postgresql://... python perf/check_query_plans.py --seed
+    python perf/check_query_plans.py --update-baseline
+
+Also run by the test suite (tests/test_query_plans.py) when
+PERF_DATABASE_URL points to a disposable database.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import asyncpg
+from config import settings
+from database import db
+from models import URLCreate, URLUpdate, GuestCreate, MigrateGuestUser, UserLogin
+from services import url_service, registered_user_service, auth_service, guest_service
+from services.guest_service import guest_cache
+from services.redirect_cache import redirect_cache
+from services.visitor_stats import visitor_stats
+from utils.hyperloglog import HyperLogLog
+from utils.security import get_password_hash
+
+
+BASELINE_PATH = Path(__file__).parent / "query_plans_baseline.json"
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "database" / "schema.sql"
+
+# Statements allowed to scan a large table (substring -> reason), none so far
+# The startup warm-up top-N by clicks is intentionally unindexed but needs
+# no entry: it is not part of the scenario (server-side cursors bypass the
+# query logger)
+ALLOWED_SEQ_SCANS = {}
+
+# asyncpg's own type introspection and settings queries
+_DRIVER_QUERIES = re.compile(r"typeinfo_tree|'jit'")
+
+# Seeded registered users log in with this password
+SEED_PASSWORD = "perf-password"
+
+# (statement, parameters): users, guests and urls are the seed volumes
+SEED_STATEMENTS = [
+    ('''
+    INSERT INTO users (username, email, hashed_password, user_type)
+    SELECT 'perf_user_' || i, 'perf_' || i || '@example.com', $2, 'registered'
+    FROM generate_series(1, $1::int) AS i
+    ''', ("users", "password_hash")),
+    ('''
+    INSERT INTO users (username, user_type, guest_uuid)
+    SELECT 'perf_guest_' || i, 'guest', gen_random_uuid()
+    FROM generate_series(1, $1::int) AS i
+    ''', ("guests",)),
+    ('''
+    INSERT INTO urls (short_code, original_url, user_id, clicks, is_private,
+                      created_at, updated_at, expires_at, url_hash)
+    SELECT 'p' || to_hex(i),
+           'https://example.com/perf/' || i,
+           u.id,
+           (random() * 1000)::int,
+           u.user_type = 'registered' AND i % 10 = 0,
+           NOW() - random() * INTERVAL '365 days',
+           NOW() - random() * INTERVAL '30 days',
+           CASE WHEN u.user_type = 'guest' THEN NOW() + (random() * 14 - 7) * INTERVAL '1 day' END,
+           decode(md5('https://example.com/perf/' || i), 'hex')
+    FROM generate_series(1, $3::int) AS i
+    JOIN users u ON u.username = CASE
+        WHEN i % 5 = 0 THEN 'perf_guest_' || (i % $2::int + 1)
+        ELSE 'perf_user_' || (i % $1::int + 1)
+    END
+    ''', ("users", "guests", "urls")),
+    ('''
+    INSERT INTO url_access_history (url_id, user_email, user_type, accessed_at)
+    SELECT id, 'perf_1@example.com', 'registered', NOW() - random() * INTERVAL '30 days'
+    FROM urls, generate_series(1, 3)
+    WHERE is_private AND short_code LIKE 'p%'
+    ''', ()),
+    ('''
+    INSERT INTO url_visitor_sketches (url_id, bucket_date, registers)
+    SELECT id, CURRENT_DATE - d, decode(repeat('00', 2048), 'hex')
+    FROM urls, generate_series(0, 6) AS d
+    WHERE id % 20 = 0 AND short_code LIKE 'p%'
+    ON CONFLICT DO NOTHING
+    ''', ()),
+]
+
+
+class _SingleConnectionPool:
+    """Pool stand-in that hands out one connection (kept inside a transaction)"""
+
+    def __init__(self, conn: asyncpg.Connection):
+        self._conn = conn
+
+    def acquire(self, timeout=None):
+        return self
+
+    async def __aenter__(self):
+        return self._conn
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def fingerprint(query: str) -> str:
+    """Stable id of a statement (whitespace-insensitive)"""
+    normalized = re.sub(r"\s+", " ", query).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def summary(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip()[:100]
+
+
+async def seed(conn: asyncpg.Connection, scale: float) -> None:
+    if await conn.fetchval("SELECT EXISTS(SELECT 1 FROM users WHERE username = 'perf_user_1')"):
+        print("Seed data already present")
+        return
+
+    values = {
+        "users": int(5_000 * scale),
+        "guests": int(20_000 * scale),
+        "urls": int(500_000 * scale),
+        "password_hash": get_password_hash(SEED_PASSWORD),
+    }
+    print(f"Seeding {values['users']} users, {values['guests']} guests, {values['urls']} URLs...")
+    async with conn.transaction():
+        for statement, params in SEED_STATEMENTS:
+            await conn.execute(statement, *(values[name] for name in params))
+    # Vacuum too: index-only scan costs depend on the visibility map, which
+    # a freshly loaded table lacks until autovacuum gets to it
+    await conn.execute("VACUUM ANALYZE")
+
+
+async def run_scenario(conn: asyncpg.Connection) -> list:
+    """Call the hot service methods once and return the statements they sent"""
+    sample = await conn.fetchrow('''
+        SELECT u.id, u.short_code, u.original_url, u.user_id, users.email
+        FROM urls u JOIN users ON users.id = u.user_id
+        WHERE users.username = 'perf_user_2'
+        ORDER BY u.id LIMIT 1
+    ''')
+    guest = await conn.fetchrow("SELECT id, guest_uuid FROM users WHERE username = 'perf_guest_1'")
+    codes = [row['short_code'] for row in await conn.fetch("SELECT short_code FROM urls WHERE short_code LIKE 'p%' LIMIT 50")]
+
+    captured = {}
+
+    def log_query(record):
+        query = record.query
+        if _DRIVER_QUERIES.search(query):
+            return
+        if re.match(r"\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", query, re.IGNORECASE):
+            captured.setdefault(fingerprint(query), (query, record.args))
+
+    redirect_cache.clear()
+    guest_cache.clear()
+    user_id, url_id = sample['user_id'], sample['id']
+
+    conn.add_query_logger(log_query)
+    try:
+        await url_service.get_redirect_record(sample['short_code'])
+        await url_service.get_redirect_records(codes)
+        await url_service.get_url_by_short_code(sample['short_code'])
+        await url_service.increment_clicks(sample['short_code'])
+        await url_service.get_user_urls_state(user_id, True)
+        await url_service.get_user_urls(user_id, 0, True)
+        await url_service.get_url_by_id(url_id, user_id)
+        await url_service.find_duplicate_url(user_id, sample['original_url'], False)
+        await url_service.find_duplicate_urls(user_id, [(sample['original_url'], False)])
+        await url_service.record_url_access(url_id, sample['email'], 'registered')
+        await url_service.record_url_accesses([url_id], sample['email'], 'registered')
+        await url_service.create_url(URLCreate(original_url="https://example.com/perf/new"), user_id)
+        await url_service.create_urls_bulk([("https://example.com/perf/bulk", False), ("https://example.com/perf/bulk2", True)], user_id)
+        await url_service.update_url(url_id, user_id, URLUpdate(original_url="https://example.com/perf/updated"))
+        await url_service.delete_url(url_id, user_id)
+        await registered_user_service.get_url_count(user_id)
+        await auth_service.get_user_by_id(user_id)
+        await auth_service.authenticate_user(UserLogin(email=sample['email'], password=SEED_PASSWORD))
+        await guest_service.get_guest_by_uuid(guest['guest_uuid'])
+        await guest_service.create_guest_user(GuestCreate(uuid=uuid.uuid4()))
+        await guest_service.migrate_guest_to_registered(
+            guest['id'],
+            MigrateGuestUser(username="perf_migrated", email="perf_migrated@example.com", password="perf-password")
+        )
+        await guest_service.cleanup_expired_urls()
+        # Twice: insert of a new bucket, then lock and merge of the existing one
+        sketches = {(url_id + 1, datetime.now(timezone.utc).date()): HyperLogLog()}
+        await visitor_stats._write(sketches)
+        await visitor_stats._write(sketches)
+        await visitor_stats.get_stats(url_id + 1, 30)
+    finally:
+        conn.remove_query_logger(log_query)
+
+    return list(captured.values())
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def check(args) -> int:
+    conn = await asyncpg.connect(settings.DATABASE_URL)
+    try:
+        await conn.execute(SCHEMA_PATH.read_text(encoding="utf-8"))
+        if args.seed:
+            await seed(conn, args.scale)
+
+        large_tables = {
+            row['relname'] for row in await conn.fetch(
+                "SELECT relname FROM pg_class WHERE relkind = 'r' AND reltuples >= $1", args.min_rows
+            )
+        }
+
+        baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        results = {}
+        failures = []
+
+        db.pool = _SingleConnectionPool(conn)
+        transaction = conn.transaction()
+        await transaction.start()
+        try:
+            statements = await run_scenario(conn)
+            for query, query_args in statements:
+                key = fingerprint(query)
+                plan = json.loads(await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *query_args))[0]["Plan"]
+                cost = plan["Total Cost"]
+                results[key] = {"query": summary(query), "cost": cost}
+
+                seq_scans = {
+                    node["Relation Name"] for node in plan_nodes(plan)
+                    if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in large_tables
+                }
+                allowed = any(pattern in query for pattern in ALLOWED_SEQ_SCANS)
+                if seq_scans and not allowed:
+                    failures.append(f"Seq Scan on {', '.join(sorted(seq_scans))}: {summary(query)}")
+
+                previous = baseline.get(key, {}).get("cost")
+                if previous is not None and cost > previous * (1 + args.tolerance) and cost - previous > args.min_cost_delta:
+                    failures.append(f"Cost {previous:.1f} -> {cost:.1f}: {summary(query)}")
+
+                status = "FAIL" if (seq_scans and not allowed) else "ok"
+                print(f"{status:4} {cost:>12.2f}  {summary(query)}")
+        finally:
+            await transaction.rollback()
+            db.pool = None
+    finally:
+        await conn.close()
+
+    if args.update_baseline:
+        BASELINE_PATH.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+
+    print(f"\n{len(results)} statements checked, {len(failures)} problems")
+    for failure in failures:
+        print(f"  - {failure}")
+    return 1 if failures and not args.update_baseline else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="Insert perf_* users and URLs if missing")
+    parser.add_argument("--scale", type=float, default=1.0, help="Seed volume multiplier (1.0 = 500k URLs)")
+    parser.add_argument("--min-rows", type=int, default=10_000, help="Tables at least this large must not be seq scanned")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative cost growth over the baseline")
+    parser.add_argument("--min-cost-delta", type=float, default=10.0, help="Ignore cost growth smaller than this")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the current costs as the new baseline")
+    return asyncio.run(check(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
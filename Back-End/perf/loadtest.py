@@ -0,0 +1,429 @@
+"""
+HTTP load test of the API, in-process or through uvicorn
+
+Drives the ASGI app in-process (httpx ASGITransport, no network) or a
+local uvicorn started here (or any running server with --url), with a
+fixed number of requests per scenario at a given concurrency, and reports
+p50/p95/p99 latency and throughput. Results are saved as JSON so runs on
+different commits can be compared with --compare.
+
+Scenarios: redirect_public, redirect_private, create, bulk, list,
+list_history, guest, and mix (a weighted blend of all of them).
+
+Fixtures (users and their URLs) are created over HTTP before measuring.
+With Postgres, --seed-scale first adds background volume with the query
+plan checker's seed (1.0 = 500k URLs).
+
+Usage (from Back-End/, SECRET_KEY and DATABASE_URL set as for the app):
+    python perf/loadtest.py --storage memory
+    python perf/loadtest.py --target uvicorn --workers 4 --seed-scale 0.2
+    python perf/loadtest.py --compare perf/results/loadtest-abc1234-inprocess-memory.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from http.cookies import SimpleCookie
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+
+SCENARIOS = ["redirect_public", "redirect_private", "create", "bulk", "list", "list_history", "guest"]
+
+# Share of each scenario in the mix (mostly redirects, like production)
+MIX_WEIGHTS = {
+    "redirect_public": 70,
+    "redirect_private": 5,
+    "list": 8,
+    "list_history": 2,
+    "create": 8,
+    "bulk": 1,
+    "guest": 6,
+}
+
+REDIRECT_STATUSES = {301, 302, 307, 308}
+# Registered users can own this many URLs
+USER_URL_LIMIT = 100
+BULK_ROWS = 10
+PASSWORD = "loadtest-password"
+# Admission control may shed fixture setup under load; it is retried
+FIXTURE_RETRIES = 20
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def git_revision() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], cwd=BACKEND_DIR).returncode != 0
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def access_token(response: httpx.Response) -> str:
+    """Session cookie value from a login or guest response"""
+    for header in response.headers.get_list("set-cookie"):
+        cookie = SimpleCookie(header)
+        if "access_token" in cookie:
+            return cookie["access_token"].value
+    raise RuntimeError(f"No session cookie in response ({response.status_code}): {response.text[:200]}")
+
+
+class Fixtures:
+    """Users, sessions and short codes used by the scenarios"""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.tag = uuid.uuid4().hex[:8]
+        self.reader_cookie = ""
+        self.public_codes = []
+        self.private_codes = []
+        # Sessions with free URL slots for create and bulk: [cookie, remaining]
+        self.writers = []
+        self._users = 0
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        """POST, waiting out admission control rejections (503 with Retry-After)"""
+        for _ in range(FIXTURE_RETRIES):
+            response = await self.client.post(path, **kwargs)
+            if response.status_code != 503 or "retry-after" not in response.headers:
+                break
+            await asyncio.sleep(float(response.headers["retry-after"]))
+        response.raise_for_status()
+        return response
+
+    async def new_user(self) -> str:
+        """Register and log in a user, returning its Cookie header"""
+        self._users += 1
+        email = f"loadtest_{self.tag}_{self._users}@example.com"
+        await self.post("/auth/register", json={
+            "username": f"lt_{self.tag}_{self._users}", "email": email, "password": PASSWORD
+        })
+        response = await self.post("/auth/login", json={"email": email, "password": PASSWORD})
+        return f"access_token={access_token(response)}"
+
+    async def build(self, urls: int, creates: int, bulks: int) -> None:
+        # The reader owns the redirect targets (10% private) and the listed pages
+        self.reader_cookie = await self.new_user()
+        rows = [
+            {"url": f"https://example.com/loadtest/{self.tag}/{i}", "is_private": i % 10 == 0}
+            for i in range(urls)
+        ]
+        body = "\n".join(json.dumps(row) for row in rows)
+        response = await self.post(
+            "/urls/bulk",
+            files={"file": ("fixtures.ndjson", body, "application/x-ndjson")},
+            headers={"Cookie": self.reader_cookie}
+        )
+        for url in response.json()["urls"]:
+            (self.private_codes if url["is_private"] else self.public_codes).append(url["short_code"])
+
+        # Enough fresh users for every create and bulk request (plus one for leftovers)
+        slots = creates + bulks * BULK_ROWS
+        cookies = await asyncio.gather(*(self.new_user() for _ in range(-(-slots // USER_URL_LIMIT) + 1)))
+        self.writers = [[cookie, USER_URL_LIMIT] for cookie in cookies]
+
+        # Warm the reader's history
+        for code in self.private_codes[:5]:
+            await self.client.get(f"/{code}", headers={"Cookie": self.reader_cookie})
+
+    def writer(self, slots: int) -> str:
+        for session in self.writers:
+            if session[1] >= slots:
+                session[1] -= slots
+                return session[0]
+        raise RuntimeError("Out of fixture URL slots (increase the planned create/bulk requests)")
+
+
+def build_request(name: str, fixtures: Fixtures, rng: random.Random) -> tuple:
+    """(method, path, kwargs, expected statuses) of one request of a scenario"""
+    if name == "redirect_public":
+        return "GET", f"/{rng.choice(fixtures.public_codes)}", {}, REDIRECT_STATUSES
+    if name == "redirect_private":
+        cookie = {"Cookie": fixtures.reader_cookie}
+        return "GET", f"/{rng.choice(fixtures.private_codes)}", {"headers": cookie}, REDIRECT_STATUSES
+    if name == "create":
+        body = {"original_url": f"https://example.com/loadtest/new/{uuid.uuid4().hex}"}
+        return "POST", "/urls", {"json": body, "headers": {"Cookie": fixtures.writer(1)}}, {200}
+    if name == "bulk":
+        body = "\n".join(
+            json.dumps({"url": f"https://example.com/loadtest/bulk/{uuid.uuid4().hex}"}) for _ in range(BULK_ROWS)
+        )
+        files = {"file": ("bulk.ndjson", body, "application/x-ndjson")}
+        return "POST", "/urls/bulk", {"files": files, "headers": {"Cookie": fixtures.writer(BULK_ROWS)}}, {200}
+    if name == "list":
+        offset = rng.choice([0, 20, 40])
+        return "GET", f"/urls/me/all?offset={offset}", {"headers": {"Cookie": fixtures.reader_cookie}}, {200}
+    if name == "list_history":
+        return "GET", "/urls/me/all?with_history=true", {"headers": {"Cookie": fixtures.reader_cookie}}, {200}
+    if name == "guest":
+        return "POST", "/auth/guest", {"json": {"uuid": str(uuid.uuid4())}}, {200}
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+async def run_scenario(client, fixtures, name: str, requests: int, concurrency: int, seed: int) -> dict:
+    """Send `requests` requests from `concurrency` concurrent workers"""
+    rng = random.Random(seed)
+    if name == "mix":
+        names = rng.choices(list(MIX_WEIGHTS), weights=list(MIX_WEIGHTS.values()), k=requests)
+    else:
+        names = [name] * requests
+    # Built up front so request generation is not measured
+    planned = [build_request(request_name, fixtures, rng) for request_name in names]
+
+    latencies = []
+    errors = {}
+    queue = iter(planned)
+
+    async def worker():
+        for method, path, kwargs, expected in queue:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            if status not in expected:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+async def run_all(client: httpx.AsyncClient, args) -> dict:
+    scenarios = args.scenarios or SCENARIOS + ["mix"]
+    # A bulk request creates BULK_ROWS URLs, so it runs fewer requests
+    planned = {name: max(1, args.requests // BULK_ROWS) if name == "bulk" else args.requests for name in scenarios}
+
+    # Slots needed by the create-like requests of every scenario, warm-up included
+    creates = bulks = 0
+    for name, count in planned.items():
+        total = count + args.warmup
+        if name == "mix":
+            weight = sum(MIX_WEIGHTS.values())
+            creates += total * MIX_WEIGHTS["create"] // weight * 2 + 10
+            bulks += total * MIX_WEIGHTS["bulk"] // weight * 2 + 2
+        creates += total if name == "create" else 0
+        bulks += total if name == "bulk" else 0
+
+    fixtures = Fixtures(client)
+    print(f"Creating fixtures ({args.urls} URLs, {creates} create and {bulks} bulk slots)...")
+    await fixtures.build(args.urls, creates, bulks)
+
+    results = {}
+    for index, name in enumerate(scenarios):
+        if args.warmup:
+            await run_scenario(client, fixtures, name, args.warmup, args.concurrency, args.seed + 1000 + index)
+        results[name] = result = await run_scenario(
+            client, fixtures, name, planned[name], args.concurrency, args.seed + index
+        )
+        print(
+            f"{name:17} {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f}  "
+            f"p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms  errors {result['errors'] or 0}"
+        )
+    return results
+
+
+async def seed_volume(scale: float) -> None:
+    """Background rows in Postgres (same data as the query plan checker)"""
+    import asyncpg
+    from check_query_plans import SCHEMA_PATH, seed
+    from config import settings
+
+    conn = await asyncpg.connect(settings.DATABASE_URL)
+    try:
+        await conn.execute(SCHEMA_PATH.read_text(encoding="utf-8"))
+        await seed(conn, scale)
+    finally:
+        await conn.close()
+
+
+async def run_inprocess(args) -> dict:
+    sys.path.insert(0, str(BACKEND_DIR))
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with client_for(args, transport=transport, base_url="http://loadtest") as client:
+            return await run_all(client, args)
+
+
+def client_for(args, **kwargs) -> httpx.AsyncClient:
+    # Sessions are sent explicitly per request: never store response cookies
+    no_cookies = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    return httpx.AsyncClient(cookies=no_cookies, limits=limits, timeout=args.timeout, **kwargs)
+
+
+async def wait_until_up(base_url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not become healthy in time")
+
+
+async def run_uvicorn(args) -> dict:
+    if args.url:
+        print("Using the running server as is (disable its rate limits for meaningful numbers)")
+        async with client_for(args, base_url=args.url) as client:
+            return await run_all(client, args)
+
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(args.port),
+        "--workers", str(args.workers),
+        "--log-level", "warning", "--no-access-log",
+    ]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=os.environ.copy())
+    try:
+        base_url = f"http://127.0.0.1:{args.port}"
+        await wait_until_up(base_url, process, timeout=60)
+        async with client_for(args, base_url=base_url) as client:
+            return await run_all(client, args)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def compare(current: dict, previous_path: str, max_regression: float) -> int:
+    """Print relative changes against a previous result file; 1 if p95 regressed too much"""
+    previous = json.loads(Path(previous_path).read_text())
+    print(f"\nCompared with {previous['meta']['commit']} ({previous_path}):")
+    regressions = []
+    for name, result in current["scenarios"].items():
+        before = previous["scenarios"].get(name)
+        if not before:
+            continue
+        changes = {
+            key: (result[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+        }
+        print(
+            f"{name:17} rps {changes['throughput_rps']:+7.1f}%  p50 {changes['p50_ms']:+7.1f}%  "
+            f"p95 {changes['p95_ms']:+7.1f}%  p99 {changes['p99_ms']:+7.1f}%"
+        )
+        if max_regression is not None and changes["p95_ms"] > max_regression * 100:
+            regressions.append(name)
+
+    if regressions:
+        print(f"p95 regressed more than {max_regression:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--storage", choices=["postgres", "memory"], help="STORAGE_BACKEND of the app (default: from the environment)")
+    parser.add_argument("--url", help="With --target uvicorn, an already running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (memory storage needs 1)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS + ["mix"], help="Default: all, then mix")
+    parser.add_argument("--requests", type=int, default=2000, help="Measured requests per scenario (a tenth for bulk)")
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured requests before each scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--urls", type=int, default=100, help="Redirect target URLs of the fixture user (max 100)")
+    parser.add_argument("--seed-scale", type=float, help="Seed Postgres with background volume first (1.0 = 500k URLs)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed of the request sequence")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="Result file (default: perf/results/loadtest-<commit>-<target>-<storage>.json)")
+    parser.add_argument("--compare", help="Previous result file to compare with")
+    parser.add_argument("--max-regression", type=float, help="With --compare, fail when a p95 grows more than this (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if args.storage:
+        os.environ["STORAGE_BACKEND"] = args.storage
+    storage = os.environ.get("STORAGE_BACKEND", "postgres")
+    if storage == "memory" and args.target == "uvicorn" and args.workers > 1 and not args.url:
+        parser.error("memory storage is per worker, use --workers 1")
+    args.urls = min(args.urls, USER_URL_LIMIT)
+
+    # Limits would turn the measurement into 429s; one clean worker state per run
+    os.environ["RATE_LIMIT_ENABLED"] = "False"
+    os.environ.setdefault("WARMUP_ENABLED", "False")
+    # Access logs are still built and written, just not onto the report
+    os.environ.setdefault("LOG_DESTINATION", os.devnull)
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    if args.seed_scale:
+        if storage != "postgres":
+            parser.error("--seed-scale needs postgres storage")
+        asyncio.run(seed_volume(args.seed_scale))
+
+    runner = run_inprocess if args.target == "inprocess" else run_uvicorn
+    scenarios = asyncio.run(runner(args))
+
+    commit = git_revision()
+    result = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "target": args.url or args.target,
+            "storage": storage,
+            "workers": args.workers if args.target == "uvicorn" else None,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "urls": args.urls,
+            "seed_scale": args.seed_scale,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "scenarios": scenarios,
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"loadtest-{commit}-{args.target}-{storage}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2) + "\n")
+    print(f"Results written to {output}")
+
+    if args.compare:
+        return compare(result, args.compare, args.max_regression)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Throughput of serve.py from 1 to N workers
+
+Starts the launcher with 1, 2, 4, ... workers (up to --max-workers, by
+default the number of cores) on Postgres storage, drives each run with
+--clients load generator processes (perf/loadtest.py --url) running in
+parallel, and reports total throughput, speedup over one worker and the
+worst client's p95/p99. Load generators share the machine with the
+workers, so leave cores for them (or point --clients at fewer workers)
+to measure the server rather than the client.
+
+Usage (from Back-End/, rate limits are disabled for the launched server):
+    pip install -r perf/requirements.txt
+    python perf/scaling.py --max-workers 8 --clients 4
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from loadtest import BACKEND_DIR, RESULTS_DIR, git_revision
+
+
+def worker_counts(max_workers: int) -> list:
+    counts = []
+    count = 1
+    while count < max_workers:
+        counts.append(count)
+        count *= 2
+    return counts + [max_workers]
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    with httpx.Client(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"serve.py exited with code {process.returncode}")
+            try:
+                if client.get("/health/ready").status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.2)
+    raise RuntimeError("serve.py did not become ready in time")
+
+
+def run_clients(args, base_url: str, workdir: Path) -> list:
+    """Start the load generators together and return their result files"""
+    processes = []
+    for index in range(args.clients):
+        output = workdir / f"client-{index}.json"
+        command = [
+            sys.executable, str(Path(__file__).parent / "loadtest.py"),
+            "--url", base_url,
+            "--scenarios", *args.scenarios,
+            "--requests", str(args.requests),
+            "--warmup", str(args.warmup),
+            "--concurrency", str(args.concurrency),
+            "--seed", str(args.seed + index),
+            "--output", str(output),
+        ]
+        processes.append((subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL), output))
+
+    results = []
+    for process, output in processes:
+        if process.wait() != 0:
+            raise RuntimeError(f"Load generator exited with code {process.returncode}")
+        results.append(json.loads(output.read_text()))
+    return results
+
+
+def aggregate(results: list) -> dict:
+    """Scenario totals over the clients (they run concurrently, so throughputs add up)"""
+    scenarios = {}
+    for name in results[0]["scenarios"]:
+        runs = [result["scenarios"][name] for result in results]
+        errors = {}
+        for run in runs:
+            for status, count in run["errors"].items():
+                errors[status] = errors.get(status, 0) + count
+        scenarios[name] = {
+            "requests": sum(run["requests"] for run in runs),
+            "errors": errors,
+            "throughput_rps": round(sum(run["throughput_rps"] for run in runs), 1),
+            "p50_ms": max(run["p50_ms"] for run in runs),
+            "p95_ms": max(run["p95_ms"] for run in runs),
+            "p99_ms": max(run["p99_ms"] for run in runs),
+        }
+    return scenarios
+
+
+def run_with_workers(args, workers: int) -> dict:
+    env = dict(os.environ, RATE_LIMIT_ENABLED="False", WARMUP_ENABLED="False", LOG_DESTINATION=os.devnull)
+    command = [
+        sys.executable, "serve.py",
+        "--workers", str(workers),
+        "--host", "127.0.0.1",
+        "--port", str(args.port),
+    ]
+    if args.reuse_port:
+        command.append("--reuse-port")
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    try:
+        base_url = f"http://127.0.0.1:{args.port}"
+        wait_until_ready(base_url, process, timeout=120)
+        # Let every worker finish starting before measuring
+        time.sleep(args.settle)
+        with tempfile.TemporaryDirectory() as workdir:
+            return aggregate(run_clients(args, base_url, Path(workdir)))
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 1) // 2), help="Load generator processes")
+    parser.add_argument("--scenarios", nargs="+", default=["redirect_public"])
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per scenario and client")
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent requests per client")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--reuse-port", action="store_true", help="Start serve.py with --reuse-port")
+    parser.add_argument("--settle", type=float, default=3.0, help="Seconds to wait after the first worker is ready")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Result file (default: perf/results/scaling-<commit>.json)")
+    args = parser.parse_args()
+    if os.environ.get("STORAGE_BACKEND", "postgres") != "postgres":
+        parser.error("scaling needs postgres storage (memory storage is per worker)")
+
+    runs = {}
+    for workers in worker_counts(args.max_workers):
+        print(f"Running with {workers} worker(s)...")
+        runs[workers] = run_with_workers(args, workers)
+
+    print(f"\n{'scenario':17} {'workers':>7} {'req/s':>9} {'speedup':>8} {'p95 ms':>8} {'p99 ms':>8}  errors")
+    for name in args.scenarios:
+        baseline = runs[1][name]["throughput_rps"]
+        for workers, scenarios in runs.items():
+            result = scenarios[name]
+            speedup = result["throughput_rps"] / baseline if baseline else 0.0
+            print(
+                f"{name:17} {workers:>7} {result['throughput_rps']:>9.1f} {speedup:>7.2f}x "
+                f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f}  {result['errors'] or 0}"
+            )
+
+    commit = git_revision()
+    output = Path(args.output) if args.output else RESULTS_DIR / f"scaling-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "cpu_count": os.cpu_count(),
+            "clients": args.clients,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "reuse_port": args.reuse_port,
+        },
+        "runs": {str(workers): scenarios for workers, scenarios in runs.items()},
+    }, indent=2) + "\n")
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
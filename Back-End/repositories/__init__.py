@@ -0,0 +1,18 @@
+from config import settings
+from .base import Storage, URLRepository, UserRepository, VisitorSketchRepository
+
+
+def create_storage(backend: str) -> Storage:
+    """Storage backend by name ('postgres' or 'memory')"""
+    if backend == "memory":
+        from .memory import MemoryStorage
+        return MemoryStorage()
+
+    from .postgres import PostgresStorage
+    return PostgresStorage()
+
+
+# Global storage backend, selected by STORAGE_BACKEND
+storage = create_storage(settings.STORAGE_BACKEND)
+
+__all__ = ["storage", "create_storage", "Storage", "URLRepository", "UserRepository", "VisitorSketchRepository"]
@@ -0,0 +1,199 @@
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+from database.circuit_breaker import CircuitBreaker
+from models import URL, User, RedirectRecord
+from utils.hyperloglog import HyperLogLog
+
+
+SketchKey = Tuple[int, date]
+
+
+class URLRepository(ABC):
+    """
+    Storage of URLs and their access history
+    Methods return the service models; timestamps are naive UTC like the
+    TIMESTAMP columns
+    """
+
+    @abstractmethod
+    async def existing_short_codes(self, short_codes: List[str]) -> Set[str]:
+        """Short codes from the list that are already taken"""
+
+    @abstractmethod
+    async def create(
+        self,
+        short_code: str,
+        original_url: str,
+        user_id: int,
+        is_private: bool,
+        expires_at: Optional[datetime],
+        url_hash: bytes
+    ) -> URL:
+        """Insert a URL"""
+
+    @abstractmethod
+    async def create_many(
+        self,
+        user_id: int,
+        short_codes: List[str],
+        original_urls: List[str],
+        private_flags: List[bool],
+        expires_at: Optional[datetime],
+        url_hashes: List[bytes]
+    ) -> List[URL]:
+        """Insert a batch of URLs of one user atomically"""
+
+    @abstractmethod
+    async def find_by_hash(self, user_id: int, url_hash: bytes, is_private: bool) -> Optional[URL]:
+        """Oldest active URL of the user with this target digest and privacy"""
+
+    @abstractmethod
+    async def find_by_hashes(self, user_id: int, url_hashes: List[bytes]) -> Dict[tuple, URL]:
+        """Oldest active URL per (url_hash, is_private) among the given digests"""
+
+    @abstractmethod
+    async def get_active_by_short_code(self, short_code: str) -> Optional[URL]:
+        """Active URL by short code"""
+
+    @abstractmethod
+    async def get_redirect_record(self, short_code: str) -> Optional[RedirectRecord]:
+        """
+        Redirect projection of an active URL
+        Raises DatabaseUnavailableError when the backend is unreachable
+        """
+
+    @abstractmethod
+    async def get_redirect_records(self, short_codes: List[str]) -> Dict[str, RedirectRecord]:
+        """
+        Redirect projections of the active URLs among the short codes
+        Raises DatabaseUnavailableError when the backend is unreachable
+        """
+
+    @abstractmethod
+    async def increment_clicks(self, short_code: str) -> None:
+        """
+        Add one click
+        Raises DatabaseUnavailableError when the backend is unreachable
+        """
+
+    @abstractmethod
+    def iter_top_redirect_records(self, top_n: int, order: str, batch_size: int) -> AsyncIterator[Tuple[str, RedirectRecord]]:
+        """(short_code, record) of the top_n active, unexpired URLs by clicks or recent updates"""
+
+    @abstractmethod
+    async def get_user_urls_state(self, user_id: int, with_history: bool) -> tuple:
+        """(total_count, last_updated_at, last_access_id) of a user's URLs"""
+
+    @abstractmethod
+    async def count_by_user(self, user_id: int) -> int:
+        """Number of URLs of a user"""
+
+    @abstractmethod
+    async def list_by_user(self, user_id: int, limit: int, offset: int) -> List[URL]:
+        """Page of a user's URLs, newest first"""
+
+    @abstractmethod
+    async def get_access_history(self, url_id: int) -> List[dict]:
+        """Access records of a URL (user_email, user_type, accessed_at), newest first"""
+
+    @abstractmethod
+    async def get_by_id(self, url_id: int, user_id: int) -> Optional[URL]:
+        """URL by ID, only if it belongs to the user"""
+
+    @abstractmethod
+    async def update(self, url_id: int, user_id: int, changes: dict) -> Optional[URL]:
+        """Set the given columns of a user's URL (and updated_at)"""
+
+    @abstractmethod
+    async def delete(self, url_id: int, user_id: int) -> Optional[str]:
+        """Delete a user's URL, returning its short code"""
+
+    @abstractmethod
+    async def record_access(self, url_id: int, user_email: str, user_type: str) -> None:
+        """Add an access record"""
+
+    @abstractmethod
+    async def record_accesses(self, url_ids: List[int], user_email: str, user_type: str) -> None:
+        """Add an access record for each URL"""
+
+    @abstractmethod
+    async def delete_expired(self) -> int:
+        """Delete active URLs past their expiration, returning how many"""
+
+
+class UserRepository(ABC):
+    """Storage of registered and guest users"""
+
+    @abstractmethod
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        """Active user by ID"""
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[User]:
+        """Active user by email"""
+
+    @abstractmethod
+    async def is_taken(self, username: str, email: str, exclude_user_id: Optional[int] = None) -> bool:
+        """Whether another user already has the username or the email"""
+
+    @abstractmethod
+    async def create(self, username: str, email: str, hashed_password: str) -> User:
+        """Insert a registered user"""
+
+    @abstractmethod
+    async def get_or_create_guest(self, guest_uuid: UUID, username: str) -> Optional[dict]:
+        """Guest row for the UUID, inserted if unknown (safe under concurrent calls)"""
+
+    @abstractmethod
+    async def get_guest_by_uuid(self, guest_uuid: UUID) -> Optional[dict]:
+        """Guest row by UUID"""
+
+    @abstractmethod
+    async def migrate_guest(self, user_id: int, username: str, email: str, hashed_password: str) -> Optional[dict]:
+        """
+        Turn a guest into a registered user and make their URLs permanent
+        Returns the user row plus previous_guest_uuid, or None if not a guest
+        """
+
+
+class VisitorSketchRepository(ABC):
+    """Storage of unique visitor sketches per URL and UTC day"""
+
+    @abstractmethod
+    async def merge(self, pending: Dict[SketchKey, HyperLogLog]) -> None:
+        """Merge sketches into the stored ones (keys of deleted URLs are skipped)"""
+
+    @abstractmethod
+    async def get(self, url_id: int, since: date) -> Dict[date, HyperLogLog]:
+        """Stored sketches of a URL from `since` on, by day"""
+
+
+class Storage(ABC):
+    """A storage backend: its repositories and lifecycle"""
+
+    name: str
+    urls: URLRepository
+    users: UserRepository
+    sketches: VisitorSketchRepository
+    # Tracks backend failures for degraded mode (never opens without failures)
+    breaker: CircuitBreaker
+    # Other workers' changes arrive as Postgres notifications
+    supports_notifications: bool = False
+
+    @abstractmethod
+    async def connect(self) -> None:
+        """Open connections and create the schema"""
+
+    @abstractmethod
+    async def disconnect(self) -> None:
+        """Release connections"""
+
+    @abstractmethod
+    async def ping(self, timeout: float) -> dict:
+        """
+        Round trip to the backend for readiness checks (bypasses the breaker)
+        Returns timings; raises when the backend does not answer in time.
+        A saturated pool is not an outage: the wait is returned as acquire_ms
+        """
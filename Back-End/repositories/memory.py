@@ -0,0 +1,450 @@
+import heapq
+import itertools
+from datetime import date, datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+from config import settings
+from database.circuit_breaker import CircuitBreaker
+from models import URL, User, RedirectRecord
+from utils.event_log import event_log
+from utils.hyperloglog import HyperLogLog
+from .base import SketchKey, Storage, URLRepository, UserRepository, VisitorSketchRepository
+
+
+# Row fields that are not part of the URL model
+_INTERNAL_URL_FIELDS = ("url_hash",)
+
+# Row fields returned for guests (no password hash)
+_GUEST_FIELDS = ("id", "username", "email", "user_type", "guest_uuid", "is_active", "created_at", "updated_at")
+
+
+def _now() -> datetime:
+    """Naive UTC, like the TIMESTAMP columns"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class MemoryTables:
+    """
+    Rows and secondary indexes shared by the in-memory repositories
+    Each table is a dict by primary key; indexes map a lookup key to
+    primary keys. Repository methods never await, so every call is atomic
+    within the worker's event loop
+    """
+
+    def __init__(self):
+        self.urls: Dict[int, dict] = {}
+        self.url_ids = itertools.count(1)
+        # short_code -> url id
+        self.urls_by_short_code: Dict[str, int] = {}
+        # user id -> url ids in creation order (dict as an ordered set)
+        self.urls_by_user: Dict[int, Dict[int, None]] = {}
+        # (user id, url_hash) -> url ids
+        self.urls_by_hash: Dict[Tuple[int, bytes], Dict[int, None]] = {}
+
+        # url id -> access records, oldest first
+        self.access_history: Dict[int, List[dict]] = {}
+        self.access_ids = itertools.count(1)
+
+        self.users: Dict[int, dict] = {}
+        self.user_ids = itertools.count(1)
+        self.users_by_username: Dict[str, int] = {}
+        self.users_by_email: Dict[str, int] = {}
+        self.users_by_guest_uuid: Dict[UUID, int] = {}
+
+        self.sketches: Dict[SketchKey, bytes] = {}
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def index_url_hash(self, row: dict) -> None:
+        if row['url_hash'] is not None:
+            self.urls_by_hash.setdefault((row['user_id'], row['url_hash']), {})[row['id']] = None
+
+    def unindex_url_hash(self, row: dict) -> None:
+        key = (row['user_id'], row['url_hash'])
+        ids = self.urls_by_hash.get(key)
+        if ids is not None:
+            ids.pop(row['id'], None)
+            if not ids:
+                del self.urls_by_hash[key]
+
+
+def _to_url(row: dict) -> URL:
+    return URL(**{key: value for key, value in row.items() if key not in _INTERNAL_URL_FIELDS})
+
+
+def _to_record(row: dict) -> RedirectRecord:
+    return RedirectRecord(row['id'], row['original_url'], row['is_private'], row['is_active'], row['expires_at'])
+
+
+class MemoryURLRepository(URLRepository):
+    """URLs in indexed dicts"""
+
+    def __init__(self, tables: MemoryTables):
+        self._tables = tables
+
+    def _active(self, short_code: str) -> Optional[dict]:
+        url_id = self._tables.urls_by_short_code.get(short_code)
+        if url_id is None:
+            return None
+        row = self._tables.urls[url_id]
+        return row if row['is_active'] else None
+
+    def _owned(self, url_id: int, user_id: int) -> Optional[dict]:
+        row = self._tables.urls.get(url_id)
+        return row if row is not None and row['user_id'] == user_id else None
+
+    def _insert(self, short_code, original_url, user_id, is_private, expires_at, url_hash) -> dict:
+        if short_code in self._tables.urls_by_short_code:
+            raise ValueError(f"short code already exists: {short_code}")
+
+        now = _now()
+        row = {
+            'id': next(self._tables.url_ids),
+            'short_code': short_code,
+            'original_url': original_url,
+            'user_id': user_id,
+            'clicks': 0,
+            'is_active': True,
+            'is_private': is_private,
+            'created_at': now,
+            'updated_at': now,
+            'expires_at': expires_at,
+            'url_hash': url_hash,
+        }
+        self._tables.urls[row['id']] = row
+        self._tables.urls_by_short_code[short_code] = row['id']
+        self._tables.urls_by_user.setdefault(user_id, {})[row['id']] = None
+        self._tables.index_url_hash(row)
+        return row
+
+    async def existing_short_codes(self, short_codes: List[str]) -> Set[str]:
+        return {code for code in short_codes if code in self._tables.urls_by_short_code}
+
+    async def create(
+        self,
+        short_code: str,
+        original_url: str,
+        user_id: int,
+        is_private: bool,
+        expires_at: Optional[datetime],
+        url_hash: bytes
+    ) -> URL:
+        return _to_url(self._insert(short_code, original_url, user_id, is_private, expires_at, url_hash))
+
+    async def create_many(
+        self,
+        user_id: int,
+        short_codes: List[str],
+        original_urls: List[str],
+        private_flags: List[bool],
+        expires_at: Optional[datetime],
+        url_hashes: List[bytes]
+    ) -> List[URL]:
+        # All or nothing, like the single INSERT
+        taken = await self.existing_short_codes(short_codes)
+        if taken or len(set(short_codes)) != len(short_codes):
+            raise ValueError("short code already exists")
+
+        return [
+            _to_url(self._insert(short_code, original_url, user_id, is_private, expires_at, digest))
+            for short_code, original_url, is_private, digest
+            in zip(short_codes, original_urls, private_flags, url_hashes)
+        ]
+
+    async def find_by_hash(self, user_id: int, url_hash: bytes, is_private: bool) -> Optional[URL]:
+        for url_id in sorted(self._tables.urls_by_hash.get((user_id, url_hash), ())):
+            row = self._tables.urls[url_id]
+            if row['is_active'] and row['is_private'] == is_private:
+                return _to_url(row)
+        return None
+
+    async def find_by_hashes(self, user_id: int, url_hashes: List[bytes]) -> Dict[tuple, URL]:
+        duplicates = {}
+        for digest in url_hashes:
+            for url_id in sorted(self._tables.urls_by_hash.get((user_id, digest), ())):
+                row = self._tables.urls[url_id]
+                key = (digest, row['is_private'])
+                if row['is_active'] and key not in duplicates:
+                    duplicates[key] = _to_url(row)
+        return duplicates
+
+    async def get_active_by_short_code(self, short_code: str) -> Optional[URL]:
+        row = self._active(short_code)
+        return _to_url(row) if row else None
+
+    async def get_redirect_record(self, short_code: str) -> Optional[RedirectRecord]:
+        row = self._active(short_code)
+        return _to_record(row) if row else None
+
+    async def get_redirect_records(self, short_codes: List[str]) -> Dict[str, RedirectRecord]:
+        records = {}
+        for short_code in short_codes:
+            row = self._active(short_code)
+            if row:
+                records[short_code] = _to_record(row)
+        return records
+
+    async def increment_clicks(self, short_code: str) -> None:
+        url_id = self._tables.urls_by_short_code.get(short_code)
+        if url_id is not None:
+            row = self._tables.urls[url_id]
+            row['clicks'] += 1
+            row['updated_at'] = _now()
+
+    async def iter_top_redirect_records(self, top_n: int, order: str, batch_size: int) -> AsyncIterator[Tuple[str, RedirectRecord]]:
+        now = _now()
+        column = "clicks" if order == "clicks" else "updated_at"
+        live = (
+            row for row in self._tables.urls.values()
+            if row['is_active'] and (row['expires_at'] is None or row['expires_at'] > now)
+        )
+        for row in heapq.nlargest(top_n, live, key=lambda row: row[column]):
+            yield row['short_code'], _to_record(row)
+
+    async def get_user_urls_state(self, user_id: int, with_history: bool) -> tuple:
+        rows = [self._tables.urls[url_id] for url_id in self._tables.urls_by_user.get(user_id, ())]
+        last_updated = max((row['updated_at'] for row in rows), default=None)
+
+        last_access = None
+        if with_history:
+            last_access = max(
+                (self._tables.access_history[row['id']][-1]['id']
+                 for row in rows if self._tables.access_history.get(row['id'])),
+                default=None
+            )
+
+        return len(rows), last_updated, last_access
+
+    async def count_by_user(self, user_id: int) -> int:
+        return len(self._tables.urls_by_user.get(user_id, ()))
+
+    async def list_by_user(self, user_id: int, limit: int, offset: int) -> List[URL]:
+        # Creation order is id order, newest first is the reverse
+        url_ids = list(self._tables.urls_by_user.get(user_id, ()))
+        url_ids.reverse()
+        return [_to_url(self._tables.urls[url_id]) for url_id in url_ids[offset:offset + limit]]
+
+    async def get_access_history(self, url_id: int) -> List[dict]:
+        return [
+            {'user_email': entry['user_email'], 'user_type': entry['user_type'], 'accessed_at': entry['accessed_at']}
+            for entry in reversed(self._tables.access_history.get(url_id, ()))
+        ]
+
+    async def get_by_id(self, url_id: int, user_id: int) -> Optional[URL]:
+        row = self._owned(url_id, user_id)
+        return _to_url(row) if row else None
+
+    async def update(self, url_id: int, user_id: int, changes: dict) -> Optional[URL]:
+        row = self._owned(url_id, user_id)
+        if row is None:
+            return None
+
+        self._tables.unindex_url_hash(row)
+        row.update(changes)
+        row['updated_at'] = _now()
+        self._tables.index_url_hash(row)
+        return _to_url(row)
+
+    async def delete(self, url_id: int, user_id: int) -> Optional[str]:
+        row = self._owned(url_id, user_id)
+        if row is None:
+            return None
+
+        self._remove(row)
+        return row['short_code']
+
+    def _remove(self, row: dict) -> None:
+        # Cascades to the access history and visitor sketches, like the foreign keys
+        tables = self._tables
+        del tables.urls[row['id']]
+        del tables.urls_by_short_code[row['short_code']]
+        tables.urls_by_user[row['user_id']].pop(row['id'], None)
+        tables.unindex_url_hash(row)
+        tables.access_history.pop(row['id'], None)
+        for key in [key for key in tables.sketches if key[0] == row['id']]:
+            del tables.sketches[key]
+
+    async def record_access(self, url_id: int, user_email: str, user_type: str) -> None:
+        await self.record_accesses([url_id], user_email, user_type)
+
+    async def record_accesses(self, url_ids: List[int], user_email: str, user_type: str) -> None:
+        now = _now()
+        for url_id in url_ids:
+            if url_id in self._tables.urls:
+                self._tables.access_history.setdefault(url_id, []).append({
+                    'id': next(self._tables.access_ids),
+                    'user_email': user_email,
+                    'user_type': user_type,
+                    'accessed_at': now,
+                })
+
+    async def delete_expired(self) -> int:
+        now = _now()
+        expired = [
+            row for row in self._tables.urls.values()
+            if row['expires_at'] is not None and row['expires_at'] < now and row['is_active']
+        ]
+        for row in expired:
+            self._remove(row)
+        return len(expired)
+
+
+class MemoryUserRepository(UserRepository):
+    """Users in indexed dicts"""
+
+    def __init__(self, tables: MemoryTables):
+        self._tables = tables
+
+    def _active_user(self, user_id: Optional[int]) -> Optional[User]:
+        row = self._tables.users.get(user_id) if user_id is not None else None
+        if row is None or not row['is_active']:
+            return None
+        return User(**row)
+
+    def _insert(self, **fields) -> dict:
+        # Unique columns, like the table constraints
+        if fields['username'] in self._tables.users_by_username:
+            raise ValueError(f"username already exists: {fields['username']}")
+        if fields['email'] is not None and fields['email'] in self._tables.users_by_email:
+            raise ValueError(f"email already exists: {fields['email']}")
+
+        now = _now()
+        row = {'id': next(self._tables.user_ids), 'is_active': True, 'created_at': now, 'updated_at': now, **fields}
+        self._tables.users[row['id']] = row
+        self._tables.users_by_username[row['username']] = row['id']
+        if row['email'] is not None:
+            self._tables.users_by_email[row['email']] = row['id']
+        if row['guest_uuid'] is not None:
+            self._tables.users_by_guest_uuid[row['guest_uuid']] = row['id']
+        return row
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        return self._active_user(user_id)
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        return self._active_user(self._tables.users_by_email.get(email))
+
+    async def is_taken(self, username: str, email: str, exclude_user_id: Optional[int] = None) -> bool:
+        owners = {self._tables.users_by_username.get(username), self._tables.users_by_email.get(email)}
+        owners.discard(None)
+        owners.discard(exclude_user_id)
+        return bool(owners)
+
+    async def create(self, username: str, email: str, hashed_password: str) -> User:
+        row = self._insert(
+            username=username,
+            email=email,
+            hashed_password=hashed_password,
+            user_type='registered',
+            guest_uuid=None
+        )
+        return User(**row)
+
+    async def get_or_create_guest(self, guest_uuid: UUID, username: str) -> Optional[dict]:
+        user_id = self._tables.users_by_guest_uuid.get(guest_uuid)
+        if user_id is not None:
+            row = self._tables.users[user_id]
+        else:
+            row = self._insert(
+                username=username,
+                email=None,
+                hashed_password=None,
+                user_type='guest',
+                guest_uuid=guest_uuid
+            )
+        return {field: row[field] for field in _GUEST_FIELDS}
+
+    async def get_guest_by_uuid(self, guest_uuid: UUID) -> Optional[dict]:
+        user_id = self._tables.users_by_guest_uuid.get(guest_uuid)
+        if user_id is None:
+            return None
+        row = self._tables.users[user_id]
+        return {field: row[field] for field in _GUEST_FIELDS}
+
+    async def migrate_guest(self, user_id: int, username: str, email: str, hashed_password: str) -> Optional[dict]:
+        row = self._tables.users.get(user_id)
+        if row is None or row['user_type'] != 'guest':
+            return None
+        if await self.is_taken(username, email, exclude_user_id=user_id):
+            raise ValueError("username or email already exists")
+
+        now = _now()
+        previous_guest_uuid = row['guest_uuid']
+        del self._tables.users_by_username[row['username']]
+        del self._tables.users_by_guest_uuid[previous_guest_uuid]
+        row.update(
+            user_type='registered',
+            username=username,
+            email=email,
+            hashed_password=hashed_password,
+            guest_uuid=None,
+            updated_at=now
+        )
+        self._tables.users_by_username[username] = user_id
+        self._tables.users_by_email[email] = user_id
+
+        # Remove expires_at from all user's URLs (make them permanent)
+        for url_id in self._tables.urls_by_user.get(user_id, ()):
+            url = self._tables.urls[url_id]
+            url['expires_at'] = None
+            url['updated_at'] = now
+
+        user = {field: row[field] for field in _GUEST_FIELDS if field != 'guest_uuid'}
+        user['previous_guest_uuid'] = previous_guest_uuid
+        return user
+
+
+class MemoryVisitorSketchRepository(VisitorSketchRepository):
+    """Visitor sketches in a dict of register bytes"""
+
+    def __init__(self, tables: MemoryTables):
+        self._tables = tables
+
+    async def merge(self, pending: Dict[SketchKey, HyperLogLog]) -> None:
+        for key, sketch in pending.items():
+            if key[0] not in self._tables.urls:
+                continue
+            stored = self._tables.sketches.get(key)
+            if stored is not None:
+                merged = HyperLogLog(stored)
+                merged.merge(sketch)
+                sketch = merged
+            self._tables.sketches[key] = sketch.to_bytes()
+
+    async def get(self, url_id: int, since: date) -> Dict[date, HyperLogLog]:
+        return {
+            bucket_date: HyperLogLog(registers)
+            for (sketch_url_id, bucket_date), registers in self._tables.sketches.items()
+            if sketch_url_id == url_id and bucket_date >= since
+        }
+
+
+class MemoryStorage(Storage):
+    """
+    Everything in the worker's memory, for benchmarks and perf tests
+    Isolates the HTTP and serialization stack from database latency;
+    data is per worker and lost on restart
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self.tables = MemoryTables()
+        self.urls = MemoryURLRepository(self.tables)
+        self.users = MemoryUserRepository(self.tables)
+        self.sketches = MemoryVisitorSketchRepository(self.tables)
+        self.breaker = CircuitBreaker(
+            settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            settings.CIRCUIT_BREAKER_RECOVERY_SECONDS,
+            settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS
+        )
+
+    async def connect(self) -> None:
+        event_log.log("storage_not_persistent", "warning", backend=self.name)
+
+    async def disconnect(self) -> None:
+        pass
+
+    async def ping(self, timeout: float) -> dict:
+        return {}
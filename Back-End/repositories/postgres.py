@@ -0,0 +1,526 @@
+import asyncio
+import time
+from datetime import date, datetime
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+from config import settings
+from database import db
+from models import URL, User, RedirectRecord
+from utils.hyperloglog import HyperLogLog
+from .base import SketchKey, Storage, URLRepository, UserRepository, VisitorSketchRepository
+
+
+# Ranking of the links to preload
+_ORDER_BY = {
+    "clicks": "clicks DESC",
+    "recent": "updated_at DESC",
+}
+
+
+class PostgresURLRepository(URLRepository):
+    """URLs in Postgres (asyncpg pool)"""
+
+    async def existing_short_codes(self, short_codes: List[str]) -> Set[str]:
+        async with db.pool.acquire() as conn:
+            if len(short_codes) == 1:
+                exists = await conn.fetchval(
+                    'SELECT EXISTS(SELECT 1 FROM urls WHERE short_code = $1)',
+                    short_codes[0]
+                )
+                return set(short_codes) if exists else set()
+
+            taken = await conn.fetch(
+                'SELECT short_code FROM urls WHERE short_code = ANY($1::text[])',
+                short_codes
+            )
+            return {row['short_code'] for row in taken}
+
+    async def create(
+        self,
+        short_code: str,
+        original_url: str,
+        user_id: int,
+        is_private: bool,
+        expires_at: Optional[datetime],
+        url_hash: bytes
+    ) -> URL:
+        async with db.pool.acquire() as conn:
+            row = await conn.fetchrow('''
+                INSERT INTO urls (short_code, original_url, user_id, is_private, expires_at, url_hash)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                RETURNING id, short_code, original_url, user_id, clicks, is_active,
+                          is_private, created_at, updated_at, expires_at
+            ''', short_code, original_url, user_id, is_private, expires_at, url_hash)
+
+            return URL(**dict(row))
+
+    async def create_many(
+        self,
+        user_id: int,
+        short_codes: List[str],
+        original_urls: List[str],
+        private_flags: List[bool],
+        expires_at: Optional[datetime],
+        url_hashes: List[bytes]
+    ) -> List[URL]:
+        # Single INSERT for the whole batch (one round trip, one transaction)
+        async with db.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                INSERT INTO urls (short_code, original_url, user_id, is_private, expires_at, url_hash)
+                SELECT short_code, original_url, $3, is_private, $5, url_hash
+                FROM unnest($1::text[], $2::text[], $4::boolean[], $6::bytea[])
+                    AS batch(short_code, original_url, is_private, url_hash)
+                RETURNING id, short_code, original_url, user_id, clicks, is_active,
+                          is_private, created_at, updated_at, expires_at
+            ''', short_codes, original_urls, user_id, private_flags, expires_at, url_hashes)
+
+        return [URL(**dict(row)) for row in rows]
+
+    async def find_by_hash(self, user_id: int, url_hash: bytes, is_private: bool) -> Optional[URL]:
+        async with db.pool.acquire() as conn:
+            row = await conn.fetchrow('''
+                SELECT id, short_code, original_url, user_id, clicks, is_active,
+                       is_private, created_at, updated_at, expires_at
+                FROM urls
+                WHERE user_id = $1 AND url_hash = $2
+                AND is_private = $3 AND is_active = TRUE
+                ORDER BY id
+                LIMIT 1
+            ''', user_id, url_hash, is_private)
+
+            if not row:
+                return None
+
+            return URL(**dict(row))
+
+    async def find_by_hashes(self, user_id: int, url_hashes: List[bytes]) -> Dict[tuple, URL]:
+        async with db.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT DISTINCT ON (url_hash, is_private)
+                       id, short_code, original_url, user_id, clicks, is_active,
+                       is_private, created_at, updated_at, expires_at, url_hash
+                FROM urls
+                WHERE user_id = $1 AND url_hash = ANY($2::bytea[])
+                AND is_active = TRUE
+                ORDER BY url_hash, is_private, id
+            ''', user_id, url_hashes)
+
+        duplicates = {}
+        for row in rows:
+            row = dict(row)
+            key = (row.pop('url_hash'), row['is_private'])
+            duplicates[key] = URL(**row)
+        return duplicates
+
+    async def get_active_by_short_code(self, short_code: str) -> Optional[URL]:
+        async with db.pool.acquire() as conn:
+            row = await conn.fetchrow('''
+                SELECT * FROM urls
+                WHERE short_code = $1
+                AND is_active = TRUE
+            ''', short_code)
+
+            if not row:
+                return None
+
+            return URL(**dict(row))
+
+    async def get_redirect_record(self, short_code: str) -> Optional[RedirectRecord]:
+        async with db.guarded_connection() as conn:
+            row = await conn.fetchrow('''
+                SELECT id, original_url, is_private, is_active, expires_at
+                FROM urls
+                WHERE short_code = $1
+                AND is_active = TRUE
+            ''', short_code, timeout=settings.DB_QUERY_TIMEOUT_SECONDS)
+
+        return RedirectRecord.from_row(row) if row else None
+
+    async def get_redirect_records(self, short_codes: List[str]) -> Dict[str, RedirectRecord]:
+        async with db.guarded_connection() as conn:
+            rows = await conn.fetch('''
+                SELECT short_code, id, original_url, is_private, is_active, expires_at
+                FROM urls
+                WHERE short_code = ANY($1::text[])
+                AND is_active = TRUE
+            ''', short_codes, timeout=settings.DB_QUERY_TIMEOUT_SECONDS)
+
+        return {row['short_code']: RedirectRecord.from_row(row) for row in rows}
+
+    async def increment_clicks(self, short_code: str) -> None:
+        async with db.guarded_connection() as conn:
+            await conn.execute(
+                'UPDATE urls SET clicks = clicks + 1, updated_at = NOW() WHERE short_code = $1',
+                short_code, timeout=settings.DB_QUERY_TIMEOUT_SECONDS
+            )
+
+    async def iter_top_redirect_records(self, top_n: int, order: str, batch_size: int) -> AsyncIterator[Tuple[str, RedirectRecord]]:
+        # Bounded top-N sort, no index on clicks (it would block HOT updates on every click)
+        query = f'''
+            SELECT short_code, id, original_url, is_private, is_active, expires_at
+            FROM urls
+            WHERE is_active = TRUE
+            AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
+            ORDER BY {_ORDER_BY[order]}
+            LIMIT $1
+        '''
+
+        # Streamed with a server-side cursor, batch_size rows per round trip
+        async with db.pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                async for row in conn.cursor(query, top_n, prefetch=batch_size):
+                    yield row['short_code'], RedirectRecord.from_row(row)
+
+    async def get_user_urls_state(self, user_id: int, with_history: bool) -> tuple:
+        async with db.pool.acquire() as conn:
+            if with_history:
+                row = await conn.fetchrow(
+                    '''SELECT COUNT(*) AS total, MAX(updated_at) AS last_updated,
+                              (SELECT MAX(h.id) FROM url_access_history h
+                               JOIN urls u ON u.id = h.url_id
+                               WHERE u.user_id = $1) AS last_access
+                    FROM urls WHERE user_id = $1''',
+                    user_id
+                )
+            else:
+                row = await conn.fetchrow(
+                    '''SELECT COUNT(*) AS total, MAX(updated_at) AS last_updated,
+                              NULL::int AS last_access
+                    FROM urls WHERE user_id = $1''',
+                    user_id
+                )
+
+            return row['total'], row['last_updated'], row['last_access']
+
+    async def count_by_user(self, user_id: int) -> int:
+        async with db.pool.acquire() as conn:
+            result = await conn.fetchval(
+                'SELECT COUNT(*) FROM urls WHERE user_id = $1',
+                user_id
+            )
+
+            return result or 0
+
+    async def list_by_user(self, user_id: int, limit: int, offset: int) -> List[URL]:
+        async with db.pool.acquire() as conn:
+            rows = await conn.fetch(
+                '''SELECT * FROM urls
+                WHERE user_id = $1
+                ORDER BY created_at DESC
+                LIMIT $2 OFFSET $3''',
+                user_id, limit, offset
+            )
+
+            return [URL(**dict(row)) for row in rows]
+
+    async def get_access_history(self, url_id: int) -> List[dict]:
+        async with db.pool.acquire() as conn:
+            rows = await conn.fetch(
+                '''SELECT user_email, user_type, accessed_at
+                FROM url_access_history
+                WHERE url_id = $1
+                ORDER BY accessed_at DESC''',
+                url_id
+            )
+
+            return [dict(row) for row in rows]
+
+    async def get_by_id(self, url_id: int, user_id: int) -> Optional[URL]:
+        async with db.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                'SELECT * FROM urls WHERE id = $1 AND user_id = $2',
+                url_id, user_id
+            )
+
+            if not row:
+                return None
+
+            return URL(**dict(row))
+
+    async def update(self, url_id: int, user_id: int, changes: dict) -> Optional[URL]:
+        # Column names come from the service, values are parameters
+        updates = [f'{column} = ${index}' for index, column in enumerate(changes, start=1)]
+        updates.append('updated_at = NOW()')
+        param_count = len(changes) + 1
+
+        query = f'''
+            UPDATE urls
+            SET {', '.join(updates)}
+            WHERE id = ${param_count} AND user_id = ${param_count + 1}
+            RETURNING id, short_code, original_url, user_id, clicks, is_active,
+                      is_private, created_at, updated_at
+        '''
+
+        async with db.pool.acquire() as conn:
+            row = await conn.fetchrow(query, *changes.values(), url_id, user_id)
+
+            if not row:
+                return None
+
+            return URL(**dict(row))
+
+    async def delete(self, url_id: int, user_id: int) -> Optional[str]:
+        async with db.pool.acquire() as conn:
+            return await conn.fetchval(
+                'DELETE FROM urls WHERE id = $1 AND user_id = $2 RETURNING short_code',
+                url_id, user_id
+            )
+
+    async def record_access(self, url_id: int, user_email: str, user_type: str) -> None:
+        async with db.guarded_connection() as conn:
+            await conn.execute(
+                '''INSERT INTO url_access_history (url_id, user_email, user_type)
+                VALUES ($1, $2, $3)''',
+                url_id, user_email, user_type
+            )
+
+    async def record_accesses(self, url_ids: List[int], user_email: str, user_type: str) -> None:
+        async with db.guarded_connection() as conn:
+            await conn.execute(
+                '''INSERT INTO url_access_history (url_id, user_email, user_type)
+                SELECT url_id, $2, $3 FROM unnest($1::int[]) AS accessed(url_id)''',
+                url_ids, user_email, user_type
+            )
+
+    async def delete_expired(self) -> int:
+        async with db.pool.acquire() as conn:
+            result = await conn.execute(
+                """
+                DELETE FROM urls
+                WHERE expires_at IS NOT NULL
+                AND expires_at < CURRENT_TIMESTAMP
+                AND is_active = TRUE
+                """
+            )
+
+            # Extract count from result string like "DELETE 5"
+            return int(result.split()[-1]) if result else 0
+
+
+class PostgresUserRepository(UserRepository):
+    """Users in Postgres (asyncpg pool)"""
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        # On the private redirect path, which degrades while the database is down
+        async with db.guarded_connection() as conn:
+            row = await conn.fetchrow(
+                'SELECT * FROM users WHERE id = $1 AND is_active = TRUE',
+                user_id
+            )
+
+            if not row:
+                return None
+
+            return User(**dict(row))
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        async with db.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                'SELECT * FROM users WHERE email = $1 AND is_active = TRUE',
+                email
+            )
+
+            if not row:
+                return None
+
+            return User(**dict(row))
+
+    async def is_taken(self, username: str, email: str, exclude_user_id: Optional[int] = None) -> bool:
+        async with db.pool.acquire() as conn:
+            return await conn.fetchval(
+                '''SELECT EXISTS(
+                    SELECT 1 FROM users
+                    WHERE (username = $1 OR email = $2) AND id IS DISTINCT FROM $3
+                )''',
+                username, email, exclude_user_id
+            )
+
+    async def create(self, username: str, email: str, hashed_password: str) -> User:
+        async with db.pool.acquire() as conn:
+            row = await conn.fetchrow('''
+                INSERT INTO users (username, email, hashed_password, user_type)
+                VALUES ($1, $2, $3, 'registered')
+                RETURNING id, username, email, hashed_password, user_type, guest_uuid, is_active, created_at, updated_at
+            ''', username, email, hashed_password)
+
+            return User(**dict(row))
+
+    async def get_or_create_guest(self, guest_uuid: UUID, username: str) -> Optional[dict]:
+        async with db.pool.acquire() as conn:
+            # Single round trip, safe against concurrent calls with the same UUID:
+            # the no-op update makes RETURNING yield the existing row on conflict
+            user = await conn.fetchrow(
+                """
+                INSERT INTO users (username, user_type, guest_uuid, email, hashed_password)
+                VALUES ($1, 'guest', $2, NULL, NULL)
+                ON CONFLICT (guest_uuid) DO UPDATE SET guest_uuid = EXCLUDED.guest_uuid
+                RETURNING id, username, email, user_type, guest_uuid, is_active, created_at, updated_at
+                """,
+                username,
+                guest_uuid
+            )
+
+        return dict(user) if user else None
+
+    async def get_guest_by_uuid(self, guest_uuid: UUID) -> Optional[dict]:
+        async with db.pool.acquire() as conn:
+            user = await conn.fetchrow(
+                """
+                SELECT id, username, email, user_type, guest_uuid, is_active, created_at, updated_at
+                FROM users
+                WHERE guest_uuid = $1 AND user_type = 'guest'
+                """,
+                guest_uuid
+            )
+
+            return dict(user) if user else None
+
+    async def migrate_guest(self, user_id: int, username: str, email: str, hashed_password: str) -> Optional[dict]:
+        async with db.pool.acquire() as conn:
+            async with conn.transaction():
+                user = await conn.fetchrow(
+                    """
+                    UPDATE users
+                    SET
+                        user_type = 'registered',
+                        username = $1,
+                        email = $2,
+                        hashed_password = $3,
+                        guest_uuid = NULL,
+                        updated_at = CURRENT_TIMESTAMP
+                    FROM users AS previous
+                    WHERE users.id = $4 AND users.user_type = 'guest' AND previous.id = users.id
+                    RETURNING users.id, users.username, users.email, users.user_type, users.is_active,
+                              users.created_at, users.updated_at, previous.guest_uuid AS previous_guest_uuid
+                    """,
+                    username,
+                    email,
+                    hashed_password,
+                    user_id
+                )
+
+                if not user:
+                    return None
+
+                # Remove expires_at from all user's URLs (make them permanent)
+                await conn.execute(
+                    """
+                    UPDATE urls
+                    SET expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = $1
+                    """,
+                    user_id
+                )
+
+                return dict(user)
+
+
+class PostgresVisitorSketchRepository(VisitorSketchRepository):
+    """Visitor sketches in Postgres, merged under row locks so every worker's partial sketches combine"""
+
+    async def merge(self, pending: Dict[SketchKey, HyperLogLog]) -> None:
+        # Sorted keys so concurrent flushes from several workers lock rows in the same order
+        keys = sorted(pending)
+        url_ids = [url_id for url_id, _ in keys]
+        dates = [bucket_date for _, bucket_date in keys]
+
+        async with db.pool.acquire() as conn:
+            async with conn.transaction():
+                # New buckets are inserted as they are (skipping deleted URLs)
+                inserted = await conn.fetch('''
+                    INSERT INTO url_visitor_sketches (url_id, bucket_date, registers)
+                    SELECT s.url_id, s.bucket_date, s.registers
+                    FROM unnest($1::int[], $2::date[], $3::bytea[]) AS s(url_id, bucket_date, registers)
+                    WHERE EXISTS (SELECT 1 FROM urls WHERE urls.id = s.url_id)
+                    ORDER BY s.url_id, s.bucket_date
+                    ON CONFLICT (url_id, bucket_date) DO NOTHING
+                    RETURNING url_id, bucket_date
+                ''', url_ids, dates, [pending[key].to_bytes() for key in keys])
+
+                done = {(row['url_id'], row['bucket_date']) for row in inserted}
+                existing = [key for key in keys if key not in done]
+                if not existing:
+                    return
+
+                # Existing buckets are locked, merged here and written back
+                rows = await conn.fetch('''
+                    SELECT s.url_id, s.bucket_date, s.registers
+                    FROM url_visitor_sketches s
+                    JOIN unnest($1::int[], $2::date[]) AS k(url_id, bucket_date)
+                    ON s.url_id = k.url_id AND s.bucket_date = k.bucket_date
+                    ORDER BY s.url_id, s.bucket_date
+                    FOR UPDATE OF s
+                ''', [url_id for url_id, _ in existing], [bucket_date for _, bucket_date in existing])
+
+                merged = []
+                for row in rows:
+                    sketch = HyperLogLog(row['registers'])
+                    sketch.merge(pending[(row['url_id'], row['bucket_date'])])
+                    merged.append((row['url_id'], row['bucket_date'], sketch.to_bytes()))
+                if not merged:
+                    return
+
+                await conn.execute('''
+                    UPDATE url_visitor_sketches AS s
+                    SET registers = m.registers
+                    FROM unnest($1::int[], $2::date[], $3::bytea[]) AS m(url_id, bucket_date, registers)
+                    WHERE s.url_id = m.url_id AND s.bucket_date = m.bucket_date
+                ''', *map(list, zip(*merged)))
+
+    async def get(self, url_id: int, since: date) -> Dict[date, HyperLogLog]:
+        async with db.pool.acquire() as conn:
+            rows = await conn.fetch('''
+                SELECT bucket_date, registers
+                FROM url_visitor_sketches
+                WHERE url_id = $1 AND bucket_date >= $2
+            ''', url_id, since)
+
+        return {row['bucket_date']: HyperLogLog(row['registers']) for row in rows}
+
+
+class PostgresStorage(Storage):
+    """The asyncpg pool backend (default)"""
+
+    name = "postgres"
+    supports_notifications = True
+
+    def __init__(self):
+        self.urls = PostgresURLRepository()
+        self.users = PostgresUserRepository()
+        self.sketches = PostgresVisitorSketchRepository()
+        self.breaker = db.breaker
+
+    async def connect(self) -> None:
+        await db.connect()
+
+    async def disconnect(self) -> None:
+        await db.disconnect()
+
+    async def ping(self, timeout: float) -> dict:
+        start = time.perf_counter()
+        try:
+            conn = await db.pool.acquire(timeout=timeout)
+        except asyncio.TimeoutError:
+            # Every connection checked out: this worker's pool is saturated,
+            # reported as a slow acquire (anything else is an outage)
+            if db.pool.get_idle_size() or db.pool.get_size() < db.pool.get_max_size():
+                raise
+            return {
+                "acquire_ms": round((time.perf_counter() - start) * 1000, 3),
+                "query_ms": None,
+                "pool_size": db.pool.get_size(),
+                "pool_idle": 0,
+            }
+
+        try:
+            acquired = time.perf_counter()
+            await conn.fetchval("SELECT 1", timeout=timeout)
+        finally:
+            await db.pool.release(conn)
+        done = time.perf_counter()
+        return {
+            "acquire_ms": round((acquired - start) * 1000, 3),
+            "query_ms": round((done - acquired) * 1000, 3),
+            "pool_size": db.pool.get_size(),
+            "pool_idle": db.pool.get_idle_size(),
+        }
@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException, status, Header
+from fastapi import APIRouter, HTTPException, status, Header, Query
+from fastapi.responses import PlainTextResponse, Response
 from services import guest_service
+from services.hot_links import hot_links
+from services.profiler import profile_store
+from repositories import storage
+from database.query_stats import query_stats
+from database.admission import admission
 from config import settings
-from typing import Optional
+from typing import Literal, Optional
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -26,3 +32,129 @@ async def cleanup_expired_urls(x_admin_key: Optional[str] = Header(None)):
         "message": "Cleanup completed",
         "deleted_urls": deleted_count
     }
+
+
+@router.get("/hot-links")
+async def get_hot_links(
+    limit: int = Query(50, ge=1, le=1000, description="Number of short codes to return"),
+    x_admin_key: Optional[str] = Header(None)
+):
+    """
+    Most redirected short codes in the recent window - Admin endpoint
+    Requires X-Admin-Key header with SECRET_KEY
+    Counts are upper bounds; count - error is a guaranteed lower bound
+    """
+    if x_admin_key != settings.SECRET_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin key"
+        )
+    
+    return hot_links.top(limit)
+
+
+@router.get("/circuit-breaker")
+async def get_circuit_breaker(x_admin_key: Optional[str] = Header(None)):
+    """
+    Database circuit breaker state - Admin endpoint
+    Requires X-Admin-Key header with SECRET_KEY
+    """
+    if x_admin_key != settings.SECRET_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin key"
+        )
+    
+    return storage.breaker.snapshot()
+
+
+@router.get("/admission")
+async def get_admission(x_admin_key: Optional[str] = Header(None)):
+    """
+    Admission control state per endpoint class in this worker - Admin endpoint
+    Requires X-Admin-Key header with SECRET_KEY
+    """
+    if x_admin_key != settings.SECRET_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin key"
+        )
+    
+    return {name: limiter.snapshot() for name, limiter in admission.items()}
+
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(20, ge=1, le=1000, description="Number of fingerprints to return"),
+    order: Literal["total", "max", "mean", "count"] = Query("total", description="Ranking"),
+    x_admin_key: Optional[str] = Header(None)
+):
+    """
+    Query statistics per SQL fingerprint in this worker - Admin endpoint
+    Requires X-Admin-Key header with SECRET_KEY
+    Literals and parameters are normalized to '?'; `slow` counts calls over
+    SLOW_QUERY_THRESHOLD_MS (each one is also logged with its route)
+    """
+    if x_admin_key != settings.SECRET_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin key"
+        )
+    
+    return query_stats.snapshot(limit, order, settings.SLOW_QUERY_THRESHOLD_MS)
+
+
+@router.get("/profiles")
+async def list_profiles(x_admin_key: Optional[str] = Header(None)):
+    """
+    Request profiles captured by this worker (every worker on the host with
+    PROFILING_SHARED_ENABLED), newest first - Admin endpoint
+    Requires X-Admin-Key header with SECRET_KEY
+    Send X-Profile: 1 (with X-Admin-Key) on any request to profile it
+    """
+    if x_admin_key != settings.SECRET_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin key"
+        )
+    
+    return {
+        "max_profiles": profile_store.max_profiles,
+        "sample_rate": settings.PROFILING_SAMPLE_RATE,
+        "profiles": await profile_store.list()
+    }
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: Literal["pstats", "text"] = Query("pstats", description="pstats dump or text report"),
+    sort: Literal["cumulative", "tottime", "calls"] = Query("cumulative", description="Text report order"),
+    limit: int = Query(50, ge=1, le=1000, description="Functions in the text report"),
+    x_admin_key: Optional[str] = Header(None)
+):
+    """
+    Download a captured profile - Admin endpoint
+    Requires X-Admin-Key header with SECRET_KEY
+    The pstats file opens with `python -m pstats` or snakeviz
+    """
+    if x_admin_key != settings.SECRET_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin key"
+        )
+    
+    captured = await profile_store.get(profile_id)
+    if captured is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    
+    if format == "text":
+        return PlainTextResponse(captured.to_text(sort, limit))
+    return Response(
+        captured.to_pstats(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'}
+    )
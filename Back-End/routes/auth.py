@@ -4,10 +4,12 @@ from services import auth_service
 from services import guest_service
 from config import settings
 from middleware.auth import get_current_user_from_cookie
+from middleware.rate_limit import rate_limit
+from middleware.admission import admission_control
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(admission_control("auth"))])
 async def login(login_data: UserLogin, response: Response):
     """
     Login endpoint - Public
@@ -47,7 +49,7 @@ async def login(login_data: UserLogin, response: Response):
     }
 
 
-@router.post("/guest")
+@router.post("/guest", dependencies=[Depends(rate_limit("guest", by_user=False)), Depends(admission_control("auth"))])
 async def create_guest_session(guest_data: GuestCreate, response: Response):
     """
     Create guest user session - Public
@@ -90,7 +92,7 @@ async def create_guest_session(guest_data: GuestCreate, response: Response):
     }
 
 
-@router.post("/register")
+@router.post("/register", dependencies=[Depends(admission_control("auth"))])
 async def register(user_data: UserCreate, response: Response):
     """
     Register a new user - Public
@@ -129,7 +131,7 @@ async def register(user_data: UserCreate, response: Response):
     }
 
 
-@router.post("/migrate")
+@router.post("/migrate", dependencies=[Depends(admission_control("auth"))])
 async def migrate_guest_to_registered(
     migration_data: MigrateGuestUser,
     response: Response,
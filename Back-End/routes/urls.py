@@ -1,11 +1,17 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Response, Query, UploadFile, File
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response, Query, UploadFile, File
 from fastapi.responses import StreamingResponse
-from models import URLCreate, URLUpdate, URLResponse, User, URLBulkCreate, URLAccessHistory
-from services import url_service, guest_service
+from models import URLCreate, URLUpdate, URLResponse, User, URLAccessHistory, URLResolveRequest, URLResolveResult
+from services import url_service
+from services.guest_service import guest_service
+from services.bulk_import_service import bulk_import_service
+from services.visitor_stats import visitor_stats
+from services.hot_links import hot_links
 from services.auth_service import registered_user_service
 from services.base_user_service import BaseUserService
-from middleware import get_current_user_from_cookie, get_optional_user_from_cookie
+from middleware import get_current_user_from_cookie, get_redirect_user, rate_limit, admission_control, get_visitor_fingerprint
 from config import settings
+from utils.bulk_parser import detect_format, parse_rows
+from utils.http_cache import NO_STORE, redirect_cache_headers, weak_etag, etag_matches
 import json
 from io import BytesIO
 from datetime import datetime, timezone
@@ -20,31 +26,38 @@ def get_user_service(user_type: str) -> BaseUserService:
     return guest_service if user_type == 'guest' else registered_user_service
 
 
-@router.get("/{short_code}")
-async def resolve_url(short_code: str, current_user: User = Depends(get_optional_user_from_cookie)):
+@router.get("/{short_code}", dependencies=[Depends(rate_limit("redirect"))])
+async def resolve_url(short_code: str, request: Request, response: Response):
     """
     Resolve short URL and redirect - Public (unless URL is private)
-    Returns 301 redirect to original URL
+    Returns a redirect to original URL (REDIRECT_STATUS_CODE, 301 by default)
+    with Cache-Control derived from privacy and expiration, so browsers and
+    CDNs can serve repeat visits (those are not counted as clicks)
     If URL is private or not found, redirects to frontend for error handling
     Guest users cannot access private URLs (only registered users)
+    The session is only looked up for private URLs, so public redirects
+    need no user query and carry no Set-Cookie; while the database is down
+    the user cannot be verified and private URLs answer unauthorized
     """
-    url = await url_service.get_url_by_short_code(short_code)
+    url = await url_service.get_redirect_record(short_code)
     
     if not url:
         # Redirect to frontend with 404 status
         return Response(
             status_code=status.HTTP_302_FOUND,
-            headers={"Location": f"{settings.FRONTEND_URL}/{short_code}?error=not_found"}
+            headers={"Location": f"{settings.FRONTEND_URL}/{short_code}?error=not_found", **NO_STORE}
         )
     
     # Check if URL is private - guests and non-authenticated users cannot access
     if url.is_private:
+        current_user = await get_redirect_user(request, response)
+        
         # Not authenticated at all
         if not current_user:
             # Save short_code in cookie for post-login redirect
             response = Response(
                 status_code=status.HTTP_302_FOUND,
-                headers={"Location": f"{settings.FRONTEND_URL}/{short_code}?error=unauthorized"}
+                headers={"Location": f"{settings.FRONTEND_URL}/{short_code}?error=unauthorized", **NO_STORE}
             )
             
             return response
@@ -53,7 +66,7 @@ async def resolve_url(short_code: str, current_user: User = Depends(get_optional
         if current_user.user_type == 'guest':
             return Response(
                 status_code=status.HTTP_302_FOUND,
-                headers={"Location": f"{settings.FRONTEND_URL}/{short_code}?error=guest_forbidden"}
+                headers={"Location": f"{settings.FRONTEND_URL}/{short_code}?error=guest_forbidden", **NO_STORE}
             )
         
         # Record access for authenticated users accessing private URLs
@@ -63,14 +76,66 @@ async def resolve_url(short_code: str, current_user: User = Depends(get_optional
     # Increment click counter
     await url_service.increment_clicks(short_code)
     
-    # Return 301 redirect to original URL
+    if settings.VISITOR_STATS_ENABLED:
+        visitor_stats.record(url.id, get_visitor_fingerprint(request))
+    if settings.HOT_LINKS_ENABLED:
+        hot_links.record(short_code)
+    
+    # Redirect to original URL
     return Response(
-        status_code=status.HTTP_301_MOVED_PERMANENTLY,
-        headers={"Location": url.original_url}
+        status_code=settings.REDIRECT_STATUS_CODE,
+        headers={
+            "Location": url.original_url,
+            **redirect_cache_headers(short_code, url.is_private, url.seconds_until_expiry())
+        }
     )
 
 
-@router.post("/urls")
+@router.post("/urls/resolve", dependencies=[Depends(rate_limit("resolve"))])
+async def resolve_urls(
+    resolve_data: URLResolveRequest,
+    current_user: User = Depends(get_redirect_user)
+):
+    """
+    Resolve many short codes in one request - Public (unless URL is private)
+    Returns the target and status for each code without redirecting
+    Same private URL rules as resolve_url; clicks are not counted
+    Max 100 short codes per request
+    """
+    short_codes = list(dict.fromkeys(resolve_data.short_codes))
+    records = await url_service.get_redirect_records(short_codes)
+    
+    results = []
+    private_accessed = []
+    for short_code in short_codes:
+        url = records.get(short_code)
+        
+        if not url:
+            results.append(URLResolveResult(short_code=short_code, status='not_found'))
+            continue
+        
+        # Check if URL is private - guests and non-authenticated users cannot access
+        if url.is_private:
+            if not current_user:
+                results.append(URLResolveResult(short_code=short_code, status='unauthorized'))
+                continue
+            
+            if current_user.user_type == 'guest':
+                results.append(URLResolveResult(short_code=short_code, status='guest_forbidden'))
+                continue
+            
+            private_accessed.append(url.id)
+        
+        results.append(URLResolveResult(short_code=short_code, status='ok', original_url=url.original_url))
+    
+    # Record access for authenticated users accessing private URLs
+    if private_accessed and current_user.email:
+        await url_service.record_url_accesses(private_accessed, current_user.email, current_user.user_type)
+    
+    return {"results": results}
+
+
+@router.post("/urls", dependencies=[Depends(rate_limit("create")), Depends(admission_control("write"))])
 async def create_url(
     url_data: URLCreate,
     current_user: User = Depends(get_current_user_from_cookie)
@@ -79,6 +144,7 @@ async def create_url(
     Create a shortened URL - Requires Cookie Auth
     Guest users: limited to 5 URLs, expire in 7 days, cannot create private URLs
     Registered users: limited to 100 URLs, no expiration, can create private URLs
+    With `dedupe`, returns your existing short URL for the same target instead
     """
     # Guest users cannot create private URLs
     if current_user.user_type == 'guest' and url_data.is_private:
@@ -87,6 +153,22 @@ async def create_url(
             detail="Guest users cannot create private URLs. Please register to use this feature."
         )
     
+    # Existing URLs don't count against the quota
+    url = None
+    if url_data.dedupe:
+        url = await url_service.find_duplicate_url(current_user.id, url_data.original_url, url_data.is_private)
+    if url:
+        return URLResponse(
+            id=url.id,
+            short_code=url.short_code,
+            original_url=url.original_url,
+            clicks=url.clicks,
+            is_active=url.is_active,
+            is_private=url.is_private,
+            created_at=url.created_at,
+            expires_at=url.expires_at
+        )
+    
     # Get appropriate user service and check if user can create URL
     user_service = get_user_service(current_user.user_type)
     can_create = await user_service.can_create_url(current_user.id)
@@ -122,8 +204,10 @@ async def create_url(
     )
 
 
-@router.get("/urls/me/all")
+@router.get("/urls/me/all", dependencies=[Depends(admission_control("export"))])
 async def get_my_urls(
+    request: Request,
+    response: Response,
     offset: int = Query(0, ge=0, description="Number of records to skip"),
     with_history: bool = Query(False, description="Include access history for each URL"),
     export: bool = Query(False, description="Export all URLs as JSON file"),
@@ -134,6 +218,9 @@ async def get_my_urls(
     Supports pagination (offset/limit) and optional access history
     Returns total count for frontend pagination calculations
     
+    Sends a weak ETag; with a matching If-None-Match returns 304 without
+    loading the page
+    
     If export=true, ignores pagination and returns all URLs as downloadable JSON file
     
     """
@@ -142,8 +229,23 @@ async def get_my_urls(
     if export:
         return await get_as_file(current_user, with_history, offset)
     
+    # Conditional GET on the user's change marker
+    total, last_updated, last_access = await url_service.get_user_urls_state(current_user.id, with_history)
+    etag = weak_etag(current_user.id, total, last_updated, last_access, offset, with_history)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Cookie"}
+    
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        not_modified = Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+        # Keep the refreshed session cookie set by the auth dependency
+        for name, value in response.raw_headers:
+            if name == b"set-cookie":
+                not_modified.raw_headers.append((name, value))
+        return not_modified
+    
+    response.headers.update(cache_headers)
+    
     # Normal pagination mode
-    return await get_as_json(current_user, with_history, offset)
+    return await get_as_json(current_user, with_history, offset, total)
 
 
 async def get_as_file(current_user: User, with_history: bool, offset: int = 0):
@@ -173,8 +275,6 @@ async def get_as_file(current_user: User, with_history: bool, offset: int = 0):
             "created_at": url.created_at.isoformat(),
             "expires_at": url.expires_at.isoformat() if url.expires_at else None
         }
-
-        print(url_dict)
         
         # Add access history if requested
         if with_history and hasattr(url, 'access_history'):
@@ -206,12 +306,12 @@ async def get_as_file(current_user: User, with_history: bool, offset: int = 0):
     )
 
 
-async def get_as_json(current_user: User, with_history: bool, offset: int = 0):
+async def get_as_json(current_user: User, with_history: bool, offset: int = 0, total: int = None):
     """
     Helper function to return URLs as JSON response with pagination
     """
     # Get paginated URLs
-    total, urls = await url_service.get_user_urls(current_user.id,offset,with_history)
+    total, urls = await url_service.get_user_urls(current_user.id, offset, with_history, total)
     
     response_urls = []
     for url in urls:
@@ -241,8 +341,37 @@ async def get_as_json(current_user: User, with_history: bool, offset: int = 0):
     }
 
 
+@router.get("/urls/{url_id}/stats", dependencies=[Depends(admission_control("export"))])
+async def get_url_stats(
+    url_id: int,
+    days: int = Query(30, ge=1, le=365, description="Days to include (UTC, today included)"),
+    current_user: User = Depends(get_current_user_from_cookie)
+):
+    """
+    Visitor stats of a URL - Requires Cookie Auth (owner only)
+    Unique visitors are approximate (HyperLogLog, ~2% error) and counted
+    by signed-in user or by IP + User-Agent
+    """
+    url = await url_service.get_url_by_id(url_id, current_user.id)
+    
+    if not url:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="URL not found or you don't have permission to view it"
+        )
+    
+    stats = await visitor_stats.get_stats(url_id, days)
+    
+    return {
+        "url_id": url.id,
+        "short_code": url.short_code,
+        "clicks": url.clicks,
+        "days": days,
+        **stats
+    }
 
-@router.put("/urls/{url_id}")
+
+@router.put("/urls/{url_id}", dependencies=[Depends(admission_control("write"))])
 async def edit_url(
     url_id: int,
     url_data: URLUpdate,
@@ -280,7 +409,7 @@ async def edit_url(
     )
 
 
-@router.delete("/urls/{url_id}")
+@router.delete("/urls/{url_id}", dependencies=[Depends(admission_control("write"))])
 async def delete_url(
     url_id: int,
     current_user: User = Depends(get_current_user_from_cookie)
@@ -300,15 +429,19 @@ async def delete_url(
     return {"message": "URL deleted successfully"}
 
 
-@router.post("/urls/bulk")
+@router.post("/urls/bulk", dependencies=[Depends(rate_limit("bulk")), Depends(admission_control("write"))])
 async def create_urls_bulk(
     file: UploadFile = File(...),
+    dedupe: bool = Query(False, description="Return existing URLs instead of creating duplicates"),
     current_user: User = Depends(get_current_user_from_cookie)
 ):
     """
-    Create multiple shortened URLs from JSON file - Requires Cookie Auth
+    Create multiple shortened URLs from a file - Requires Cookie Auth
     
-    JSON format: {"urls": [{"url": "https://example.com", "is_private": false}, ...]}
+    Formats (by file extension), parsed incrementally:
+    - .json: {"urls": [{"url": "https://example.com", "is_private": false}, ...]} or a bare array
+    - .ndjson / .jsonl: one {"url": ..., "is_private": ...} object per line
+    - .csv: header row with a `url` column and optional `is_private` column
     
     Guest users: 
     - Limited to 5 total URLs (existing + new)
@@ -319,56 +452,48 @@ async def create_urls_bulk(
     - Max 100 URLs (total)
     - Can create private URLs
     - No expiration
-
-    Max 100 URLs per request
+    
+    Valid rows are created in batches; invalid rows and rows over the
+    user's limit are reported individually in `errors`
+    
+    With `dedupe=true`, repeated URLs in the file are skipped and URLs you
+    already shortened are returned in `urls` without using your quota
     """
     # Validate file type
-    if not file.filename.endswith('.json'):
+    fmt = detect_format(file.filename)
+    if not fmt:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File must be a JSON file"
+            detail="File must be a JSON, NDJSON or CSV file"
         )
     
-    try:
-        # Read and parse JSON file
-        content = await file.read()
-        data = json.loads(content)
-        
-        # Validate using Pydantic model
-        bulk_data = URLBulkCreate(**data)
-        
-    except json.JSONDecodeError:
+    # Get appropriate user service
+    user_service = get_user_service(current_user.user_type)
+    
+    result = await bulk_import_service.import_urls(
+        parse_rows(fmt, file.read),
+        current_user,
+        user_service,
+        dedupe
+    )
+    
+    # Nothing usable in the file
+    if result.created == 0 and not result.deduplicated and result.format_error:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid JSON format"
+            detail=result.format_error
         )
-    except ValueError as e:
+    if result.rows == 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
+            detail="URLs list cannot be empty"
         )
-    
-    # Check if any URL is private and user is guest
-    if current_user.user_type == 'guest':
-        if any(url_item.is_private for url_item in bulk_data.urls):
-            raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Guest users cannot create private URLs. Please register to use this feature."
-            )
-        
-    # Get appropriate user service
-    user_service = get_user_service(current_user.user_type)
-    
-    # Get remaining URL slots
-    remaining_urls = await user_service.get_remaining_urls(current_user.id)
-    urls_to_create = len(bulk_data.urls)
-    
-    # Check if user would exceed their limit
-    if remaining_urls is not None and urls_to_create > remaining_urls:
+    # Check if every valid row was over the user's limit
+    if result.created == 0 and not result.deduplicated and result.over_quota and result.over_quota == result.failed:
         current_count = await user_service.get_url_count(current_user.id)
         user_type_label = 'Guest users' if current_user.user_type == 'guest' else 'Registered users'
         detail_msg = f"{user_type_label} can only create {user_service.max_urls} URLs total. "
-        detail_msg += f"You have {current_count} URLs and are trying to create {urls_to_create} more."
+        detail_msg += f"You have {current_count} URLs and are trying to create {result.over_quota} more."
         if current_user.user_type == 'guest':
             detail_msg += " Please register for more URLs."
         
@@ -377,16 +502,13 @@ async def create_urls_bulk(
             detail=detail_msg
         )
     
-    
-    # Prepare data for bulk creation
-    urls_data = [(url_item.url, url_item.is_private) for url_item in bulk_data.urls]
-    
-    # Create URLs in bulk
-    created_urls = await url_service.create_urls_bulk(urls_data, current_user.id, current_user.user_type)
-    
-    # Return created URLs
+    # Return created URLs and per-row errors
     return {
-        "message": f"Successfully created {len(created_urls)} URLs",
+        "message": f"Successfully created {result.created} URLs",
+        "created": result.created,
+        "failed": result.failed,
+        "deduplicated": result.deduplicated,
+        "format_error": result.format_error,
         "urls": [
             URLResponse(
                 id=url.id,
@@ -398,6 +520,7 @@ async def create_urls_bulk(
                 created_at=url.created_at,
                 expires_at=url.expires_at
             )
-            for url in created_urls
-        ]
+            for url in result.urls
+        ],
+        "errors": result.errors
     }
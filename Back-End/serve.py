@@ -0,0 +1,236 @@
+"""
+Production launcher: N uvicorn workers serving one port
+
+Workers share a listening socket opened here (or, with --reuse-port, each
+binds its own with SO_REUSEPORT and the kernel balances connections).
+Each worker's DB_POOL_MAX_SIZE is lowered so that every pool plus one
+notification listener connection per worker fits DB_CONNECTION_BUDGET,
+counting one extra worker for rolling restarts, and the ADMISSION_*_LIMIT
+values are scaled down with it so requests are shed before the pool runs
+out.
+
+Signals:
+    SIGHUP           rolling restart: one worker at a time, the new one is
+                     serving before the old one drains (reloads code and .env)
+    SIGTERM, SIGINT  graceful stop (in-flight requests finish)
+A worker that exits on its own is replaced.
+
+Usage (from Back-End/):
+    python serve.py [--workers N] [--host HOST] [--port PORT] [--reuse-port]
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+from config import settings
+from database.admission import admission_limits, configured_limits
+from utils.event_log import event_log
+
+
+# Supervisor loop period
+TICK_SECONDS = 0.5
+# Workers that die sooner than this after starting are restarted after a delay
+MIN_UPTIME_SECONDS = 5
+# Startup includes the cache warm-up, bounded by its own time budget
+STARTUP_TIMEOUT_SECONDS = 60 + settings.WARMUP_TIME_BUDGET_SECONDS
+
+
+def pool_sizes(workers: int, budget: int) -> Tuple[int, int]:
+    """(min_size, max_size) of each worker's pool within the connection budget"""
+    listeners = 1 if settings.CACHE_INVALIDATION_ENABLED else 0
+    # One extra worker runs while a rolling restart replaces another
+    per_worker = budget // (workers + 1) - listeners
+    if per_worker < 1:
+        raise SystemExit(f"DB_CONNECTION_BUDGET={budget} is too small for {workers} workers")
+    max_size = min(settings.DB_POOL_MAX_SIZE, per_worker)
+    return min(settings.DB_POOL_MIN_SIZE, max_size), max_size
+
+
+def worker_admission_limits(pool_max_size: int) -> Dict[str, int]:
+    """
+    Admission limits for a worker pool of pool_max_size: the limits for the
+    configured DB_POOL_MAX_SIZE scaled down with it (at least 1 per class),
+    trimming the largest classes if rounding up overshoots the pool
+    """
+    try:
+        full = admission_limits(settings.DB_POOL_MAX_SIZE, configured_limits())
+        scale = min(1.0, pool_max_size / settings.DB_POOL_MAX_SIZE)
+        limits = {name: max(1, int(limit * scale)) for name, limit in full.items()}
+        while sum(limits.values()) > pool_max_size and max(limits.values()) > 1:
+            largest = max(limits, key=limits.get)
+            limits[largest] -= 1
+        return admission_limits(pool_max_size, limits)
+    except ValueError as e:
+        raise SystemExit(f"{e}; raise DB_CONNECTION_BUDGET or use fewer workers")
+
+
+def bind_socket(host: str, port: int, reuse_port: bool) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: Optional[socket.socket], host: str, port: int, graceful_timeout: float, ready) -> None:
+    """Worker process (spawned, so it imports the app and settings afresh)"""
+    import uvicorn
+
+    class WorkerServer(uvicorn.Server):
+        async def startup(self, sockets=None) -> None:
+            await super().startup(sockets)
+            if not self.should_exit:
+                ready.set()
+
+    if sock is None:
+        sock = bind_socket(host, port, reuse_port=True)
+    config = uvicorn.Config(
+        "main:app",
+        log_level="warning",
+        # Requests are logged by the app's access log middleware
+        access_log=False,
+        timeout_graceful_shutdown=graceful_timeout,
+    )
+    WorkerServer(config).run(sockets=[sock])
+
+
+class Worker:
+    """A worker process and when it was started"""
+
+    def __init__(self, process: multiprocessing.Process, ready):
+        self.process = process
+        self.ready = ready
+        self.started_at = time.monotonic()
+
+
+class Supervisor:
+    """Starts the workers, replaces dead ones and restarts them on SIGHUP"""
+
+    def __init__(self, args):
+        self.args = args
+        self.context = multiprocessing.get_context("spawn")
+        self.sock = None if args.reuse_port else bind_socket(args.host, args.port, reuse_port=False)
+        self.workers: List[Worker] = []
+        self.should_exit = False
+        self.reload_requested = False
+
+    def spawn(self) -> Worker:
+        ready = self.context.Event()
+        process = self.context.Process(
+            target=run_worker,
+            args=(self.sock, self.args.host, self.args.port, self.args.graceful_timeout, ready),
+            daemon=False
+        )
+        process.start()
+        event_log.log("worker_started", worker_pid=process.pid)
+        return Worker(process, ready)
+
+    def wait_ready(self, worker: Worker) -> bool:
+        deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+        while time.monotonic() < deadline and not self.should_exit:
+            if worker.ready.wait(TICK_SECONDS):
+                return True
+            if not worker.process.is_alive():
+                return False
+        return False
+
+    def stop(self, workers: List[Worker]) -> None:
+        """SIGTERM (uvicorn drains in-flight requests), then kill after the grace period"""
+        for worker in workers:
+            if worker.process.is_alive():
+                worker.process.terminate()
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        for worker in workers:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                event_log.log("worker_killed", "warning", worker_pid=worker.process.pid)
+                worker.process.kill()
+                worker.process.join()
+
+    def rolling_restart(self) -> None:
+        event_log.log("rolling_restart_started", workers=len(self.workers))
+        for index, old in enumerate(list(self.workers)):
+            new = self.spawn()
+            if not self.wait_ready(new):
+                # Keep the remaining old workers serving
+                event_log.log("rolling_restart_aborted", "error", worker_pid=new.process.pid)
+                self.stop([new])
+                return
+            self.workers[index] = new
+            self.stop([old])
+        event_log.log("rolling_restart_finished", workers=len(self.workers))
+
+    def replace_dead(self) -> None:
+        for index, worker in enumerate(self.workers):
+            if worker.process.is_alive() or self.should_exit:
+                continue
+            # Crash loops are slowed down instead of spinning
+            if time.monotonic() - worker.started_at < MIN_UPTIME_SECONDS:
+                continue
+            event_log.log("worker_exited", "warning", worker_pid=worker.process.pid, exit_code=worker.process.exitcode)
+            self.workers[index] = self.spawn()
+
+    def run(self) -> int:
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, "reload_requested", True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "should_exit", True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, "should_exit", True))
+
+        self.workers = [self.spawn() for _ in range(self.args.workers)]
+        event_log.log(
+            "server_started",
+            host=self.args.host,
+            port=self.args.port,
+            workers=self.args.workers,
+            reuse_port=self.args.reuse_port,
+            pool_max_size=os.environ["DB_POOL_MAX_SIZE"],
+            admission_limits={name: os.environ[f"ADMISSION_{name.upper()}_LIMIT"] for name in configured_limits()}
+        )
+
+        while not self.should_exit:
+            time.sleep(TICK_SECONDS)
+            if self.reload_requested:
+                self.reload_requested = False
+                self.rolling_restart()
+            self.replace_dead()
+
+        event_log.log("server_stopping", workers=len(self.workers))
+        self.stop(self.workers)
+        if self.sock is not None:
+            self.sock.close()
+        return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS or os.cpu_count() or 1)
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--reuse-port", action="store_true", help="One SO_REUSEPORT socket per worker (Linux)")
+    parser.add_argument("--graceful-timeout", type=float, default=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS)
+    parser.add_argument("--connection-budget", type=int, default=settings.DB_CONNECTION_BUDGET)
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and settings.STORAGE_BACKEND == "memory":
+        parser.error("memory storage is per worker, use --workers 1")
+
+    # Workers are spawned with this environment, so they read the sizes as settings
+    min_size, max_size = pool_sizes(args.workers, args.connection_budget)
+    os.environ["DB_POOL_MIN_SIZE"] = str(min_size)
+    os.environ["DB_POOL_MAX_SIZE"] = str(max_size)
+    for name, limit in worker_admission_limits(max_size).items():
+        os.environ[f"ADMISSION_{name.upper()}_LIMIT"] = str(limit)
+
+    return Supervisor(args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 from typing import Optional
 from datetime import timedelta
-from database import db
+from repositories import storage
 from models import User, UserCreate, UserLogin
 from utils import verify_password, get_password_hash, create_access_token
 from config import settings
@@ -27,59 +27,32 @@ class AuthService:
     @staticmethod
     async def create_user(user_data: UserCreate) -> Optional[User]:
         """Create a new user"""
-        async with db.pool.acquire() as conn:
-            # Check if user already exists
-            existing = await conn.fetchrow(
-                'SELECT id FROM users WHERE username = $1 OR email = $2',
-                user_data.username, user_data.email
-            )
-            
-            if existing:
-                return None
-            
-            # Hash password and create user
-            hashed_password = get_password_hash(user_data.password)
-            
-            row = await conn.fetchrow('''
-                INSERT INTO users (username, email, hashed_password, user_type)
-                VALUES ($1, $2, $3, 'registered')
-                RETURNING id, username, email, hashed_password, user_type, guest_uuid, is_active, created_at, updated_at
-            ''', user_data.username, user_data.email, hashed_password)
-            
-            return User(**dict(row))
+        # Check if user already exists
+        if await storage.users.is_taken(user_data.username, user_data.email):
+            return None
+        
+        # Hash password and create user
+        hashed_password = get_password_hash(user_data.password)
+        
+        return await storage.users.create(user_data.username, user_data.email, hashed_password)
     
     @staticmethod
     async def authenticate_user(login_data: UserLogin) -> Optional[User]:
         """Authenticate a user"""
-        async with db.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                'SELECT * FROM users WHERE email = $1 AND is_active = TRUE',
-                login_data.email
-            )
-            
-            if not row:
-                return None
-            
-            user = User(**dict(row))
-            
-            if not verify_password(login_data.password, user.hashed_password):
-                return None
-            
-            return user
+        user = await storage.users.get_by_email(login_data.email)
+        
+        if not user:
+            return None
+        
+        if not verify_password(login_data.password, user.hashed_password):
+            return None
+        
+        return user
     
     @staticmethod
     async def get_user_by_id(user_id: int) -> Optional[User]:
         """Get user by ID"""
-        async with db.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                'SELECT * FROM users WHERE id = $1 AND is_active = TRUE',
-                user_id
-            )
-            
-            if not row:
-                return None
-            
-            return User(**dict(row))
+        return await storage.users.get_by_id(user_id)
     
     @staticmethod
     def create_token(user: User, expire_minutes: int = None) -> str:
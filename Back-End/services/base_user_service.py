@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from database import db
+from repositories import storage
 from typing import Optional
 
 
@@ -29,17 +29,7 @@ class BaseUserService(ABC):
         """
         Get count of active URLs for a user
         """
-        async with db.pool.acquire() as conn:
-            result = await conn.fetchval(
-                """
-                SELECT COUNT(*) 
-                FROM urls 
-                WHERE user_id = $1
-                """,
-                user_id
-            )
-            
-            return result or 0
+        return await storage.urls.count_by_user(user_id)
     
     async def can_create_url(self, user_id: int) -> bool:
         """
@@ -0,0 +1,210 @@
+import asyncio
+from typing import AsyncIterator, List, Optional, Tuple
+from pydantic import ValidationError
+from config import settings
+from database import DatabaseUnavailableError
+from models import URL, URLBulkItem, User
+from utils.bulk_parser import ParsedRow, BulkFormatError
+from utils.event_log import event_log
+from utils.url_normalizer import url_hash
+from .base_user_service import BaseUserService
+from .url_service import url_service
+
+
+# Per-row errors returned to the client (the rest are only counted)
+MAX_REPORTED_ERRORS = 100
+# Created URLs returned in the response (the rest are only counted)
+MAX_RETURNED_URLS = 1000
+
+# (created URLs, existing URLs, rows of a batch whose insert failed, error)
+BatchOutcome = Tuple[List[URL], List[URL], List[int], Optional[str]]
+
+
+class BulkImportResult:
+    """Outcome of a streaming bulk import"""
+    
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.failed = 0
+        self.over_quota = 0
+        self.deduplicated = 0
+        # Rows matched to an existing URL or in a failed batch (refunded from the quota)
+        self.refunded = 0
+        self.urls: List[URL] = []
+        self.errors: List[dict] = []
+        self.format_error: Optional[str] = None
+    
+    def add_error(self, row: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+    
+    def add_created(self, urls: List[URL]) -> None:
+        self.created += len(urls)
+        room = MAX_RETURNED_URLS - len(self.urls)
+        if room > 0:
+            self.urls.extend(urls[:room])
+    
+    def add_existing(self, urls: List[URL]) -> None:
+        """Existing URLs returned instead of creating duplicates"""
+        self.deduplicated += len(urls)
+        room = MAX_RETURNED_URLS - len(self.urls)
+        if room > 0:
+            self.urls.extend(urls[:room])
+
+
+class BulkImportService:
+    """
+    Streaming bulk URL import
+    Rows are validated as they are parsed and inserted in batches; the
+    insert of one batch overlaps with parsing of the next, and each batch
+    is its own transaction, so memory stays bounded for large files
+    A batch whose insert fails is reported as per-row errors and the
+    import goes on, so earlier committed batches are always returned
+    """
+    
+    async def import_urls(
+        self,
+        rows: AsyncIterator[ParsedRow],
+        current_user: User,
+        user_service: BaseUserService,
+        dedupe: bool = False
+    ) -> BulkImportResult:
+        """
+        Import parsed rows for a user
+        Rows beyond the user's remaining quota are rejected individually
+        With dedupe, repeated URLs in the file are skipped and URLs the user
+        already shortened are returned instead of creating new ones
+        """
+        result = BulkImportResult()
+        batch_size = settings.BULK_IMPORT_BATCH_SIZE
+        remaining = await user_service.get_remaining_urls(current_user.id)
+        accepted = 0
+        seen = set()
+        
+        batch: List[tuple] = []
+        pending: Optional[asyncio.Task] = None
+        
+        try:
+            async for row, data, error in rows:
+                result.rows += 1
+                if result.rows > settings.BULK_IMPORT_MAX_ROWS:
+                    result.format_error = f"Too many rows (max {settings.BULK_IMPORT_MAX_ROWS})"
+                    break
+                
+                if error:
+                    result.add_error(row, error)
+                    continue
+                
+                try:
+                    item = URLBulkItem(**data)
+                except ValidationError as e:
+                    result.add_error(row, e.errors()[0]['msg'])
+                    continue
+                
+                if current_user.user_type == 'guest' and item.is_private:
+                    result.add_error(row, "Guest users cannot create private URLs")
+                    continue
+                
+                if dedupe:
+                    key = (url_hash(item.url), item.is_private)
+                    if key in seen:
+                        result.deduplicated += 1
+                        continue
+                    seen.add(key)
+                
+                # Existing URLs found at flush time don't count against the quota
+                if remaining is not None and accepted - result.refunded >= remaining:
+                    result.over_quota += 1
+                    result.add_error(row, f"URL limit reached ({user_service.max_urls} URLs)")
+                    continue
+                
+                accepted += 1
+                batch.append((row, item.url, item.is_private))
+                
+                if len(batch) >= batch_size:
+                    pending = await self._flush(pending, batch, current_user, result, dedupe)
+                    batch = []
+        
+        except BulkFormatError as e:
+            # Keep what was parsed before the error
+            result.format_error = str(e)
+        
+        except BaseException:
+            # Don't leave the in-flight insert unawaited
+            if pending:
+                await asyncio.gather(pending, return_exceptions=True)
+            raise
+        
+        pending = await self._flush(pending, batch, current_user, result, dedupe)
+        if pending:
+            self._collect(result, await pending)
+        
+        return result
+    
+    async def _flush(
+        self,
+        pending: Optional[asyncio.Task],
+        batch: List[tuple],
+        current_user: User,
+        result: BulkImportResult,
+        dedupe: bool
+    ) -> Optional[asyncio.Task]:
+        """Wait for the previous batch and start inserting this one"""
+        if pending:
+            self._collect(result, await pending)
+        
+        if not batch:
+            return None
+        
+        return asyncio.create_task(self._insert_batch(batch, current_user, dedupe))
+    
+    @staticmethod
+    def _collect(result: BulkImportResult, outcome: BatchOutcome) -> None:
+        created, existing, failed_rows, error = outcome
+        result.add_created(created)
+        result.add_existing(existing)
+        result.refunded += len(existing) + len(failed_rows)
+        for row in failed_rows:
+            result.add_error(row, error)
+    
+    @staticmethod
+    async def _insert_batch(
+        batch: List[tuple],
+        current_user: User,
+        dedupe: bool
+    ) -> BatchOutcome:
+        """
+        Insert a batch of (row, url, is_private)
+        With dedupe, one lookup finds the URLs the user already has
+        The batch is one transaction, so on failure none of its rows exist
+        """
+        urls_data = [(original_url, is_private) for _, original_url, is_private in batch]
+        
+        try:
+            existing = []
+            if dedupe:
+                duplicates = await url_service.find_duplicate_urls(current_user.id, urls_data)
+                new_data = []
+                for original_url, is_private in urls_data:
+                    match = duplicates.get((url_hash(original_url), is_private))
+                    if match:
+                        existing.append(match)
+                    else:
+                        new_data.append((original_url, is_private))
+                urls_data = new_data
+            
+            created = await url_service.create_urls_bulk(urls_data, current_user.id, current_user.user_type)
+            return created, existing, [], None
+        
+        except DatabaseUnavailableError:
+            error = "Database unavailable, row not imported"
+        except Exception as e:
+            event_log.log("bulk_import_batch_failed", "error", rows=len(batch), error=f"{type(e).__name__}: {e}")
+            error = "Insert failed, row not imported"
+        
+        return [], [], [row for row, _, _ in batch], error
+
+
+bulk_import_service = BulkImportService()
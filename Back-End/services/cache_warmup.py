@@ -0,0 +1,59 @@
+import asyncio
+import time
+from typing import Optional
+from repositories import storage
+from utils.event_log import event_log
+from .redirect_cache import redirect_cache
+
+
+class CacheWarmup:
+    """
+    Preloads the hottest short codes into the redirect cache on startup
+    Records are streamed from storage in batches (a server-side cursor in
+    Postgres) and loading stops when the time budget runs out (what was loaded is kept)
+    """
+
+    def __init__(self):
+        self.state = "disabled"
+        self.loaded = 0
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        """Done, timed out, failed or disabled (readiness no longer waits)"""
+        return self.state != "running"
+
+    async def run(self, top_n: int, batch_size: int, time_budget: float, order: str = "clicks") -> None:
+        """Load up to top_n records, waiting at most time_budget seconds"""
+        self.state = "running"
+        start = time.monotonic()
+
+        try:
+            await asyncio.wait_for(self._load(top_n, batch_size, order), timeout=time_budget)
+            self.state = "done"
+        except asyncio.TimeoutError:
+            self.state = "timed_out"
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+
+        self.duration = round(time.monotonic() - start, 3)
+        event_log.log("cache_warmup_finished", state=self.state, loaded=self.loaded, duration_s=self.duration)
+
+    async def _load(self, top_n: int, batch_size: int, order: str) -> None:
+        async for short_code, record in storage.urls.iter_top_redirect_records(top_n, order, batch_size):
+            redirect_cache.set(short_code, record)
+            self.loaded += 1
+
+    def snapshot(self) -> dict:
+        """State for health endpoints"""
+        return {
+            "state": self.state,
+            "loaded": self.loaded,
+            "duration_seconds": self.duration,
+            "error": self.error,
+        }
+
+
+cache_warmup = CacheWarmup()
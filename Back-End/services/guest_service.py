@@ -1,9 +1,12 @@
-from database import db
+from repositories import storage
 from models import GuestCreate, MigrateGuestUser
 from utils.security import get_password_hash
+from utils.cache import TTLCache
+from config import settings
 from typing import Optional
 from uuid import UUID
 from .base_user_service import BaseUserService
+import json
 
 
 class GuestService(BaseUserService):
@@ -23,65 +26,47 @@ class GuestService(BaseUserService):
 # Create singleton instance
 guest_service = GuestService()
 
+# Guest UUID -> user row, for repeated guest session refreshes
+guest_cache = TTLCache(settings.GUEST_CACHE_MAX_ENTRIES, settings.GUEST_CACHE_TTL_SECONDS)
+
 
 async def create_guest_user(guest_data: GuestCreate) -> Optional[dict]:
     """
     Create a guest user with UUID from frontend
-    Returns user data if successful
+    Returns user data if successful (existing guest if the UUID is known)
     """
-    async with db.pool.acquire() as conn:
+    key = str(guest_data.uuid)
+    cached = guest_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+    
+    # Username format: guest_<first 8 chars of UUID>
+    username = f"guest_{key[:8]}"
+    
+    user = await storage.users.get_or_create_guest(guest_data.uuid, username)
+    
+    if not user:
+        return None
     
-        # Check if UUID already exists
-        existing = await conn.fetchrow(
-            "SELECT id FROM users WHERE guest_uuid = $1",
-            guest_data.uuid
-        )
-        
-        if existing:
-            # Return existing guest user
-            user = await conn.fetchrow(
-                """
-                SELECT id, username, email, user_type, guest_uuid, is_active, created_at, updated_at
-                FROM users 
-                WHERE id = $1
-                """,
-                existing['id']
-            )
-            return dict(user)
-        
-        # Create new guest user
-        # Username format: guest_<first 8 chars of UUID>
-        username = f"guest_{str(guest_data.uuid)[:8]}"
-        
-        user = await conn.fetchrow(
-            """
-            INSERT INTO users (username, user_type, guest_uuid, email, hashed_password)
-            VALUES ($1, 'guest', $2, NULL, NULL)
-            RETURNING id, username, email, user_type, guest_uuid, is_active, created_at, updated_at
-            """,
-            username,
-            guest_data.uuid
-        )
-        
-        return dict(user) if user else None
+    guest_cache.set(key, user)
+    return dict(user)
+
+
+def evict_guest_from_cache(payload: str) -> None:
+    """
+    Evict a guest from the UUID cache
+    Handler for 'user_changes' notifications: {"id": ..., "guest_uuid": ...}
+    """
+    guest_uuid = json.loads(payload).get('guest_uuid')
+    if guest_uuid:
+        guest_cache.pop(guest_uuid)
 
 
 async def get_guest_by_uuid(guest_uuid: UUID) -> Optional[dict]:
     """
     Get guest user by UUID
     """
-    async with db.pool.acquire() as conn:
-    
-        user = await conn.fetchrow(
-            """
-            SELECT id, username, email, user_type, guest_uuid, is_active, created_at, updated_at
-            FROM users 
-            WHERE guest_uuid = $1 AND user_type = 'guest'
-            """,
-            guest_uuid
-        )
-        
-        return dict(user) if user else None
+    return await storage.users.get_guest_by_uuid(guest_uuid)
 
 
 async def get_guest_url_count(user_id: int) -> int:
@@ -116,63 +101,25 @@ async def migrate_guest_to_registered(user_id: int, migration_data: MigrateGuest
     - Removes expires_at from all user's URLs
     """
     
-    async with db.pool.acquire() as conn:
-        async with conn.transaction():
-            # Check if email already exists
-            existing_email = await conn.fetchrow(
-                "SELECT id FROM users WHERE email = $1",
-                migration_data.email
-            )
-            
-            if existing_email:
-                return None  # Email already registered
-            
-            # Check if username already exists (excluding current user)
-            existing_username = await conn.fetchrow(
-                "SELECT id FROM users WHERE username = $1 AND id != $2",
-                migration_data.username,
-                user_id
-            )
-            
-            if existing_username:
-                return None  # Username already taken
-            
-            # Update user to registered type
-            hashed_pwd = get_password_hash(migration_data.password)
-            
-            user = await conn.fetchrow(
-                """
-                UPDATE users
-                SET 
-                    user_type = 'registered',
-                    username = $1,
-                    email = $2,
-                    hashed_password = $3,
-                    guest_uuid = NULL,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE id = $4 AND user_type = 'guest'
-                RETURNING id, username, email, user_type, is_active, created_at, updated_at
-                """,
-                migration_data.username,
-                migration_data.email,
-                hashed_pwd,
-                user_id
-            )
-            
-            if not user:
-                return None
-            
-            # Remove expires_at from all user's URLs (make them permanent)
-            await conn.execute(
-                """
-                UPDATE urls
-                SET expires_at = NULL, updated_at = CURRENT_TIMESTAMP
-                WHERE user_id = $1
-                """,
-                user_id
-            )
-            
-            return dict(user)
+    # Check if email or username already exists (excluding current user)
+    if await storage.users.is_taken(migration_data.username, migration_data.email, exclude_user_id=user_id):
+        return None  # Email already registered or username already taken
+    
+    # Update user to registered type (and make their URLs permanent)
+    hashed_pwd = get_password_hash(migration_data.password)
+    
+    user = await storage.users.migrate_guest(
+        user_id,
+        migration_data.username,
+        migration_data.email,
+        hashed_pwd
+    )
+    
+    if not user:
+        return None
+    
+    guest_cache.pop(str(user.pop('previous_guest_uuid')))
+    return user
 
 
 async def cleanup_expired_urls() -> int:
@@ -181,16 +128,4 @@ async def cleanup_expired_urls() -> int:
     Returns count of deleted URLs
     """
     
-    async with db.pool.acquire() as conn:
-        result = await conn.execute(
-            """
-            DELETE FROM urls
-            WHERE expires_at IS NOT NULL 
-            AND expires_at < CURRENT_TIMESTAMP
-            AND is_active = TRUE
-            """
-        )
-        
-        # Extract count from result string like "DELETE 5"
-        deleted_count = int(result.split()[-1]) if result else 0
-        return deleted_count
+    return await storage.urls.delete_expired()
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from config import settings
+from repositories import storage
+from utils.event_log import event_log
+from .cache_warmup import cache_warmup
+from .visitor_stats import visitor_stats
+
+
+class ReadinessCheck:
+    """
+    Whether this worker should receive traffic (load balancer probe)
+    Checks a storage round trip (pool acquire and SELECT 1, each bounded by
+    a timeout), the circuit breaker, the lag of the background writers and
+    the cache warm-up. The result is cached for `cache_seconds` and
+    concurrent probes share one run, so probing adds at most one query
+    per interval
+    
+    Only faults local to this worker make it not ready. A database outage
+    hits every worker at once, so it is reported as "degraded" and the
+    worker stays ready while stale redirects can be served
+    """
+    
+    def __init__(self, cache_seconds: float):
+        self.cache_seconds = cache_seconds
+        self._result: Optional[dict] = None
+        self._checked_at = 0.0
+        self._running: Optional[asyncio.Task] = None
+    
+    async def check(self) -> dict:
+        if self._result is not None and time.monotonic() - self._checked_at < self.cache_seconds:
+            return self._result
+        
+        if self._running is None or self._running.done():
+            self._running = asyncio.create_task(self._run())
+        # A probe that disconnects must not cancel the run others wait for
+        return await asyncio.shield(self._running)
+    
+    async def _run(self) -> dict:
+        checks = {
+            "storage": await self._check_storage(),
+            "warmup": {"ok": cache_warmup.finished, "state": cache_warmup.state},
+            "event_log": self._check_event_log(),
+            "visitor_stats": self._check_visitor_stats(),
+        }
+        if not all(check["ok"] for check in checks.values()):
+            state = "not_ready"
+        elif checks["storage"]["degraded"]:
+            state = "degraded"
+        else:
+            state = "ready"
+        self._result = {
+            "status": state,
+            "circuit": checks["storage"]["circuit"],
+            "checked_at": datetime.now(timezone.utc),
+            "checks": checks,
+        }
+        self._checked_at = time.monotonic()
+        return self._result
+    
+    @staticmethod
+    async def _check_storage() -> dict:
+        circuit = storage.breaker.state
+        check = {"ok": False, "degraded": False, "backend": storage.name, "circuit": circuit}
+        # Not pinged while open: the breaker already knows it is down
+        if circuit != "closed":
+            return ReadinessCheck._degraded(check, "Database circuit is not closed")
+        
+        try:
+            check.update(await storage.ping(settings.HEALTH_DB_TIMEOUT_SECONDS))
+        except Exception as e:
+            return ReadinessCheck._degraded(check, f"{type(e).__name__}: {e}" if str(e) else type(e).__name__)
+        
+        # Connections are per worker, so a slow acquire is this worker's fault
+        if check.get("acquire_ms", 0) > settings.HEALTH_MAX_ACQUIRE_MS:
+            check["error"] = "Pool acquire too slow"
+        else:
+            check["ok"] = True
+        return check
+    
+    @staticmethod
+    def _degraded(check: dict, error: str) -> dict:
+        """Database unavailable: still ready if redirects can fall back to stale records"""
+        check["degraded"] = True
+        check["error"] = error
+        check["ok"] = settings.REDIRECT_CACHE_STALE_SECONDS > 0
+        return check
+    
+    @staticmethod
+    def _check_event_log() -> dict:
+        lag = event_log.lag_seconds
+        return {
+            "ok": event_log.is_running and lag <= settings.HEALTH_MAX_WORKER_LAG_SECONDS,
+            "running": event_log.is_running,
+            **event_log.snapshot(),
+        }
+    
+    @staticmethod
+    def _check_visitor_stats() -> dict:
+        if not settings.VISITOR_STATS_ENABLED:
+            return {"ok": True, "enabled": False}
+        
+        # A flush is due every VISITOR_STATS_FLUSH_SECONDS
+        lag = visitor_stats.flush_lag_seconds
+        max_lag = settings.VISITOR_STATS_FLUSH_SECONDS + settings.HEALTH_MAX_WORKER_LAG_SECONDS
+        return {
+            "ok": visitor_stats.is_running and lag <= max_lag,
+            "running": visitor_stats.is_running,
+            "flush_lag_seconds": round(lag, 3),
+            "dropped": visitor_stats.dropped,
+        }
+
+
+readiness_check = ReadinessCheck(settings.HEALTH_CACHE_SECONDS)
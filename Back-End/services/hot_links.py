@@ -0,0 +1,104 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import List, Optional
+from config import settings
+from utils.event_log import event_log
+from utils.heavy_hitters import SlidingTopK, SpaceSaving
+
+
+class HotLinks:
+    """
+    Short codes redirected most often in the last few minutes
+    Each worker tracks its own traffic in constant memory; with a shared
+    directory, workers publish their summary periodically and the admin
+    view merges every worker that published within the window
+    """
+
+    def __init__(self, capacity: int, window_seconds: float, slices: int):
+        self._tracker = SlidingTopK(capacity, window_seconds, slices)
+        self._shared_dir: Optional[Path] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, short_code: str) -> None:
+        """Count a redirect (no I/O)"""
+        self._tracker.add(short_code)
+
+    async def start_publishing(self, shared_dir: str, interval: float) -> None:
+        """Publish this worker's summary to the shared directory in the background"""
+        self._shared_dir = Path(shared_dir)
+        self._shared_dir.mkdir(parents=True, exist_ok=True)
+        if not self._task:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop_publishing(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._shared_dir:
+            self._worker_file().unlink(missing_ok=True)
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self._publish()
+            except OSError as e:
+                event_log.log("hot_links_publish_failed", "warning", error=str(e))
+
+    def _worker_file(self) -> Path:
+        return self._shared_dir / f"worker-{os.getpid()}.json"
+
+    def _publish(self) -> None:
+        # Write then rename, so readers never see a partial file
+        path = self._worker_file()
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._tracker.summary().to_dict()))
+        os.replace(tmp, path)
+
+    def _published_summaries(self) -> List[SpaceSaving]:
+        """Summaries of the other workers still publishing (recent files only)"""
+        summaries = []
+        own = self._worker_file()
+        oldest = time.time() - self._tracker.window_seconds
+        for path in self._shared_dir.glob("worker-*.json"):
+            if path == own:
+                continue
+            try:
+                if path.stat().st_mtime < oldest:
+                    continue
+                summaries.append(SpaceSaving.from_dict(json.loads(path.read_text())))
+            except (OSError, ValueError, KeyError):
+                # Removed or replaced while reading
+                continue
+        return summaries
+
+    def top(self, limit: int) -> dict:
+        """Top short codes in the window, merged across workers when shared"""
+        summaries = [self._tracker.summary()]
+        if self._shared_dir:
+            summaries += self._published_summaries()
+
+        merged = SpaceSaving.merge(summaries, self._tracker.capacity)
+        return {
+            "window_seconds": self._tracker.window_seconds,
+            "workers": len(summaries),
+            "total_redirects": merged.total,
+            "links": [
+                {"short_code": short_code, "count": count, "error": error}
+                for short_code, count, error in merged.top(limit)
+            ],
+        }
+
+
+hot_links = HotLinks(
+    settings.HOT_LINKS_CAPACITY,
+    settings.HOT_LINKS_WINDOW_SECONDS,
+    settings.HOT_LINKS_SLICES
+)
@@ -0,0 +1,185 @@
+import asyncio
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+from config import settings
+from utils.event_log import event_log
+
+
+# pid-timestamp-counter, so ids never collide across workers
+_PROFILE_ID = re.compile(r"^\d+-\d+-\d+$")
+
+
+class CapturedProfile:
+    """cProfile stats of one request plus what identifies it"""
+    
+    __slots__ = ("id", "created_at", "method", "path", "route", "status", "duration_ms", "trigger", "stats")
+    
+    def __init__(
+        self,
+        id: str,
+        method: str,
+        path: str,
+        route: str,
+        status: int,
+        duration_ms: float,
+        trigger: str,
+        stats: dict,
+        created_at: Optional[datetime] = None
+    ):
+        self.id = id
+        self.created_at = created_at or datetime.now(timezone.utc)
+        self.method = method
+        self.path = path
+        self.route = route
+        self.status = status
+        self.duration_ms = duration_ms
+        self.trigger = trigger
+        # Raw cProfile stats (what pstats loads), kept apart from the profiler
+        self.stats = stats
+    
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "created_at": self.created_at,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "duration_ms": self.duration_ms,
+            "trigger": self.trigger,
+        }
+    
+    def dump(self) -> bytes:
+        """Summary and stats for the shared directory (see load)"""
+        summary = dict(self.summary(), created_at=self.created_at.isoformat())
+        return marshal.dumps((summary, self.stats))
+    
+    @classmethod
+    def load(cls, data: bytes) -> "CapturedProfile":
+        summary, stats = marshal.loads(data)
+        created_at = datetime.fromisoformat(summary.pop("created_at"))
+        return cls(**summary, stats=stats, created_at=created_at)
+    
+    def to_pstats(self) -> bytes:
+        """Stats in the format of cProfile's dump_stats (for pstats, snakeviz)"""
+        return marshal.dumps(self.stats)
+    
+    def to_text(self, sort: str, limit: int) -> str:
+        stream = io.StringIO()
+        stats = pstats.Stats(stream=stream)
+        stats.stats = dict(self.stats)
+        stats.get_top_level_stats()
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+class ProfileStore:
+    """
+    Last `max_profiles` request profiles of this worker (oldest dropped)
+    cProfile traces the whole thread, so one request is profiled at a time
+    and coroutines of other requests that ran while it awaited are
+    included in its profile
+    
+    With a shared directory every profile is also written there, so any
+    worker on the host can list and serve it; the directory keeps the
+    last `max_profiles` of all workers
+    """
+    
+    def __init__(self, max_profiles: int):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, CapturedProfile]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._active = False
+        self._shared_dir: Optional[Path] = None
+    
+    def open_shared(self, shared_dir: str) -> None:
+        """Also keep profiles in a directory shared by the host's workers"""
+        path = Path(shared_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        self._shared_dir = path
+    
+    def start(self) -> Optional[cProfile.Profile]:
+        """Start profiling, or None if a profile is already running"""
+        if self._active:
+            return None
+        self._active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+    
+    def finish(self, profile: cProfile.Profile) -> dict:
+        """Stop profiling and return the collected stats"""
+        profile.disable()
+        self._active = False
+        profile.create_stats()
+        return profile.stats
+    
+    def next_id(self) -> str:
+        return f"{os.getpid()}-{int(time.time())}-{next(self._ids)}"
+    
+    async def add(self, captured: CapturedProfile) -> None:
+        self._profiles[captured.id] = captured
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+        
+        if self._shared_dir:
+            try:
+                await asyncio.to_thread(self._write_shared, captured)
+            except OSError as e:
+                event_log.log("profile_share_failed", "warning", profile_id=captured.id, error=str(e))
+    
+    async def get(self, profile_id: str) -> Optional[CapturedProfile]:
+        captured = self._profiles.get(profile_id)
+        if captured is not None or not self._shared_dir or not _PROFILE_ID.match(profile_id):
+            return captured
+        return await asyncio.to_thread(self._read_shared, self._shared_dir / f"{profile_id}.profile")
+    
+    async def list(self) -> List[dict]:
+        """Summaries, newest first (of every worker when shared)"""
+        if not self._shared_dir:
+            return [captured.summary() for captured in reversed(self._profiles.values())]
+        
+        profiles = await asyncio.to_thread(lambda: [self._read_shared(path) for path in self._shared_files()])
+        return [captured.summary() for captured in reversed(profiles) if captured is not None]
+    
+    def _shared_files(self) -> List[Path]:
+        """Profile files, oldest first"""
+        files = []
+        for path in self._shared_dir.glob("*.profile"):
+            try:
+                files.append((path.stat().st_mtime_ns, path))
+            except FileNotFoundError:
+                continue
+        return [path for _, path in sorted(files)]
+    
+    def _write_shared(self, captured: CapturedProfile) -> None:
+        # Write then rename, so readers never see a partial file
+        path = self._shared_dir / f"{captured.id}.profile"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(captured.dump())
+        os.replace(tmp, path)
+        
+        # Workers prune concurrently, so files may already be gone
+        for old in self._shared_files()[:-self.max_profiles]:
+            old.unlink(missing_ok=True)
+    
+    @staticmethod
+    def _read_shared(path: Path) -> Optional[CapturedProfile]:
+        try:
+            return CapturedProfile.load(path.read_bytes())
+        except (OSError, ValueError, EOFError, TypeError, KeyError):
+            # Pruned or replaced while reading
+            return None
+
+
+profile_store = ProfileStore(settings.PROFILING_MAX_PROFILES)
@@ -0,0 +1,142 @@
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from config import settings
+from models import RedirectRecord
+from utils.cache import TTLCache
+from utils.shared_table import SharedRedirectTable
+
+
+class RedirectCache:
+    """
+    Cache of short code -> RedirectRecord for the redirect path
+    Layers: process-local LRU, then (optionally) a shared-memory table
+    readable by every worker on the host
+    Entries never outlive the URL expiration date
+    
+    After their TTL, entries stay for `stale_seconds` as last known good
+    values, only returned by get_stale (database unavailable)
+    """
+    
+    def __init__(self, max_entries: int, ttl: int, stale_seconds: int = 0):
+        # Values are (record, fresh until) so stale entries can be told apart
+        self._cache = TTLCache(max_entries, ttl + stale_seconds)
+        self._ttl = ttl
+        self._stale_seconds = stale_seconds
+        self._shared: Optional[SharedRedirectTable] = None
+        self._shared_ttl = 0
+    
+    def open_shared(self, path: str, max_bytes: int, ttl: int) -> None:
+        """Attach the shared-memory layer (called once per worker on startup)"""
+        self._shared = SharedRedirectTable(path, max_bytes)
+        self._shared_ttl = ttl
+    
+    def close_shared(self) -> None:
+        """Detach the shared-memory layer"""
+        if self._shared:
+            self._shared.close()
+            self._shared = None
+    
+    def get(self, short_code: str) -> Optional[RedirectRecord]:
+        """Get cached record for a short code"""
+        entry = self._cache.get(short_code)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        if self._shared is None:
+            return None
+        
+        record = self._get_shared(short_code, self._shared_ttl)
+        if record is not None:
+            self._set_local(short_code, record)
+        return record
+    
+    def get_stale(self, short_code: str) -> Optional[RedirectRecord]:
+        """
+        Get the last known record, even past its TTL (bounded by stale_seconds)
+        Only for serving redirects while the database is unavailable
+        """
+        entry = self._cache.get(short_code)
+        if entry is not None:
+            return entry[0]
+        if self._shared is None:
+            return None
+        
+        return self._get_shared(short_code, self._shared_ttl + self._stale_seconds)
+    
+    def set(self, short_code: str, record: RedirectRecord) -> None:
+        """Cache a record in every layer, capping its TTL at the URL expiration"""
+        self._set_local(short_code, record)
+        
+        if self._shared is not None:
+            self._shared.set(
+                short_code,
+                record.id,
+                record.original_url,
+                record.is_private,
+                record.is_active,
+                _to_timestamp(record.expires_at)
+            )
+    
+    def evict(self, short_code: str) -> None:
+        """Remove a short code from every layer"""
+        self._cache.pop(short_code)
+        if self._shared is not None:
+            self._shared.evict(short_code)
+    
+    def clear(self) -> None:
+        """Remove every cached record"""
+        self._cache.clear()
+        if self._shared is not None:
+            self._shared.clear()
+    
+    def clear_local(self) -> None:
+        """
+        Remove every record cached by this worker only
+        The shared layer is kept: other workers' listeners keep evicting
+        from it, and its entries expire after the shared TTL
+        """
+        self._cache.clear()
+    
+    def _get_shared(self, short_code: str, max_age: float) -> Optional[RedirectRecord]:
+        entry = self._shared.get(short_code, max_age)
+        if entry is None:
+            return None
+        
+        url_id, original_url, is_private, is_active, expires_at = entry
+        return RedirectRecord(url_id, original_url, is_private, is_active, _from_timestamp(expires_at))
+    
+    def _set_local(self, short_code: str, record: RedirectRecord) -> None:
+        ttl = self._ttl
+        keep = self._cache.ttl
+        remaining = record.seconds_until_expiry()
+        if remaining is not None:
+            ttl = min(ttl, remaining)
+            keep = min(keep, remaining)
+        
+        self._cache.set(short_code, (record, time.monotonic() + ttl), keep)
+    
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def _to_timestamp(value: Optional[datetime]) -> Optional[float]:
+    """Naive TIMESTAMP values are stored in UTC"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _from_timestamp(value: Optional[float]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+
+
+# Global redirect cache instance
+redirect_cache = RedirectCache(
+    settings.REDIRECT_CACHE_MAX_ENTRIES,
+    settings.REDIRECT_CACHE_TTL_SECONDS,
+    settings.REDIRECT_CACHE_STALE_SECONDS
+)
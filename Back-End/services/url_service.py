@@ -1,8 +1,13 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime, timedelta , timezone
-from database import db
-from models import URL, URLCreate, URLUpdate
-from utils import generate_short_code
+import asyncio
+from database import DatabaseUnavailableError, admission
+from repositories import storage
+from models import URL, URLCreate, URLUpdate, RedirectRecord
+from utils import generate_short_code, generate_short_codes
+from utils.url_normalizer import url_hash
+from utils.event_log import event_log
+from .redirect_cache import redirect_cache
 
 
 class URLService:
@@ -14,192 +19,287 @@ class URLService:
         # Generate short code automatically
         short_code = await generate_short_code()
         
-        # Calculate expiration for guest users (7 days)
+        # Calculate expiration for guest users (7 days, naive UTC for the TIMESTAMP column)
         expires_at = None
         if user_type == 'guest':
-            expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+            expires_at = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=7)
         
         # Create URL
-        async with db.pool.acquire() as conn:
-            row = await conn.fetchrow('''
-                INSERT INTO urls (short_code, original_url, user_id, is_private, expires_at)
-                VALUES ($1, $2, $3, $4, $5)
-                RETURNING id, short_code, original_url, user_id, clicks, is_active, 
-                          is_private, created_at, updated_at, expires_at
-            ''', short_code, url_data.original_url, user_id, url_data.is_private, expires_at)
-            
-            return URL(**dict(row))
+        return await storage.urls.create(
+            short_code, url_data.original_url, user_id, url_data.is_private, expires_at,
+            url_hash(url_data.original_url)
+        )
+    
+    @staticmethod
+    async def find_duplicate_url(user_id: int, original_url: str, is_private: bool) -> Optional[URL]:
+        """
+        Find an active URL of the user with the same normalized target and privacy
+        Used by the opt-in deduplication mode
+        """
+        return await storage.urls.find_by_hash(user_id, url_hash(original_url), is_private)
+    
+    @staticmethod
+    async def find_duplicate_urls(user_id: int, urls_data: List[tuple]) -> Dict[tuple, URL]:
+        """
+        Find existing active URLs for many (original_url, is_private) pairs in one query
+        Returns dict of (url_hash, is_private) -> URL
+        """
+        hashes = list({url_hash(original_url) for original_url, _ in urls_data})
+        if not hashes:
+            return {}
+        
+        return await storage.urls.find_by_hashes(user_id, hashes)
     
     @staticmethod
     async def get_url_by_short_code(short_code: str) -> Optional[URL]:
         """Get URL by short code"""
-        async with db.pool.acquire() as conn:
-            row = await conn.fetchrow('''
-                SELECT * FROM urls 
-                WHERE short_code = $1 
-                AND is_active = TRUE
-            ''', short_code)
-            
-            if not row:
-                return None
-            
-            return URL(**dict(row))
+        return await storage.urls.get_active_by_short_code(short_code)
+    
+    @staticmethod
+    async def get_redirect_record(short_code: str) -> Optional[RedirectRecord]:
+        """
+        Get the minimal record needed to resolve a redirect
+        Served from the redirect cache when possible (cache hits never wait
+        for admission control)
+        While the database is unavailable or redirects are saturated, falls
+        back to the last known (stale) record
+        Raises DatabaseUnavailableError when there is no stale record either
+        """
+        record = redirect_cache.get(short_code)
+        if record is not None:
+            return record
+        
+        # Degraded mode: answer from the last known record, probe in the background
+        if not storage.breaker.is_closed:
+            record = redirect_cache.get_stale(short_code)
+            if record is not None:
+                _schedule_revalidation(short_code)
+                return record
+        
+        try:
+            async with admission["redirect"].slot():
+                return await URLService._load_redirect_record(short_code)
+        except DatabaseUnavailableError:
+            record = redirect_cache.get_stale(short_code)
+            if record is None:
+                raise
+            return record
+    
+    @staticmethod
+    async def _load_redirect_record(short_code: str) -> Optional[RedirectRecord]:
+        """Load a redirect record from the database and cache it"""
+        record = await storage.urls.get_redirect_record(short_code)
+        
+        # Not found: nothing to evict (deletes and updates evict their code),
+        # so unknown codes never touch the shared table's lock
+        if record is None:
+            return None
+        
+        redirect_cache.set(short_code, record)
+        return record
+    
+    @staticmethod
+    async def get_redirect_records(short_codes: List[str]) -> Dict[str, RedirectRecord]:
+        """
+        Get redirect records for many short codes
+        Cache hits are served locally, misses are loaded with a single query
+        While the database is unavailable, stale records are used for misses
+        Returns dict of short_code -> record (missing codes are omitted)
+        """
+        records = {}
+        missing = []
+        for short_code in short_codes:
+            record = redirect_cache.get(short_code)
+            if record is not None:
+                records[short_code] = record
+            else:
+                missing.append(short_code)
+        
+        if not missing:
+            return records
+        
+        try:
+            async with admission["redirect"].slot():
+                loaded = await storage.urls.get_redirect_records(missing)
+        except DatabaseUnavailableError:
+            stale = {code: redirect_cache.get_stale(code) for code in missing}
+            if any(record is None for record in stale.values()):
+                raise
+            records.update(stale)
+            return records
+        
+        for short_code, record in loaded.items():
+            redirect_cache.set(short_code, record)
+            records[short_code] = record
+        
+        return records
     
     @staticmethod
     async def increment_clicks(short_code: str) -> None:
-        """Increment click count for a URL"""
-        async with db.pool.acquire() as conn:
-            await conn.execute(
-                'UPDATE urls SET clicks = clicks + 1, updated_at = NOW() WHERE short_code = $1',
-                short_code
-            )
+        """
+        Increment click count for a URL
+        Skipped (click lost) while the database circuit is open or
+        redirects are saturated, so the redirect itself is still served
+        """
+        if not storage.breaker.is_closed:
+            return
+        
+        try:
+            async with admission["redirect"].slot():
+                await storage.urls.increment_clicks(short_code)
+        except DatabaseUnavailableError:
+            pass
     
     @staticmethod
-    async def get_user_urls(user_id: int, offset: int = 0, with_history: bool = False):
+    async def get_user_urls_state(user_id: int, with_history: bool = False) -> tuple:
+        """
+        Cheap change marker for a user's URL list (one aggregate query)
+        Any insert, update (including clicks) or delete changes it, and with
+        history also any new access record
+        Returns tuple: (total_count, last_updated_at, last_access_id)
+        """
+        return await storage.urls.get_user_urls_state(user_id, with_history)
+    
+    @staticmethod
+    async def get_user_urls(user_id: int, offset: int = 0, with_history: bool = False, total: Optional[int] = None):
         """Get URLs created by a user with pagination and optional access history
+        Pass total when already known to skip the count query
         Returns tuple: (total_count, urls_list)
         """
         LIMIT = 20 # Default pagination limit
-        async with db.pool.acquire() as conn:
-            # Get total count
-            total = await conn.fetchval(
-                'SELECT COUNT(*) FROM urls WHERE user_id = $1',
-                user_id
-            )
-            
-            # Get paginated URLs
-            rows = await conn.fetch(
-                '''SELECT * FROM urls 
-                WHERE user_id = $1 
-                ORDER BY created_at DESC 
-                LIMIT $2 OFFSET $3''',
-                user_id, LIMIT, offset
-            )
-            
-            urls = [URL(**dict(row)) for row in rows]
-            
-            # If with_history is True, fetch access history for each URL
-            if with_history:
-                for url in urls:
-                    history_rows = await conn.fetch(
-                        '''SELECT user_email, user_type, accessed_at 
-                        FROM url_access_history 
-                        WHERE url_id = $1 
-                        ORDER BY accessed_at DESC''',
-                        url.id
-                    )
-                    # Add access_history as attribute
-                    url.access_history = [dict(row) for row in history_rows]
-            
-            return total, urls
+        # Get total count
+        if total is None:
+            total = await storage.urls.count_by_user(user_id)
+        
+        # Get paginated URLs
+        urls = await storage.urls.list_by_user(user_id, LIMIT, offset)
+        
+        # If with_history is True, fetch access history for each URL
+        if with_history:
+            for url in urls:
+                # Add access_history as attribute
+                url.access_history = await storage.urls.get_access_history(url.id)
+        
+        return total, urls
     
     @staticmethod
     async def get_url_by_id(url_id: int, user_id: int) -> Optional[URL]:
         """Get URL by ID (only if it belongs to the user)"""
-        async with db.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                'SELECT * FROM urls WHERE id = $1 AND user_id = $2',
-                url_id, user_id
-            )
-            
-            if not row:
-                return None
-            
-            return URL(**dict(row))
+        return await storage.urls.get_by_id(url_id, user_id)
     
     @staticmethod
     async def update_url(url_id: int, user_id: int, url_data: URLUpdate) -> Optional[URL]:
         """Update a URL"""
-        async with db.pool.acquire() as conn:
-            # Build update query dynamically
-            updates = []
-            values = []
-            param_count = 1
-            
-            if url_data.original_url is not None:
-                updates.append(f'original_url = ${param_count}')
-                values.append(url_data.original_url)
-                param_count += 1
-            
-            if url_data.is_active is not None:
-                updates.append(f'is_active = ${param_count}')
-                values.append(url_data.is_active)
-                param_count += 1
-            
-            if url_data.is_private is not None:
-                updates.append(f'is_private = ${param_count}')
-                values.append(url_data.is_private)
-                param_count += 1
-            
-            if not updates:
-                # No updates provided, just return current URL
-                return await URLService.get_url_by_id(url_id, user_id)
-            
-            updates.append(f'updated_at = NOW()')
-            values.extend([url_id, user_id])
-            
-            query = f'''
-                UPDATE urls 
-                SET {', '.join(updates)}
-                WHERE id = ${param_count} AND user_id = ${param_count + 1}
-                RETURNING id, short_code, original_url, user_id, clicks, is_active,
-                          is_private, created_at, updated_at
-            '''
-            
-            row = await conn.fetchrow(query, *values)
-            
-            if not row:
-                return None
-            
-            return URL(**dict(row))
+        # Columns to change
+        changes = {}
+        
+        if url_data.original_url is not None:
+            changes['original_url'] = url_data.original_url
+            changes['url_hash'] = url_hash(url_data.original_url)
+        
+        if url_data.is_active is not None:
+            changes['is_active'] = url_data.is_active
+        
+        if url_data.is_private is not None:
+            changes['is_private'] = url_data.is_private
+        
+        if not changes:
+            # No updates provided, just return current URL
+            return await URLService.get_url_by_id(url_id, user_id)
+        
+        url = await storage.urls.update(url_id, user_id, changes)
+        
+        if url is None:
+            return None
+        
+        redirect_cache.evict(url.short_code)
+        return url
     
     @staticmethod
     async def delete_url(url_id: int, user_id: int) -> bool:
         """Delete a URL (hard delete)"""
-        async with db.pool.acquire() as conn:
-            result = await conn.execute(
-                'DELETE FROM urls WHERE id = $1 AND user_id = $2',
-                url_id, user_id
-            )
-            
-            return result == 'DELETE 1'
+        short_code = await storage.urls.delete(url_id, user_id)
+        
+        if short_code is None:
+            return False
+        
+        redirect_cache.evict(short_code)
+        return True
     
     @staticmethod
     async def record_url_access(url_id: int, user_email: str, user_type: str) -> None:
-        """Record URL access in history"""
-        async with db.pool.acquire() as conn:
-            await conn.execute(
-                '''INSERT INTO url_access_history (url_id, user_email, user_type)
-                VALUES ($1, $2, $3)''',
-                url_id, user_email, user_type
-            )
+        """
+        Record URL access in history
+        Skipped (access not recorded) while the database circuit is open or
+        no redirect slot is free, so the redirect itself is still served
+        """
+        await URLService.record_url_accesses([url_id], user_email, user_type)
+    
+    @staticmethod
+    async def record_url_accesses(url_ids: List[int], user_email: str, user_type: str) -> None:
+        """Record access to several URLs in history with a single insert (skipped like record_url_access)"""
+        if not url_ids or not storage.breaker.is_closed:
+            return
+        
+        try:
+            # Never waits in the queue: dropped when redirects are saturated
+            async with admission["redirect"].slot(wait=False):
+                await storage.urls.record_accesses(url_ids, user_email, user_type)
+        except DatabaseUnavailableError:
+            pass
     
     @staticmethod
     async def create_urls_bulk(urls_data: List[tuple], user_id: int, user_type: str = 'registered') -> List[URL]:
-        """Create multiple URLs at once"""
-        from datetime import datetime, timedelta
+        """
+        Create multiple URLs at once
+        Inserted atomically in one repository call (a single INSERT in Postgres)
+        """
+        if not urls_data:
+            return []
         
-        # Calculate expiration for guest users (7 days)
+        # Calculate expiration for guest users (7 days, naive UTC for the TIMESTAMP column)
         expires_at = None
         if user_type == 'guest':
-            expires_at = datetime.now(datetime.timezone.utc) + timedelta(days=7)
-        
-        created_urls = []
-        async with db.pool.acquire() as conn:
-            for original_url, is_private in urls_data:
-                # Generate unique short code
-                short_code = await generate_short_code()
-                
-                row = await conn.fetchrow('''
-                    INSERT INTO urls (short_code, original_url, user_id, is_private, expires_at)
-                    VALUES ($1, $2, $3, $4, $5)
-                    RETURNING id, short_code, original_url, user_id, clicks, is_active, 
-                              is_private, created_at, updated_at, expires_at
-                ''', short_code, original_url, user_id, is_private, expires_at)
-                
-                created_urls.append(URL(**dict(row)))
-        
-        return created_urls
+            expires_at = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=7)
+        
+        short_codes = await generate_short_codes(len(urls_data))
+        original_urls = [original_url for original_url, _ in urls_data]
+        private_flags = [is_private for _, is_private in urls_data]
+        
+        return await storage.urls.create_many(
+            user_id, short_codes, original_urls, private_flags, expires_at,
+            [url_hash(original_url) for original_url in original_urls]
+        )
+
+
+# Short codes with a background revalidation in flight
+_revalidating = set()
+# Strong references: the event loop only keeps weak ones to running tasks
+_pending = set()
+
+
+def _schedule_revalidation(short_code: str) -> None:
+    """
+    Refresh a stale record in the background once the breaker lets calls through
+    At most one task per short code; failures keep the stale record
+    """
+    if short_code in _revalidating or not storage.breaker.can_probe():
+        return
+    
+    async def revalidate():
+        try:
+            await URLService._load_redirect_record(short_code)
+        except DatabaseUnavailableError:
+            pass
+        except Exception as e:
+            event_log.log("revalidation_failed", "error", short_code=short_code, error=f"{type(e).__name__}: {e}")
+        finally:
+            _revalidating.discard(short_code)
+    
+    _revalidating.add(short_code)
+    task = asyncio.create_task(revalidate())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
 
 
 url_service = URLService()
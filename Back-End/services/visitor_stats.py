@@ -0,0 +1,121 @@
+import asyncio
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from config import settings
+from repositories import storage
+from repositories.base import SketchKey
+from utils.event_log import event_log
+from utils.hyperloglog import HyperLogLog
+
+
+class VisitorStats:
+    """
+    Approximate unique visitors per URL and day (HyperLogLog sketches)
+    Visits are added to in-memory sketches on the redirect path and merged
+    into the stored sketches periodically, so every worker's partial
+    sketches combine in Postgres
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending: Dict[SketchKey, HyperLogLog] = {}
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Last time nothing was left unwritten (monotonic)
+        self.last_flushed = time.monotonic()
+
+    def record(self, url_id: int, fingerprint: bytes) -> None:
+        """Add a visit (no I/O)"""
+        key = (url_id, datetime.now(timezone.utc).date())
+        sketch = self._pending.get(key)
+        if sketch is None:
+            # Fixed memory: when full (database slow or down), new keys are dropped
+            if len(self._pending) >= self.max_pending:
+                self._flush_requested.set()
+                self.dropped += 1
+                return
+            sketch = self._pending[key] = HyperLogLog()
+        sketch.add(fingerprint)
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def flush_lag_seconds(self) -> float:
+        """Time since pending visits were last fully written (grows while flushes fail)"""
+        return time.monotonic() - self.last_flushed if self._pending else 0.0
+
+    async def start(self, interval: float) -> None:
+        """Start the periodic flush in the background"""
+        if not self._task:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write what is pending"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Merge pending sketches into storage, keeping them on failure"""
+        if not self._pending:
+            self.last_flushed = time.monotonic()
+            return
+
+        pending, self._pending = self._pending, {}
+        try:
+            await self._write(pending)
+            self.last_flushed = time.monotonic()
+        except Exception as e:
+            event_log.log("visitor_stats_flush_failed", "warning", error=str(e))
+            for key, sketch in pending.items():
+                current = self._pending.get(key)
+                if current is not None:
+                    sketch.merge(current)
+                self._pending[key] = sketch
+
+    @staticmethod
+    async def _write(pending: Dict[SketchKey, HyperLogLog]) -> None:
+        await storage.sketches.merge(pending)
+
+    async def get_stats(self, url_id: int, days: int) -> dict:
+        """
+        Unique visitors of a URL over the last `days` days (UTC), total and per day
+        Includes this worker's visits not flushed yet
+        """
+        today = datetime.now(timezone.utc).date()
+        since = today - timedelta(days=days - 1)
+
+        by_day: Dict[date, HyperLogLog] = await storage.sketches.get(url_id, since)
+        for (pending_url_id, bucket_date), sketch in list(self._pending.items()):
+            if pending_url_id == url_id and bucket_date >= since:
+                by_day.setdefault(bucket_date, HyperLogLog()).merge(sketch)
+
+        daily: List[dict] = [
+            {"date": bucket_date, "unique_visitors": sketch.count()}
+            for bucket_date, sketch in sorted(by_day.items())
+        ]
+        return {
+            "unique_visitors": HyperLogLog.union(by_day.values()).count(),
+            "daily": daily,
+        }
+
+
+visitor_stats = VisitorStats(settings.VISITOR_STATS_MAX_PENDING)
@@ -0,0 +1,51 @@
+"""
+Tests run against the in-memory storage backend (no Postgres needed)
+
+Usage (from Back-End/):
+    pip install -r tests/requirements.txt
+    python -m pytest -q tests
+"""
+import os
+import sys
+from pathlib import Path
+import pytest
+from fastapi.testclient import TestClient
+
+# Settings are read on import, so they are set before the app is imported
+os.environ.setdefault("DATABASE_URL", "postgresql://unused/unused")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ["SHARED_CACHE_ENABLED"] = "False"
+os.environ["PROFILING_SHARED_ENABLED"] = "False"
+os.environ["RATE_LIMIT_ENABLED"] = "False"
+os.environ["LOG_DESTINATION"] = os.devnull
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+# Services are module-level singletons bound to the app's event loop,
+# so the app is started once for the session. HTTPS so that the secure
+# session cookie is sent back
+@pytest.fixture(scope="session")
+def client():
+    from main import app
+    with TestClient(app, base_url="https://testserver") as client:
+        yield client
+
+
+@pytest.fixture
+def open_circuit():
+    """Call to open the storage circuit breaker (closed again after the test)"""
+    from repositories import storage
+    from services.health import readiness_check
+    breaker = storage.breaker
+    
+    def open_():
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure("test outage")
+        # Drop the cached result of earlier probes
+        readiness_check._result = None
+    
+    yield open_
+    breaker.record_success(0.0)
+    readiness_check._result = None
@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+from database.admission import AdmissionLimiter, OverloadedError, admission_limits
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_fifo_handover():
+    async def scenario():
+        limiter = AdmissionLimiter("test", 1, 10, 1.0)
+        await limiter.acquire()
+        order = []
+        
+        async def waiter(name):
+            await limiter.acquire()
+            order.append(name)
+        
+        tasks = [asyncio.create_task(waiter(name)) for name in ("a", "b", "c")]
+        await asyncio.sleep(0)
+        assert limiter.queued == 3
+        for _ in tasks:
+            limiter.release()
+            await asyncio.sleep(0)
+            # The slot is handed over, never released in between
+            assert limiter.active == 1
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c"]
+        limiter.release()
+        assert limiter.active == 0
+    
+    run(scenario())
+
+
+def test_rejects_when_queue_full():
+    async def scenario():
+        limiter = AdmissionLimiter("test", 1, 1, 1.0)
+        await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(OverloadedError):
+            await limiter.acquire()
+        assert limiter.rejected == 1
+        
+        limiter.release()
+        await queued
+        limiter.release()
+        assert limiter.active == 0
+    
+    run(scenario())
+
+
+def test_rejects_without_wait():
+    async def scenario():
+        limiter = AdmissionLimiter("test", 1, 10, 1.0)
+        await limiter.acquire()
+        with pytest.raises(OverloadedError):
+            await limiter.acquire(wait=False)
+        assert limiter.queued == 0
+    
+    run(scenario())
+
+
+def test_queue_timeout():
+    async def scenario():
+        limiter = AdmissionLimiter("test", 1, 10, 0.05)
+        await limiter.acquire()
+        with pytest.raises(OverloadedError):
+            await limiter.acquire()
+        assert limiter.queued == 0
+        assert limiter.rejected == 1
+        
+        limiter.release()
+        assert limiter.active == 0
+    
+    run(scenario())
+
+
+def test_cancelled_while_queued():
+    async def scenario():
+        limiter = AdmissionLimiter("test", 1, 10, 1.0)
+        await limiter.acquire()
+        task = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter.queued == 0
+        
+        limiter.release()
+        assert limiter.active == 0
+    
+    run(scenario())
+
+
+def test_cancelled_after_handover():
+    async def scenario():
+        limiter = AdmissionLimiter("test", 1, 10, 1.0)
+        await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire())
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        
+        # Handed over to the first waiter, which is cancelled before it runs
+        limiter.release()
+        first.cancel()
+        result, = await asyncio.gather(first, return_exceptions=True)
+        if not isinstance(result, asyncio.CancelledError):
+            # The cancellation arrived too late: the waiter holds the slot
+            limiter.release()
+        
+        # The slot went on to the next waiter instead of leaking
+        await asyncio.wait_for(second, 1)
+        assert limiter.active == 1
+        assert limiter.queued == 0
+        limiter.release()
+        assert limiter.active == 0
+    
+    run(scenario())
+
+
+def test_limits_derived_from_pool():
+    assert admission_limits(10, {}) == {"redirect": 4, "write": 2, "export": 2, "auth": 2}
+    assert admission_limits(4, {}) == {"redirect": 1, "write": 1, "export": 1, "auth": 1}
+    assert admission_limits(11, {}) == {"redirect": 5, "write": 2, "export": 2, "auth": 2}
+    assert admission_limits(10, {"redirect": 6}) == {"redirect": 6, "write": 2, "export": 1, "auth": 1}
+
+
+def test_limits_over_pool_rejected():
+    with pytest.raises(ValueError):
+        admission_limits(10, {"redirect": 8, "write": 4, "export": 4, "auth": 4})
+    with pytest.raises(ValueError):
+        admission_limits(3, {})
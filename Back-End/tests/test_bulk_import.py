@@ -0,0 +1,36 @@
+import json
+import uuid
+from config import settings
+from database import DatabaseUnavailableError
+from services.url_service import url_service
+from test_redirects import register
+
+
+def upload(client, count: int):
+    lines = "\n".join(json.dumps({"url": f"https://example.com/{uuid.uuid4().hex}"}) for _ in range(count))
+    return client.post("/urls/bulk", files={"file": ("urls.ndjson", lines, "application/x-ndjson")})
+
+
+def test_failed_batch_reported_per_row(client, monkeypatch):
+    register(client)
+    monkeypatch.setattr(settings, "BULK_IMPORT_BATCH_SIZE", 2)
+    create_urls_bulk = url_service.create_urls_bulk
+    calls = []
+    
+    async def flaky_create(urls_data, user_id, user_type='registered'):
+        calls.append(len(urls_data))
+        if len(calls) == 2:
+            raise DatabaseUnavailableError("Database unavailable", 1.0)
+        return await create_urls_bulk(urls_data, user_id, user_type)
+    
+    monkeypatch.setattr(url_service, "create_urls_bulk", flaky_create)
+    
+    response = upload(client, 5)
+    assert response.status_code == 200
+    body = response.json()
+    # Batches 1 and 3 committed, batch 2 (rows 3 and 4) reported
+    assert body["created"] == 3
+    assert len(body["urls"]) == 3
+    assert body["failed"] == 2
+    assert [error["row"] for error in body["errors"]] == [3, 4]
+    assert calls == [2, 2, 1]
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from utils.bulk_parser import BulkFormatError, iter_json_array
+
+
+def parse(data: bytes, chunk_size: int = 0):
+    """All rows of iter_json_array, reading chunk_size bytes at a time (0: all at once)"""
+    async def scenario():
+        offset = 0
+        
+        async def read(size: int) -> bytes:
+            nonlocal offset
+            chunk = data[offset:offset + (chunk_size or size)]
+            offset += len(chunk)
+            return chunk
+        
+        return [row async for row in iter_json_array(read)]
+    
+    return asyncio.run(scenario())
+
+
+VALID = [
+    b'[]',
+    b'{"urls": []}',
+    b'[{"url": "https://example.com/a"}, {"url": "https://example.com/\xc3\xa9", "is_private": true}]',
+    b'{"urls": [\n  {"url": "https://example.com"},\n  1234,\n  -12.5e+10 ,\n  true,null\n]}',
+    b'[1234]',
+    b'[1e5, 2.75]',
+]
+
+
+@pytest.mark.parametrize("data", VALID)
+def test_byte_at_a_time_matches_whole_file(data):
+    assert parse(data, chunk_size=1) == parse(data)
+
+
+def test_numbers_split_across_reads():
+    rows = parse(b'[12345, 1e5]', chunk_size=1)
+    assert rows == [(1, None, "Expected a JSON object"), (2, None, "Expected a JSON object")]
+
+
+def test_objects():
+    rows = parse(b'{"urls": [{"url": "a"}, {"url": "b"}]}', chunk_size=1)
+    assert rows == [(1, {"url": "a"}, None), (2, {"url": "b"}, None)]
+
+
+@pytest.mark.parametrize("data", [
+    b'[{"url": "a"},]',
+    b'[{"url": "a"} , ]',
+    b'[,]',
+    b'[{"url": "a"},, {"url": "b"}]',
+    b'[{"url": "a"} {"url": "b"}]',
+    b'[12 34]',
+    b'[{"url": "a"}',
+])
+@pytest.mark.parametrize("chunk_size", [0, 1])
+def test_invalid(data, chunk_size):
+    with pytest.raises(BulkFormatError):
+        parse(data, chunk_size)
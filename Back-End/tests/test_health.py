@@ -0,0 +1,27 @@
+from config import settings
+from services.health import readiness_check
+
+
+def test_ready(client):
+    readiness_check._result = None
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+
+def test_open_circuit_stays_ready_while_stale_serving(client, open_circuit):
+    open_circuit()
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "degraded"
+    assert body["circuit"] == "open"
+    assert body["checks"]["storage"]["degraded"]
+
+
+def test_open_circuit_not_ready_without_stale_serving(client, open_circuit, monkeypatch):
+    open_circuit()
+    monkeypatch.setattr(settings, "REDIRECT_CACHE_STALE_SECONDS", 0)
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "not_ready"
@@ -0,0 +1,21 @@
+from config import settings
+from utils.http_cache import redirect_cache_headers
+
+
+def test_public_redirect_shared_cache_ttl_defaults_to_browser_ttl():
+    headers = redirect_cache_headers("abc", False, None)
+    assert settings.REDIRECT_S_MAXAGE_SECONDS <= settings.REDIRECT_MAX_AGE_SECONDS
+    assert headers["Cache-Control"] == (
+        f"public, max-age={settings.REDIRECT_MAX_AGE_SECONDS}, s-maxage={settings.REDIRECT_S_MAXAGE_SECONDS}"
+    )
+    assert headers["Surrogate-Key"] == "redirect redirect-abc"
+
+
+def test_public_redirect_capped_by_expiration():
+    headers = redirect_cache_headers("abc", False, 42.7)
+    assert headers["Cache-Control"] == "public, max-age=42, s-maxage=42"
+
+
+def test_expired_and_private_redirects():
+    assert redirect_cache_headers("abc", False, 0) == {"Cache-Control": "no-store"}
+    assert redirect_cache_headers("abc", True, None) == {"Cache-Control": "private, no-cache", "Vary": "Cookie"}
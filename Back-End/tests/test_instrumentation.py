@@ -0,0 +1,23 @@
+import asyncio
+import asyncpg
+from database.instrumentation import InstrumentedConnection
+from database.query_stats import query_stats
+
+
+def test_internal_statements_not_recorded(monkeypatch):
+    async def execute(self, query, *args, timeout=None):
+        return "OK"
+    
+    monkeypatch.setattr(asyncpg.Connection, "execute", execute)
+    conn = InstrumentedConnection.__new__(InstrumentedConnection)
+    conn._aborted = True
+    conn._reset_query = "SELECT pg_advisory_unlock_all();\nCLOSE ALL;\nUNLISTEN *;\nRESET ALL;"
+    query_stats.clear()
+    
+    async def scenario():
+        for query in ("BEGIN", "COMMIT;", "ROLLBACK;", "SAVEPOINT sp_1;", "RELEASE SAVEPOINT sp_1;", conn._reset_query):
+            await conn.execute(query)
+        await conn.execute("UPDATE urls SET clicks = clicks + 1 WHERE id = $1", 1)
+    
+    asyncio.run(scenario())
+    assert [entry["query"] for entry in query_stats.top(10)] == ["UPDATE urls SET clicks = clicks + ? WHERE id = ?"]
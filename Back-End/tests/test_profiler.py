@@ -0,0 +1,43 @@
+import asyncio
+from services.profiler import CapturedProfile, ProfileStore
+
+
+def capture(store, path="/abc"):
+    return CapturedProfile(store.next_id(), "GET", path, "/{short_code}", 302, 1.5, "header", {})
+
+
+def test_shared_profiles_visible_to_other_workers(tmp_path):
+    writer = ProfileStore(max_profiles=2)
+    reader = ProfileStore(max_profiles=2)
+    writer.open_shared(str(tmp_path))
+    reader.open_shared(str(tmp_path))
+    
+    async def scenario():
+        first = capture(writer, "/a")
+        await writer.add(first)
+        
+        loaded = await reader.get(first.id)
+        assert loaded.summary() == first.summary()
+        assert loaded.created_at == first.created_at
+        
+        await writer.add(capture(writer, "/b"))
+        await writer.add(capture(writer, "/c"))
+        
+        # Oldest pruned from the directory, newest listed first
+        assert [p["path"] for p in await reader.list()] == ["/c", "/b"]
+        assert await reader.get(first.id) is None
+    
+    asyncio.run(scenario())
+
+
+def test_unshared_store_rejects_unknown_ids(tmp_path):
+    store = ProfileStore(max_profiles=2)
+    
+    async def scenario():
+        captured = capture(store)
+        await store.add(captured)
+        assert await store.get(captured.id) is captured
+        assert await store.get("../etc/passwd") is None
+        assert [p["id"] for p in await store.list()] == [captured.id]
+    
+    asyncio.run(scenario())
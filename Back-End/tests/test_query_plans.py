@@ -0,0 +1,33 @@
+"""
+Query plan regression check (perf/check_query_plans.py) as a test
+Needs a disposable Postgres database: it is seeded with perf_* rows
+
+Usage (from Back-End/):
+    PERF_DATABASE_URL=postgresql://... python -m pytest -q tests/test_query_plans.py
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+
+PERF_DATABASE_URL = os.environ.get("PERF_DATABASE_URL")
+SCRIPT = Path(__file__).resolve().parent.parent / "perf" / "check_query_plans.py"
+
+pytestmark = pytest.mark.skipif(not PERF_DATABASE_URL, reason="PERF_DATABASE_URL not set")
+
+
+def test_query_plans():
+    # Own process: the suite runs on the memory backend and services bind
+    # their storage on import
+    env = dict(os.environ, DATABASE_URL=PERF_DATABASE_URL, STORAGE_BACKEND="postgres")
+    result = subprocess.run(
+        [sys.executable, str(SCRIPT), "--seed"],
+        cwd=SCRIPT.parent.parent,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=900
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
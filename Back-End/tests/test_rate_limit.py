@@ -0,0 +1,29 @@
+import pytest
+from starlette.requests import Request
+from config import settings
+from middleware.rate_limit import get_client_ip
+
+
+def make_request(forwarded: str) -> Request:
+    return Request({
+        "type": "http",
+        "headers": [(b"x-forwarded-for", forwarded.encode())],
+        "client": ("10.0.0.1", 1234),
+    })
+
+
+@pytest.mark.parametrize("hops, expected", [
+    (1, "203.0.113.7"),
+    (2, "198.51.100.2"),
+    (5, "1.2.3.4"),
+])
+def test_client_ip_counts_trusted_hops_from_the_right(monkeypatch, hops, expected):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUST_FORWARDED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_FORWARDED_HOPS", hops)
+    # Leftmost entry forged by the client
+    assert get_client_ip(make_request("1.2.3.4, 198.51.100.2, 203.0.113.7")) == expected
+
+
+def test_forwarded_ignored_unless_trusted(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUST_FORWARDED", False)
+    assert get_client_ip(make_request("1.2.3.4")) == "10.0.0.1"
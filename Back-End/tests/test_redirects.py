@@ -0,0 +1,74 @@
+import asyncio
+import uuid
+from database import admission
+from repositories import storage
+from services import url_service
+
+
+def register(client) -> None:
+    tag = uuid.uuid4().hex[:8]
+    response = client.post("/auth/register", json={
+        "username": f"user{tag}",
+        "email": f"user{tag}@example.com",
+        "password": "secret123",
+    })
+    assert response.status_code == 200
+
+
+def create_url(client, is_private: bool) -> dict:
+    response = client.post("/urls", json={"original_url": f"https://example.com/{uuid.uuid4().hex}", "is_private": is_private})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_private_redirect(client):
+    register(client)
+    url = create_url(client, is_private=True)
+    
+    response = client.get(f"/{url['short_code']}", follow_redirects=False)
+    assert response.headers["location"] == url["original_url"]
+    assert len(storage.tables.access_history[url["id"]]) == 1
+
+
+def test_private_redirect_with_open_circuit(client, open_circuit):
+    register(client)
+    url = create_url(client, is_private=True)
+    # Cached while the database is up
+    client.get(f"/{url['short_code']}", follow_redirects=False)
+    
+    open_circuit()
+    
+    # The user cannot be verified: unauthorized, nothing written
+    response = client.get(f"/{url['short_code']}", follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers["location"].endswith(f"/{url['short_code']}?error=unauthorized")
+    assert len(storage.tables.access_history[url["id"]]) == 1
+    
+    response = client.post("/urls/resolve", json={"short_codes": [url["short_code"]]})
+    assert response.status_code == 200
+    assert response.json()["results"][0]["status"] == "unauthorized"
+
+
+def test_public_redirect_with_open_circuit(client, open_circuit):
+    url = create_url(client, is_private=False)
+    client.get(f"/{url['short_code']}", follow_redirects=False)
+    open_circuit()
+    
+    response = client.get(f"/{url['short_code']}", follow_redirects=False)
+    assert response.headers["location"] == url["original_url"]
+
+
+def test_saturated_redirects_drop_history_not_the_redirect(client, monkeypatch):
+    register(client)
+    url = create_url(client, is_private=True)
+    public = create_url(client, is_private=False)
+    client.get(f"/{public['short_code']}", follow_redirects=False)
+    
+    limiter = admission["redirect"]
+    monkeypatch.setattr(limiter, "active", limiter.limit)
+    asyncio.run(url_service.record_url_access(url["id"], "someone@example.com", "registered"))
+    assert url["id"] not in storage.tables.access_history
+    
+    # Cache hits never wait for a slot
+    response = client.get(f"/{public['short_code']}", follow_redirects=False)
+    assert response.headers["location"] == public["original_url"]
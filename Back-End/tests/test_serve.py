@@ -0,0 +1,35 @@
+import pytest
+import serve
+from config import settings
+
+
+@pytest.fixture(autouse=True)
+def pool_settings(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_INVALIDATION_ENABLED", True)
+    monkeypatch.setattr(settings, "DB_POOL_MIN_SIZE", 2)
+    monkeypatch.setattr(settings, "DB_POOL_MAX_SIZE", 10)
+    for name in ("REDIRECT", "WRITE", "EXPORT", "AUTH"):
+        monkeypatch.setattr(settings, f"ADMISSION_{name}_LIMIT", 0)
+
+
+def test_pool_sizes_fit_budget():
+    assert serve.pool_sizes(2, 90) == (2, 10)
+    # 90 // 17 - 1 listener
+    assert serve.pool_sizes(16, 90) == (2, 4)
+    with pytest.raises(SystemExit):
+        serve.pool_sizes(16, 20)
+
+
+def test_admission_limits_follow_pool_size():
+    assert serve.worker_admission_limits(10) == {"redirect": 4, "write": 2, "export": 2, "auth": 2}
+    assert serve.worker_admission_limits(4) == {"redirect": 1, "write": 1, "export": 1, "auth": 1}
+    with pytest.raises(SystemExit):
+        serve.worker_admission_limits(3)
+
+
+def test_configured_admission_limits_scaled(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_REDIRECT_LIMIT", 6)
+    monkeypatch.setattr(settings, "ADMISSION_WRITE_LIMIT", 2)
+    assert serve.worker_admission_limits(10) == {"redirect": 6, "write": 2, "export": 1, "auth": 1}
+    # Halved, then trimmed to the pool
+    assert serve.worker_admission_limits(5) == {"redirect": 2, "write": 1, "export": 1, "auth": 1}
@@ -0,0 +1,170 @@
+import multiprocessing
+import pytest
+from utils.shared_table import _SEQ, _URL_OFFSET, SharedRedirectTable
+
+
+def make_table(tmp_path):
+    return SharedRedirectTable(str(tmp_path / "redirects"), 64 * 1024)
+
+
+def test_set_get(tmp_path):
+    table = make_table(tmp_path)
+    assert table.set("abc", 1, "https://example.com", False, True)
+    assert table.get("abc", 60) == (1, "https://example.com", False, True, None)
+    assert table.get("missing", 60) is None
+    table.close()
+
+
+def test_clear_starts_new_generation(tmp_path):
+    table = make_table(tmp_path)
+    table.set("abc", 1, "https://example.com", False, True)
+    other = make_table(tmp_path)
+    
+    table.clear()
+    assert table.get("abc", 60) is None
+    assert other.get("abc", 60) is None
+    assert len(other) == 0
+    
+    # Slots of the old generation are reused
+    other.set("abc", 2, "https://example.org", True, True)
+    assert table.get("abc", 60) == (2, "https://example.org", True, True, None)
+    assert len(table) == 1
+    table.close()
+    other.close()
+
+
+def test_set_skipped_while_locked(tmp_path):
+    table = make_table(tmp_path)
+    other = make_table(tmp_path)
+    table.set("abc", 1, "https://example.com", False, True)
+    
+    with other._write_lock():
+        assert not table.set("xyz", 2, "https://example.org", False, True)
+        # Unknown codes are evicted without waiting for the lock
+        table.evict("missing")
+    assert table.get("xyz", 60) is None
+    
+    table.evict("abc")
+    assert other.get("abc", 60) is None
+    table.close()
+    other.close()
+
+
+# Multiprocess: each process opens the table by path, like a worker
+
+fork = multiprocessing.get_context("fork")
+WRITES = 20000
+
+
+def url_for(url_id: int) -> str:
+    # Length varies with the id, so a torn read mixes lengths and contents
+    return f"https://example.com/{url_id}/" + "x" * (url_id % 400)
+
+
+def run_writer(path, done):
+    table = SharedRedirectTable(path, 64 * 1024)
+    for url_id in range(WRITES):
+        table.set("hot", url_id, url_for(url_id), url_id % 2 == 0, True)
+    done.set()
+    table.close()
+
+
+def run_reader(path, done, results):
+    table = SharedRedirectTable(path, 64 * 1024)
+    hits = torn = 0
+    while not done.is_set():
+        entry = table.get("hot", 60)
+        if entry is None:
+            continue
+        url_id, original_url, is_private, _, _ = entry
+        hits += 1
+        if original_url != url_for(url_id) or is_private != (url_id % 2 == 0):
+            torn += 1
+    results.put((hits, torn))
+    table.close()
+
+
+def run_in_process(target, *args):
+    process = fork.Process(target=target, args=args)
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+
+
+def test_concurrent_readers_never_see_torn_entries(tmp_path):
+    path = str(tmp_path / "redirects")
+    SharedRedirectTable(path, 64 * 1024).close()
+    done = fork.Event()
+    results = fork.Queue()
+    
+    readers = [fork.Process(target=run_reader, args=(path, done, results)) for _ in range(2)]
+    writer = fork.Process(target=run_writer, args=(path, done))
+    for process in readers + [writer]:
+        process.start()
+    outcomes = [results.get(timeout=60) for _ in readers]
+    for process in readers + [writer]:
+        process.join(30)
+        assert process.exitcode == 0
+    
+    assert sum(hits for hits, _ in outcomes) > 0
+    assert sum(torn for _, torn in outcomes) == 0
+
+
+def begin_write(path, key):
+    # Dies mid-write: the slot's sequence stays odd
+    table = SharedRedirectTable(path, 64 * 1024)
+    offset = next(o for o in table._probe_offsets(key.encode()) if table._slot_key(o) == key.encode())
+    seq = _SEQ.unpack_from(table._mm, offset)[0]
+    _SEQ.pack_into(table._mm, offset, seq + 1)
+    table.close()
+
+
+def corrupt_url(path, key):
+    # Changes the URL without the sequence number, so only the checksum catches it
+    table = SharedRedirectTable(path, 64 * 1024)
+    offset = next(o for o in table._probe_offsets(key.encode()) if table._slot_key(o) == key.encode())
+    table._mm[offset + _URL_OFFSET] ^= 0xFF
+    table.close()
+
+
+@pytest.mark.parametrize("writer", [begin_write, corrupt_url])
+def test_reader_retries_then_misses_on_inconsistent_slot(tmp_path, writer):
+    table = make_table(tmp_path)
+    table.set("abc", 1, "https://example.com", False, True)
+    
+    run_in_process(writer, table.path, "abc")
+    assert table.get("abc", 60) is None
+    
+    # The next complete write makes the slot readable again
+    assert table.set("abc", 2, "https://example.org", False, True)
+    assert table.get("abc", 60) == (2, "https://example.org", False, True, None)
+    table.close()
+
+
+def clear_table(path):
+    table = SharedRedirectTable(path, 64 * 1024)
+    table.clear()
+    table.close()
+
+
+def expect_entry(path, key, url_id):
+    table = SharedRedirectTable(path, 64 * 1024)
+    entry = table.get(key, 60)
+    table.close()
+    if entry is None or entry[0] != url_id:
+        raise SystemExit(1)
+
+
+def test_clear_in_another_process(tmp_path):
+    table = make_table(tmp_path)
+    table.set("abc", 1, "https://example.com", False, True)
+    generation = table._generation()
+    
+    run_in_process(clear_table, table.path)
+    assert table._generation() == generation + 1
+    assert table.get("abc", 60) is None
+    assert len(table) == 0
+    
+    table.set("abc", 2, "https://example.org", False, True)
+    run_in_process(expect_entry, table.path, "abc", 2)
+    table.close()
@@ -0,0 +1,16 @@
+import asyncio
+from services.url_service import _pending, _revalidating, _schedule_revalidation
+
+
+def test_revalidation_deduplicated_and_referenced():
+    async def scenario():
+        for _ in range(5):
+            _schedule_revalidation("abc")
+        assert len(_pending) == 1
+        assert _revalidating == {"abc"}
+        
+        await asyncio.gather(*_pending)
+        assert not _pending
+        assert not _revalidating
+    
+    asyncio.run(scenario())
@@ -4,7 +4,7 @@ from .security import (
     create_access_token,
     decode_access_token
 )
-from .url_generator import generate_short_code
+from .url_generator import generate_short_code, generate_short_codes
 
 __all__ = [
     "verify_password",
@@ -12,4 +12,5 @@ __all__ = [
     "create_access_token",
     "decode_access_token",
     "generate_short_code",
+    "generate_short_codes",
 ]
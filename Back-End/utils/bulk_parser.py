@@ -0,0 +1,203 @@
+import codecs
+import csv
+import json
+import re
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple
+
+
+CHUNK_SIZE = 64 * 1024
+# Largest single JSON item / line accepted before giving up on it
+MAX_ITEM_BYTES = 64 * 1024
+
+# (row number, parsed item or None, error message or None)
+ParsedRow = Tuple[int, Optional[dict], Optional[str]]
+ReadFunc = Callable[[int], Awaitable[bytes]]
+
+_JSON_OBJECT_PREFIX = re.compile(r'\{\s*"urls"\s*:\s*$')
+# What may follow an array item
+_ITEM_DELIMITERS = ' \t\r\n,]'
+_decoder = json.JSONDecoder()
+
+
+class BulkFormatError(ValueError):
+    """Unrecoverable format error (the rest of the file cannot be parsed)"""
+
+
+def detect_format(filename: str) -> Optional[str]:
+    """Import format from a file name: 'json', 'ndjson' or 'csv'"""
+    name = (filename or '').lower()
+    if name.endswith('.json'):
+        return 'json'
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.csv'):
+        return 'csv'
+    return None
+
+
+def parse_rows(fmt: str, read: ReadFunc) -> AsyncIterator[ParsedRow]:
+    """Incremental parser for the given format"""
+    parsers = {
+        'json': iter_json_array,
+        'ndjson': iter_ndjson,
+        'csv': iter_csv,
+    }
+    return parsers[fmt](read)
+
+
+async def _iter_lines(read: ReadFunc) -> AsyncIterator[Tuple[int, str]]:
+    """Yield (line number, line) without holding more than one chunk in memory"""
+    buffer = b''
+    line_no = 0
+    while True:
+        chunk = await read(CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            line_no += 1
+            yield line_no, _decode(line, line_no)
+        if len(buffer) > MAX_ITEM_BYTES:
+            raise BulkFormatError(f"Line {line_no + 1} is too long")
+
+    if buffer:
+        line_no += 1
+        yield line_no, _decode(buffer, line_no)
+
+
+def _decode(line: bytes, line_no: int) -> str:
+    try:
+        return line.decode('utf-8-sig' if line_no == 1 else 'utf-8').rstrip('\r')
+    except UnicodeDecodeError:
+        raise BulkFormatError(f"Line {line_no} is not valid UTF-8")
+
+
+async def iter_ndjson(read: ReadFunc) -> AsyncIterator[ParsedRow]:
+    """One JSON object per line: {"url": "...", "is_private": false}"""
+    async for line_no, line in _iter_lines(read):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError:
+            yield line_no, None, "Invalid JSON"
+            continue
+        if not isinstance(item, dict):
+            yield line_no, None, "Expected a JSON object"
+            continue
+        yield line_no, item, None
+
+
+async def iter_csv(read: ReadFunc) -> AsyncIterator[ParsedRow]:
+    """CSV with a header row: url[,is_private]"""
+    header = None
+    async for line_no, line in _iter_lines(read):
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+
+        if header is None:
+            header = [value.strip().lower() for value in values]
+            if 'url' not in header:
+                raise BulkFormatError("CSV header must include a 'url' column")
+            continue
+
+        if len(values) != len(header):
+            yield line_no, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+
+        row = dict(zip(header, (value.strip() for value in values)))
+        item = {'url': row['url']}
+        if row.get('is_private'):
+            item['is_private'] = row['is_private']
+        yield line_no, item, None
+
+
+async def iter_json_array(read: ReadFunc) -> AsyncIterator[ParsedRow]:
+    """
+    Incrementally parse {"urls": [...]} or a bare [...] array
+    Items are decoded one at a time, so the whole file is never loaded
+    """
+    buffer = ''
+    pos = 0
+    eof = False
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    async def fill() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = await read(CHUNK_SIZE)
+        if not chunk:
+            eof = True
+            return False
+        # Drop consumed text so the buffer stays around one chunk
+        buffer = buffer[pos:] + decoder.decode(chunk)
+        pos = 0
+        return True
+
+    # Find the opening bracket of the array
+    while '[' not in buffer:
+        if not await fill():
+            raise BulkFormatError("Invalid JSON format")
+        if len(buffer) > MAX_ITEM_BYTES:
+            raise BulkFormatError("Invalid JSON format")
+
+    start = buffer.index('[')
+    prefix = buffer[:start].lstrip('\ufeff \t\r\n')
+    if prefix and not _JSON_OBJECT_PREFIX.match(prefix):
+        raise BulkFormatError('JSON must be an array or {"urls": [...]}')
+    pos = start + 1
+
+    index = 0
+    expect_item = True
+    while True:
+        # Skip whitespace and separators
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buffer) or not await fill():
+                break
+
+        if pos >= len(buffer):
+            raise BulkFormatError("Invalid JSON format: unexpected end of file")
+
+        char = buffer[pos]
+        if char == ']':
+            # Trailing comma: "[{...},]"
+            if expect_item and index:
+                raise BulkFormatError(f"Invalid JSON format after item {index}")
+            return
+        if char == ',':
+            if expect_item:
+                raise BulkFormatError(f"Invalid JSON format after item {index}")
+            expect_item = True
+            pos += 1
+            continue
+        if not expect_item:
+            raise BulkFormatError(f"Invalid JSON format after item {index}")
+
+        # Decode one item, reading more data while it is incomplete. A number
+        # or literal cut at the chunk boundary ("12" | "34", "1e" | "5") also
+        # decodes, so it only counts once a delimiter follows it
+        while True:
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                end = None
+            if end is not None and (
+                eof or isinstance(item, (dict, list, str))
+                or (end < len(buffer) and buffer[end] in _ITEM_DELIMITERS)
+            ):
+                break
+            if len(buffer) - pos > MAX_ITEM_BYTES or not await fill():
+                if end is None:
+                    raise BulkFormatError(f"Invalid JSON format at item {index + 1}")
+                break
+
+        pos = end
+        index += 1
+        expect_item = False
+        if isinstance(item, dict):
+            yield index, item, None
+        else:
+            yield index, None, "Expected a JSON object"
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Deque, List, Optional
+from config import settings
+from utils.metrics import registry
+
+
+events_dropped = registry.counter(
+    "log_events_dropped_total",
+    "Log events dropped because the queue was full or the write failed"
+)
+
+
+def _serialize(record: dict, pid: int) -> str:
+    line = dict(record)
+    line["ts"] = datetime.fromtimestamp(record["ts"], timezone.utc).isoformat(timespec="milliseconds")
+    line["pid"] = pid
+    return json.dumps(line, ensure_ascii=False, default=str) + "\n"
+
+
+class StdoutSink:
+    """JSON lines on standard output (collected by the process manager)"""
+    
+    def write(self, text: str) -> None:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+class RotatingFileSink:
+    """
+    JSON lines appended to a file, rotated to .1, .2, ... past max_bytes
+    "{pid}" in the path is replaced by the worker's pid, so workers never
+    rotate a file another one is writing
+    """
+    
+    def __init__(self, path: str, max_bytes: int, backups: int):
+        self.path_template = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._path: Optional[Path] = None
+        self._file: Optional[BinaryIO] = None
+        self._size = 0
+        self._rotates = True
+    
+    def _open(self) -> None:
+        # Opened on first write, after uvicorn forked the worker
+        self._path = Path(self.path_template.format(pid=os.getpid()))
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self._path, "ab")
+        self._size = self._file.tell()
+        # Never rename devices or pipes (/dev/null, /dev/stderr)
+        self._rotates = self._path.is_file()
+    
+    def _rotate(self) -> None:
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            older = self._path.with_name(f"{self._path.name}.{index}")
+            if older.exists():
+                older.replace(self._path.with_name(f"{self._path.name}.{index + 1}"))
+        if self.backups > 0:
+            self._path.replace(self._path.with_name(f"{self._path.name}.1"))
+        self._file = open(self._path, "wb")
+        self._size = 0
+    
+    def write(self, text: str) -> None:
+        data = text.encode()
+        if self._file is None:
+            self._open()
+        if self._rotates and self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+
+def create_sink(destination: str):
+    if destination == "stdout":
+        return StdoutSink()
+    return RotatingFileSink(destination, settings.LOG_FILE_MAX_MB * 1024 * 1024, settings.LOG_FILE_BACKUPS)
+
+
+class EventLog:
+    """
+    Structured events written as JSON lines in batches
+    log() only appends a dict to a bounded queue; a background task
+    serializes and writes batches in a thread, so request handling never
+    waits on stdout or disk. When the queue is full new events are dropped
+    and counted. Before start() and after stop() (startup, shutdown,
+    scripts) events are written directly
+    """
+    
+    def __init__(self, sink, max_events: int, batch_size: int):
+        self.sink = sink
+        self.max_events = max_events
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._pending: Deque[dict] = deque()
+        self._batch_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._pid = os.getpid()
+        # Batches are written from a worker thread
+        self._write_lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._pending)
+    
+    def log(self, event: str, level: str = "info", **fields) -> None:
+        """Queue an event (no I/O while the writer runs)"""
+        record = {"ts": time.time(), "level": level, "event": event, **fields}
+        if self._task is None:
+            self._write([record])
+            return
+        
+        if len(self._pending) >= self.max_events:
+            self._drop(1)
+            return
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size:
+            self._batch_ready.set()
+    
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    @property
+    def lag_seconds(self) -> float:
+        """Age of the oldest event waiting to be written"""
+        return time.time() - self._pending[0]["ts"] if self._pending else 0.0
+    
+    def snapshot(self) -> dict:
+        return {
+            "queued": len(self._pending),
+            "dropped": self.dropped,
+            "lag_seconds": round(self.lag_seconds, 3),
+        }
+    
+    async def start(self, interval: float) -> None:
+        """Start the batch writer in the background"""
+        if not self._task:
+            self._pid = os.getpid()
+            self._task = asyncio.create_task(self._run(interval))
+    
+    async def stop(self) -> None:
+        """Stop the batch writer and write what is queued"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+    
+    async def _run(self, interval: float) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self.flush()
+    
+    async def flush(self) -> None:
+        """Write queued events in batches of batch_size"""
+        while self._pending:
+            count = min(len(self._pending), self.batch_size)
+            batch = [self._pending.popleft() for _ in range(count)]
+            await asyncio.to_thread(self._write, batch)
+    
+    def _write(self, batch: List[dict]) -> None:
+        try:
+            text = "".join(_serialize(record, self._pid) for record in batch)
+            with self._write_lock:
+                self.sink.write(text)
+        except (OSError, ValueError) as e:
+            # Nowhere else to log to
+            self._drop(len(batch))
+            sys.stderr.write(f"Event log write failed, {len(batch)} events dropped: {e}\n")
+    
+    def _drop(self, count: int) -> None:
+        self.dropped += count
+        events_dropped.inc(amount=count)
+
+
+event_log = EventLog(create_sink(settings.LOG_DESTINATION), settings.LOG_QUEUE_MAX_EVENTS, settings.LOG_BATCH_SIZE)
@@ -0,0 +1,145 @@
+import heapq
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy hitters summary with at most `capacity` counters
+    Every key with a true count above N / capacity is guaranteed to be kept;
+    `count` never underestimates and `count - error` never overestimates
+    The minimum counter is found with a lazily updated heap (stale entries
+    are skipped on pop and the heap is rebuilt when it grows too large)
+    """
+
+    __slots__ = ("capacity", "total", "_counters", "_heap")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.total = 0
+        # key -> [count, error]
+        self._counters: Dict[str, List[int]] = {}
+        self._heap: List[Tuple[int, str]] = []
+
+    def add(self, key: str, count: int = 1) -> None:
+        self.total += count
+        counter = self._counters.get(key)
+        if counter is not None:
+            counter[0] += count
+            return
+
+        if len(self._counters) < self.capacity:
+            self._counters[key] = [count, 0]
+            heapq.heappush(self._heap, (count, key))
+            return
+
+        # Replace the smallest counter, inheriting its count as error
+        min_count, min_key = self._pop_min()
+        self._counters[key] = [min_count + count, min_count]
+        heapq.heappush(self._heap, (min_count + count, key))
+
+    def _pop_min(self) -> Tuple[int, str]:
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(counter[0], key) for key, counter in self._counters.items()]
+            heapq.heapify(self._heap)
+
+        while True:
+            count, key = heapq.heappop(self._heap)
+            counter = self._counters.get(key)
+            if counter is None:
+                continue
+            if counter[0] != count:
+                heapq.heappush(self._heap, (counter[0], key))
+                continue
+            del self._counters[key]
+            return count, key
+
+    def min_count(self) -> int:
+        """Smallest count kept (upper bound for any key not in the summary)"""
+        if len(self._counters) < self.capacity:
+            return 0
+        return min(counter[0] for counter in self._counters.values())
+
+    def items(self) -> Iterable[Tuple[str, int, int]]:
+        """(key, count, error) for every kept key"""
+        return ((key, counter[0], counter[1]) for key, counter in self._counters.items())
+
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        """The k keys with the highest counts"""
+        return heapq.nlargest(k, self.items(), key=lambda item: item[1])
+
+    def to_dict(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "counters": [list(item) for item in self.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SpaceSaving":
+        summary = cls(data["capacity"])
+        summary.total = data["total"]
+        for key, count, error in data["counters"]:
+            summary._counters[key] = [count, error]
+        summary._heap = [(counter[0], key) for key, counter in summary._counters.items()]
+        heapq.heapify(summary._heap)
+        return summary
+
+    @classmethod
+    def merge(cls, summaries: Iterable["SpaceSaving"], capacity: int) -> "SpaceSaving":
+        """
+        Combine summaries (other time slices or workers) into one
+        Counts are added; a key missing from a full summary may have up to
+        that summary's minimum count there, which is added to its error
+        """
+        summaries = list(summaries)
+        merged: Dict[str, List[int]] = {}
+        for summary in summaries:
+            for key, count, error in summary.items():
+                counter = merged.setdefault(key, [0, 0])
+                counter[0] += count
+                counter[1] += error
+
+        for summary in summaries:
+            floor = summary.min_count()
+            if floor:
+                for key, counter in merged.items():
+                    if key not in summary._counters:
+                        counter[0] += floor
+                        counter[1] += floor
+
+        result = cls(capacity)
+        result.total = sum(summary.total for summary in summaries)
+        kept = heapq.nlargest(capacity, merged.items(), key=lambda item: item[1][0])
+        result._counters = dict(kept)
+        result._heap = [(counter[0], key) for key, counter in kept]
+        heapq.heapify(result._heap)
+        return result
+
+
+class SlidingTopK:
+    """
+    Heavy hitters over a sliding time window
+    The window is split into `slices` Space-Saving summaries; old slices
+    are dropped as time advances, so memory is fixed at capacity * slices
+    """
+
+    def __init__(self, capacity: int, window_seconds: float, slices: int):
+        self.capacity = capacity
+        self.window_seconds = window_seconds
+        self.slice_seconds = window_seconds / slices
+        self._slices: deque = deque(maxlen=slices)
+
+    def add(self, key: str, now: Optional[float] = None) -> None:
+        slice_id = int((now if now is not None else time.time()) // self.slice_seconds)
+        if not self._slices or self._slices[-1][0] != slice_id:
+            self._slices.append((slice_id, SpaceSaving(self.capacity)))
+        self._slices[-1][1].add(key)
+
+    def summary(self, now: Optional[float] = None) -> SpaceSaving:
+        """Merged summary of the slices still inside the window"""
+        current = int((now if now is not None else time.time()) // self.slice_seconds)
+        oldest = current - self._slices.maxlen + 1
+        live = [summary for slice_id, summary in self._slices if slice_id >= oldest]
+        return SpaceSaving.merge(live, self.capacity)
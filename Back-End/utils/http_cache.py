@@ -0,0 +1,67 @@
+import hashlib
+import math
+from typing import Dict, Optional
+from config import settings
+
+
+# Error redirects depend on the current state and the visitor, never cache them
+NO_STORE = {"Cache-Control": "no-store"}
+
+
+def surrogate_keys(short_code: str) -> str:
+    """Surrogate-Key tags for a redirect: the short code and all redirects"""
+    return f"redirect redirect-{short_code}"
+
+
+def redirect_cache_headers(short_code: str, is_private: bool, seconds_until_expiry: Optional[float]) -> Dict[str, str]:
+    """
+    Caching headers for a successful redirect
+    Public links: max-age for browsers, s-maxage for shared caches, both
+    capped by the link expiration. Nothing is purged on edits, so these
+    TTLs bound how long an updated, deleted or now-private link keeps
+    redirecting from a cache (Surrogate-Key allows manual purges)
+    Private links: only the browser may keep it and must revalidate, since
+    access depends on the session cookie and is recorded on every hit
+    """
+    if is_private:
+        return {
+            "Cache-Control": "private, no-cache",
+            "Vary": "Cookie",
+        }
+
+    max_age = settings.REDIRECT_MAX_AGE_SECONDS
+    s_maxage = settings.REDIRECT_S_MAXAGE_SECONDS
+    if seconds_until_expiry is not None:
+        remaining = max(0, math.floor(seconds_until_expiry))
+        max_age = min(max_age, remaining)
+        s_maxage = min(s_maxage, remaining)
+
+    if max_age <= 0 and s_maxage <= 0:
+        return dict(NO_STORE)
+
+    headers = {"Cache-Control": f"public, max-age={max_age}, s-maxage={s_maxage}"}
+    if settings.REDIRECT_SURROGATE_KEYS:
+        headers["Surrogate-Key"] = surrogate_keys(short_code)
+    return headers
+
+
+def weak_etag(*parts) -> str:
+    """Weak ETag from the values that identify a representation"""
+    digest = hashlib.sha1(":".join(map(str, parts)).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match check with weak comparison (RFC 9110)
+    W/"x" and "x" match each other, "*" matches any current representation
+    """
+    if not if_none_match:
+        return False
+
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
@@ -0,0 +1,75 @@
+import time
+from typing import Dict, Tuple
+
+
+_PERIODS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """
+    Parse a rate like "30/minute" into (requests, period in seconds)
+    """
+    try:
+        count, unit = rate.strip().split("/")
+        return int(count), _PERIODS[unit.strip().lower()]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate '{rate}', expected '<count>/<second|minute|hour|day>'")
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter using the generic cell rate algorithm (GCRA)
+
+    Allows bursts of up to `limit` requests and refills at limit/period.
+    Each key stores a single float (its theoretical arrival time); keys
+    whose bucket is full again are equivalent to absent ones and are
+    swept automatically, so memory only grows with active clients.
+    """
+
+    __slots__ = ("limit", "period", "max_keys", "_interval", "_tats", "_next_sweep")
+
+    def __init__(self, limit: int, period: float, max_keys: int = 100_000):
+        self.limit = limit
+        self.period = period
+        self.max_keys = max_keys
+        self._interval = period / limit
+        self._tats: Dict[str, float] = {}
+        self._next_sweep = time.monotonic() + period
+
+    def hit(self, key: str) -> float:
+        """
+        Register a request for key
+        Returns 0 if allowed, otherwise the seconds to wait before retrying
+        """
+        now = time.monotonic()
+        if now >= self._next_sweep or len(self._tats) >= self.max_keys:
+            self._sweep(now)
+
+        tat = self._tats.get(key, now)
+        if tat < now:
+            tat = now
+
+        new_tat = tat + self._interval
+        wait = new_tat - now - self.period
+        if wait > 0:
+            return wait
+
+        self._tats[key] = new_tat
+        return 0.0
+
+    def _sweep(self, now: float) -> None:
+        """Drop full buckets, then the oldest keys if still over max_keys"""
+        self._tats = {key: tat for key, tat in self._tats.items() if tat > now}
+        if len(self._tats) >= self.max_keys:
+            # Still full of active clients: forget the oldest half
+            for key in list(self._tats)[:len(self._tats) - self.max_keys // 2]:
+                del self._tats[key]
+        self._next_sweep = now + self.period
+
+    def __len__(self) -> int:
+        return len(self._tats)
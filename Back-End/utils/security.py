@@ -1,13 +1,19 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from config import settings
 from datetime import datetime, timezone
+from .cache import TTLCache
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Verified token digest -> claims, each entry expires with its token
+token_cache = TTLCache(settings.TOKEN_CACHE_MAX_ENTRIES, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -31,13 +37,40 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     
+    # The next request usually carries this token (sliding session)
+    _cache_claims(encoded_jwt, {**data, "exp": int(expire.timestamp())})
+    
     return encoded_jwt
 
 
 def decode_access_token(token: str) -> Optional[dict]:
-    """Decode a JWT access token"""
+    """
+    Decode a JWT access token
+    Verified tokens are cached until their exp, so repeated requests with
+    the same cookie skip signature and claim verification
+    """
+    key = _token_key(token)
+    payload = token_cache.get(key)
+    if payload is not None:
+        return dict(payload)
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         return None
+    
+    _cache_claims(token, payload, key)
+    return dict(payload)
+
+
+def _token_key(token: str) -> bytes:
+    # Digest instead of the token itself, so the cache holds no usable credentials
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _cache_claims(token: str, payload: dict, key: Optional[bytes] = None) -> None:
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)):
+        return
+    
+    token_cache.set(key or _token_key(token), payload, min(token_cache.ttl, exp - time.time()))
@@ -0,0 +1,351 @@
+import math
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# File header: magic, layout version, slot size, slot count, then the generation
+_HEADER = struct.Struct("<8sIIQ")
+_GENERATION = struct.Struct("<I")
+_GENERATION_OFFSET = _HEADER.size
+_HEADER_SIZE = 64
+_MAGIC = b"URLSHM01"
+_VERSION = 2
+
+# Slot header: seq, crc32, flags, key length, url length, generation, url id, expires_at, stored_at
+_SLOT = struct.Struct("<IIBBHIqdd")
+_SEQ = struct.Struct("<I")
+KEY_SIZE = 20  # urls.short_code is VARCHAR(20)
+_KEY_OFFSET = _SLOT.size
+_URL_OFFSET = _KEY_OFFSET + KEY_SIZE
+
+_FLAG_USED = 0x1
+_FLAG_PRIVATE = 0x2
+_FLAG_ACTIVE = 0x4
+
+PROBE_LIMIT = 8
+_READ_RETRIES = 4
+
+# (url_id, original_url, is_private, is_active, expires_at epoch or None)
+SharedEntry = Tuple[int, str, bool, bool, Optional[float]]
+
+
+class SharedRedirectTable:
+    """
+    Fixed-size hash table of short code -> redirect target stored in a
+    memory-mapped file, so every worker process on the host shares it.
+
+    Readers never lock: each slot carries a sequence number that writers
+    make odd while updating, plus a checksum of its contents; a read is
+    retried when either shows a concurrent write. Writers are serialized
+    across processes with an exclusive flock on the backing file; caching
+    is best effort, so set() skips the write instead of waiting when
+    another process holds the lock, and evict() only locks when a lock-free
+    probe finds the key.
+
+    The table never grows: total size is fixed by max_bytes, collisions
+    use bounded linear probing and the oldest entry in the probe window
+    is overwritten when it is full.
+
+    Every slot records the table generation it was written in; clear()
+    only bumps the generation in the header, which turns all older slots
+    into misses (and free slots for writers) without touching them.
+    """
+
+    def __init__(self, path: str, max_bytes: int, slot_size: int = 512):
+        if fcntl is None:
+            raise RuntimeError("Shared redirect table requires a POSIX system")
+        if slot_size <= _URL_OFFSET:
+            raise ValueError(f"slot_size must be greater than {_URL_OFFSET} bytes")
+
+        self.path = path
+        self.slot_size = slot_size
+        self.slot_count = max(PROBE_LIMIT, (max_bytes - _HEADER_SIZE) // slot_size)
+        self.max_url_bytes = slot_size - _URL_OFFSET
+        self._size = _HEADER_SIZE + self.slot_count * slot_size
+
+        self._fd = self._open_backing_file()
+        self._mm = mmap.mmap(self._fd, self._size)
+
+    def close(self) -> None:
+        """Unmap the table and close the backing file"""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def get(self, key: str, max_age: float) -> Optional[SharedEntry]:
+        """
+        Lock-free lookup
+        Args:
+            key: Short code
+            max_age: Ignore entries stored more than max_age seconds ago
+        Returns None on miss or when the entry is stale
+        """
+        key_bytes = key.encode()
+        if len(key_bytes) > KEY_SIZE:
+            return None
+
+        now = time.time()
+        generation = self._generation()
+        for offset in self._probe_offsets(key_bytes):
+            entry = self._read_slot(offset, key_bytes)
+            if entry is None:
+                continue
+
+            url_id, original_url, flags, slot_generation, expires_at, stored_at = entry
+            if slot_generation != generation:
+                continue
+            if now - stored_at > max_age:
+                return None
+            if expires_at is not None and expires_at <= now:
+                return None
+
+            return url_id, original_url, bool(flags & _FLAG_PRIVATE), bool(flags & _FLAG_ACTIVE), expires_at
+
+        return None
+
+    def set(
+        self,
+        key: str,
+        url_id: int,
+        original_url: str,
+        is_private: bool,
+        is_active: bool,
+        expires_at: Optional[float] = None
+    ) -> bool:
+        """
+        Store an entry
+        Returns False when the key or URL does not fit in a slot, or when
+        another process is writing (the write is skipped, never waited for)
+        """
+        key_bytes = key.encode()
+        url_bytes = original_url.encode()
+        if len(key_bytes) > KEY_SIZE or len(url_bytes) > self.max_url_bytes:
+            return False
+
+        flags = _FLAG_USED
+        if is_private:
+            flags |= _FLAG_PRIVATE
+        if is_active:
+            flags |= _FLAG_ACTIVE
+
+        with self._write_lock(blocking=False) as lock:
+            if not lock.locked:
+                return False
+            offset = self._find_write_slot(key_bytes)
+            self._write_slot(offset, key_bytes, url_bytes, flags, url_id, expires_at)
+        return True
+
+    def evict(self, key: str) -> None:
+        """Remove an entry if present (locks only when the key may be stored)"""
+        key_bytes = key.encode()
+        if len(key_bytes) > KEY_SIZE:
+            return
+        if not any(self._may_hold(offset, key_bytes) for offset in self._probe_offsets(key_bytes)):
+            return
+
+        # Invalidations are not skipped: held only for a few slot writes
+        with self._write_lock():
+            for offset in self._probe_offsets(key_bytes):
+                if self._slot_key(offset) == key_bytes:
+                    self._clear_slot(offset)
+
+    def clear(self) -> None:
+        """Remove every entry (O(1): starts a new generation)"""
+        with self._write_lock():
+            _GENERATION.pack_into(self._mm, _GENERATION_OFFSET, (self._generation() + 1) & 0xFFFFFFFF)
+
+    def __len__(self) -> int:
+        generation = self._generation()
+        used = 0
+        for index in range(self.slot_count):
+            if self._is_live(_HEADER_SIZE + index * self.slot_size, generation):
+                used += 1
+        return used
+
+    # Internal helpers
+
+    def _write_lock(self, blocking: bool = True) -> "_FileLock":
+        return _FileLock(self._fd, blocking)
+
+    def _open_backing_file(self) -> int:
+        """
+        Open (or create) the backing file with the expected layout.
+        A file with a different layout is never resized in place, since
+        other processes may still have it mapped: it is replaced by a new
+        file and those processes keep using the old one until restarted.
+        """
+        header = _HEADER.pack(_MAGIC, _VERSION, self.slot_size, self.slot_count)
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            with _FileLock(fd):
+                try:
+                    current = os.stat(self.path).st_ino == os.fstat(fd).st_ino
+                except FileNotFoundError:
+                    current = False
+
+                if current:
+                    size = os.fstat(fd).st_size
+                    if size == self._size and os.pread(fd, _HEADER.size, 0) == header:
+                        return fd
+                    if size == 0:
+                        os.ftruncate(fd, self._size)
+                        os.pwrite(fd, header, 0)
+                        return fd
+                    os.unlink(self.path)
+
+            # Stale or replaced file: retry with the current path
+            os.close(fd)
+
+    def _generation(self) -> int:
+        return _GENERATION.unpack_from(self._mm, _GENERATION_OFFSET)[0]
+
+    def _is_live(self, offset: int, generation: int) -> bool:
+        """Used and written in the current generation"""
+        _, _, flags, _, _, slot_generation, _, _, _ = _SLOT.unpack_from(self._mm, offset)
+        return bool(flags & _FLAG_USED) and slot_generation == generation
+
+    def _probe_offsets(self, key_bytes: bytes):
+        start = zlib.crc32(key_bytes) % self.slot_count
+        for i in range(PROBE_LIMIT):
+            yield _HEADER_SIZE + ((start + i) % self.slot_count) * self.slot_size
+
+    def _slot_key(self, offset: int) -> Optional[bytes]:
+        _, _, flags, key_len, _, _, _, _, _ = _SLOT.unpack_from(self._mm, offset)
+        if not flags & _FLAG_USED:
+            return None
+        start = offset + _KEY_OFFSET
+        return self._mm[start:start + key_len]
+
+    def _may_hold(self, offset: int, key_bytes: bytes) -> bool:
+        """Lock-free check whether a slot stores the key (True while it is being written)"""
+        seq = _SEQ.unpack_from(self._mm, offset)[0]
+        if seq & 1:
+            return True
+        key = self._slot_key(offset)
+        return key == key_bytes or _SEQ.unpack_from(self._mm, offset)[0] != seq
+
+    def _read_slot(self, offset: int, key_bytes: bytes):
+        mm = self._mm
+        for _ in range(_READ_RETRIES):
+            seq_before = _SEQ.unpack_from(mm, offset)[0]
+            if seq_before & 1:
+                continue
+
+            data = mm[offset:offset + self.slot_size]
+            if _SEQ.unpack_from(mm, offset)[0] != seq_before:
+                continue
+
+            seq, crc, flags, key_len, url_len, generation, url_id, expires_at, stored_at = _SLOT.unpack_from(data)
+            if seq != seq_before or not flags & _FLAG_USED:
+                return None
+            if data[_KEY_OFFSET:_KEY_OFFSET + key_len] != key_bytes:
+                return None
+            if url_len > self.max_url_bytes:
+                continue
+            if zlib.crc32(data[8:_URL_OFFSET + url_len]) != crc:
+                continue
+
+            original_url = data[_URL_OFFSET:_URL_OFFSET + url_len].decode()
+            expires_at = None if math.isnan(expires_at) else expires_at
+            return url_id, original_url, flags, generation, expires_at, stored_at
+
+        return None
+
+    def _find_write_slot(self, key_bytes: bytes) -> int:
+        empty = None
+        oldest = None
+        oldest_stored_at = math.inf
+        generation = self._generation()
+        for offset in self._probe_offsets(key_bytes):
+            _, _, flags, key_len, _, slot_generation, _, _, stored_at = _SLOT.unpack_from(self._mm, offset)
+            # Slots of an older generation are free
+            if not flags & _FLAG_USED or slot_generation != generation:
+                if empty is None:
+                    empty = offset
+                continue
+            if self._mm[offset + _KEY_OFFSET:offset + _KEY_OFFSET + key_len] == key_bytes:
+                return offset
+            if stored_at < oldest_stored_at:
+                oldest, oldest_stored_at = offset, stored_at
+        return empty if empty is not None else oldest
+
+    def _write_slot(
+        self,
+        offset: int,
+        key_bytes: bytes,
+        url_bytes: bytes,
+        flags: int,
+        url_id: int,
+        expires_at: Optional[float]
+    ) -> None:
+        mm = self._mm
+        seq = self._begin_write(offset)
+
+        body = bytearray(_URL_OFFSET - 8 + len(url_bytes))
+        struct.pack_into(
+            "<BBHIqdd", body, 0,
+            flags, len(key_bytes), len(url_bytes), self._generation(), url_id,
+            math.nan if expires_at is None else expires_at, time.time()
+        )
+        body[_KEY_OFFSET - 8:_KEY_OFFSET - 8 + len(key_bytes)] = key_bytes
+        body[_URL_OFFSET - 8:] = url_bytes
+        mm[offset + 8:offset + 8 + len(body)] = body
+        struct.pack_into("<I", mm, offset + 4, zlib.crc32(body))
+
+        _SEQ.pack_into(mm, offset, (seq + 1) & 0xFFFFFFFF)
+
+    def _begin_write(self, offset: int) -> int:
+        """
+        Make the slot's sequence odd and return it (add one when done)
+        An odd sequence left by a writer that died mid-write is moved to
+        the next odd value, so the slot becomes readable again
+        """
+        seq = ((_SEQ.unpack_from(self._mm, offset)[0] + 1) | 1) & 0xFFFFFFFF
+        _SEQ.pack_into(self._mm, offset, seq)
+        return seq
+
+    def _clear_slot(self, offset: int) -> None:
+        mm = self._mm
+        seq = self._begin_write(offset)
+        mm[offset + 8] = 0
+        _SEQ.pack_into(mm, offset, (seq + 1) & 0xFFFFFFFF)
+
+
+class _FileLock:
+    """
+    Exclusive advisory lock on a file descriptor
+    Non-blocking locks give up at once when contended (locked is False)
+    """
+
+    __slots__ = ("_fd", "_blocking", "locked")
+
+    def __init__(self, fd: int, blocking: bool = True):
+        self._fd = fd
+        self._blocking = blocking
+        self.locked = False
+
+    def __enter__(self):
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if self._blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return self
+        self.locked = True
+        return self
+
+    def __exit__(self, *exc):
+        if self.locked:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self.locked = False
+        return False
@@ -1,6 +1,12 @@
 import random
 import string
-from database import db
+from typing import List
+
+
+def _storage():
+    # Import here to avoid circular dependency (repositories import utils)
+    from repositories import storage
+    return storage
 
 
 async def generate_short_code(length: int = 7) -> str:
@@ -16,14 +22,32 @@ async def generate_short_code(length: int = 7) -> str:
         short_code = ''.join(random.choices(characters, k=length))
         
         # Check if code already exists
-        async with db.pool.acquire() as conn:
-            exists = await conn.fetchval(
-                'SELECT EXISTS(SELECT 1 FROM urls WHERE short_code = $1)',
-                short_code
-            )
-            
-            if not exists:
-                return short_code
+        if not await _storage().urls.existing_short_codes([short_code]):
+            return short_code
     
     # If we couldn't generate a unique code, try with longer length
     return await generate_short_code(length + 1)
+
+
+async def generate_short_codes(count: int, length: int = 7) -> List[str]:
+    """
+    Generate `count` unique short codes with a single existence check
+    per round instead of one query per code.
+    """
+    characters = string.ascii_letters + string.digits
+    codes = set()
+    
+    max_attempts = 10
+    for _ in range(max_attempts):
+        while len(codes) < count:
+            codes.add(''.join(random.choices(characters, k=length)))
+        
+        taken = await _storage().urls.existing_short_codes(list(codes))
+        
+        if not taken:
+            return list(codes)
+        
+        codes.difference_update(taken)
+    
+    # Too many collisions at this length, continue with longer codes
+    return list(codes) + await generate_short_codes(count - len(codes), length + 1)
@@ -0,0 +1,40 @@
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL for duplicate detection:
+    lowercase scheme and host, drop the default port and use "/" for an
+    empty path. Path, query and fragment are kept as-is since they may be
+    case or order sensitive for the target site (hash-routed apps route
+    on the fragment). A netloc with an invalid port is kept verbatim.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    path = parts.path or "/"
+
+    try:
+        port = parts.port
+    except ValueError:
+        return urlunsplit((scheme, parts.netloc, path, parts.query, parts.fragment))
+
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6
+    if port and port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+
+    netloc = host
+    if "@" in parts.netloc:
+        netloc = f"{parts.netloc.rsplit('@', 1)[0]}@{host}"
+
+    return urlunsplit((scheme, netloc, path, parts.query, parts.fragment))
+
+
+def url_hash(url: str) -> bytes:
+    """Short digest of the normalized URL (stored in urls.url_hash)"""
+    return hashlib.sha256(normalize_url(url).encode()).digest()[:16]